@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+題庫選題效能測試
+比較不同題庫大小下 get_question_from_bank / get_questions_by_scope /
+get_question_bank_count 的單次耗時（有索引時應與題庫大小無關）
+
+用法：
+    python benchmark_bank_selection.py
+    python benchmark_bank_selection.py --sizes 1000 100000 --storage mmap
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmark_question_bank import synthetic_bank_lines
+from utils.data_processor import DataProcessor
+
+
+def timed(label: str, func, rounds: int) -> None:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<28}{elapsed / rounds * 1e6:>10.1f} µs/次")
+
+
+def bench_size(size: int, storage: str, rounds: int, tmp: str) -> None:
+    bank = os.path.join(tmp, f"synthetic_{size}.txt")
+    with open(bank, "w", encoding="utf-8") as f:
+        f.writelines(synthetic_bank_lines(size))
+
+    processor = DataProcessor(tmp, bank_storage=storage)
+    start = time.perf_counter()
+    processor.load_question_bank_files([(bank, "數學"), (bank, "自然")])
+    print(f"  {size:>9,} 題 × 2 科（{storage}，載入 {time.perf_counter() - start:.2f} s）")
+
+    first = processor.get_question_from_bank("數學")
+    used = [processor._get_question_hash(first)]
+    random.seed(0)
+    timed("get_question_from_bank", lambda: processor.get_question_from_bank("數學", used), rounds)
+    timed("get_questions_by_scope", lambda: processor.get_questions_by_scope("單元3", "數學", used, 3), rounds)
+    timed("get_question_bank_count", lambda: processor.get_question_bank_count("數學"), rounds)
+    timed("has_question_bank", lambda: processor.has_question_bank("自然"), rounds)
+    if storage == "mmap":
+        processor.bank_store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="題庫選題效能測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="每科題目數量")
+    parser.add_argument("--storage", choices=["memory", "mmap"], default="memory")
+    parser.add_argument("--rounds", type=int, default=2000, help="每項測試次數")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("題庫選題")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            bench_size(size, args.storage, args.rounds, tmp)
+
+
+if __name__ == "__main__":
+    main()
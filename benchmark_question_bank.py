@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+題庫解析效能測試
+測量五個內建題庫與合成大型題庫（預設 100 萬題）的解析吞吐量
+
+用法：
+    python benchmark_question_bank.py                 # 內建題庫 + 100 萬題合成題庫
+    python benchmark_question_bank.py --synthetic 0   # 只測內建題庫
+"""
+import argparse
+import time
+from pathlib import Path
+
+from config import SUBJECT_BANK_FILES
+from utils.question_bank_parser import BLOCK_SEPARATOR, iter_questions, load_all_banks
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def synthetic_bank_lines(num_questions: int):
+    """逐行產生合成題庫（不需寫入磁碟），混合多行選項與單行內嵌選項"""
+    yield "【合成題庫】\n"
+    for i in range(num_questions):
+        yield BLOCK_SEPARATOR + "\n"
+        yield f"【範圍】單元{i % 12}\n"
+        yield "【題目】\n"
+        if i % 2:
+            yield f"（） {i}、若 x + {i % 97} = {i % 89}，則 x 為何？ (A) {i} (B) {i + 1}（C）{i + 2} (D) {i + 3}\n"
+        else:
+            yield f"（） {i}、下列何者與第 {i} 題的敘述相符？\n"
+            for letter in "ABCD":
+                yield f"({letter}) 選項{letter}{i}\n"
+        yield "\n"
+        yield f"【答案】\n（{'ABCD'[i % 4]}） 解析第 {i} 題\n"
+
+
+def run(label: str, source, subject: str) -> None:
+    start = time.perf_counter()
+    count = 0
+    for _ in iter_questions(source, subject):
+        count += 1
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    print(f"  {label:<24}{count:>9} 題 {elapsed * 1000:>10.1f} ms {rate:>12,.0f} 題/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="題庫解析效能測試")
+    parser.add_argument("--synthetic", type=int, default=1_000_000,
+                        help="合成題庫題數（0 表示略過）")
+    parser.add_argument("--repeat", type=int, default=3, help="內建題庫重複次數")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("內建題庫")
+    print("=" * 60)
+    for bank_file in sorted(set(SUBJECT_BANK_FILES.values())):
+        path = BASE_DIR / bank_file
+        if not path.exists():
+            continue
+        for round_index in range(args.repeat):
+            run(f"{path.name} #{round_index + 1}", str(path), path.stem)
+
+    start = time.perf_counter()
+    banks = load_all_banks(str(BASE_DIR / "question_banks"), use_cache=False)
+    elapsed = time.perf_counter() - start
+    count = sum(len(questions) for questions in banks.values())
+    print(f"  {'load_all_banks':<24}{count:>9} 題 {elapsed * 1000:>10.1f} ms（行程池，不使用快取）")
+
+    if args.synthetic > 0:
+        print("=" * 60)
+        print(f"合成題庫（{args.synthetic:,} 題，串流解析）")
+        print("=" * 60)
+        run("synthetic", synthetic_bank_lines(args.synthetic), "合成")
+
+
+if __name__ == "__main__":
+    main()
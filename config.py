@@ -48,6 +48,32 @@ GENERATIVEAI_MODEL_NAME = os.getenv("GENERATIVEAI_MODEL_NAME", "gemini-2.0-flash
 TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
 MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1000"))
 
+# LLM Response Cache Settings
+# Memory LRU in front of a SQLite store, keyed on provider/model/prompt/params
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./cache/llm_responses.sqlite3")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))  # on disk
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1000"))
+
+# Async concurrency limits (max in-flight requests per provider per event loop)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_PROVIDER_CONCURRENCY = {
+    "openai": int(os.getenv("LLM_MAX_CONCURRENCY_OPENAI", str(LLM_MAX_CONCURRENCY))),
+    "vertexai": int(os.getenv("LLM_MAX_CONCURRENCY_VERTEXAI", str(LLM_MAX_CONCURRENCY))),
+    "generativeai": int(os.getenv("LLM_MAX_CONCURRENCY_GENERATIVEAI", str(LLM_MAX_CONCURRENCY))),
+}
+
+# Thread pool size for LLMClient.generate_batch fan-out
+LLM_BATCH_MAX_WORKERS = int(os.getenv("LLM_BATCH_MAX_WORKERS", "8"))
+
+# Retry / circuit breaker settings for provider calls
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))  # retries after the first attempt
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))  # seconds
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))  # seconds
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_RESET_TIMEOUT = float(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", "30"))  # seconds
+
 # Learning Configuration
 SUBJECTS = [
     "數學",
@@ -150,6 +176,39 @@ SUBJECT_CORRECTIONS = {
     "中文": "語文"
 }
 
+# Question bank file for each subject (relative to the project directory)
+SUBJECT_BANK_FILES = {
+    "國文": "question_banks/chinese.txt",
+    "語文": "question_banks/chinese.txt",
+    "英語": "question_banks/english.txt",
+    "數學": "question_banks/math.txt",
+    "社會": "question_banks/society.txt",
+    "自然": "question_banks/science.txt"
+}
+
+# Keep a compiled copy of each parsed bank next to it (<bank>.cache), and for
+# mmap storage its offset index (<bank>.index), rebuilt only when the bank
+# content or the parser version changes
+QUESTION_BANK_CACHE_ENABLED = os.getenv("QUESTION_BANK_CACHE_ENABLED", "true").lower() == "true"
+
+# Bulk bank loading: directory scanned by load_all_banks, parser processes
+# (0 = one per CPU) and chunk size in characters when splitting large banks.
+# Banks needing parsing that total fewer than QUESTION_BANK_PARALLEL_MIN_CHARS
+# are parsed in-process: starting the worker pool costs more than it saves
+QUESTION_BANK_DIR = os.getenv("QUESTION_BANK_DIR", "./question_banks")
+QUESTION_BANK_LOAD_WORKERS = int(os.getenv("QUESTION_BANK_LOAD_WORKERS", "0"))
+QUESTION_BANK_CHUNK_CHARS = int(os.getenv("QUESTION_BANK_CHUNK_CHARS", "200000"))
+QUESTION_BANK_PARALLEL_MIN_CHARS = int(os.getenv("QUESTION_BANK_PARALLEL_MIN_CHARS", "1000000"))
+
+# Question bank storage in DataProcessor: "memory" keeps every parsed question
+# as a dict, "mmap" keeps only an offset index and parses questions when picked
+QUESTION_BANK_STORAGE = os.getenv("QUESTION_BANK_STORAGE", "memory").lower()
+
+# Per-student question sampler: shuffled permutation + cursor per subject/scope.
+# Set QUESTION_SAMPLER_SEED for reproducible draws; permutations kept in memory
+QUESTION_SAMPLER_SEED = int(os.getenv("QUESTION_SAMPLER_SEED")) if os.getenv("QUESTION_SAMPLER_SEED") else None
+QUESTION_SAMPLER_CACHE_SIZE = int(os.getenv("QUESTION_SAMPLER_CACHE_SIZE", "256"))
+
 # Difficulty Levels
 DIFFICULTY_LEVELS = {
     "easy": 1,
@@ -161,16 +220,70 @@ DIFFICULTY_LEVELS = {
 NUM_QUESTIONS_PER_SESSION = 5
 QUESTIONS_PER_SUBJECT = 3
 QUESTION_TIMEOUT = 30
+# Ask for a subject's whole question set as one JSON array instead of one call per question
+QUESTION_BATCH_MODE = os.getenv("QUESTION_BATCH_MODE", "true").lower() == "true"
+# Extra rounds that re-request only the items that failed validation
+QUESTION_BATCH_RETRIES = int(os.getenv("QUESTION_BATCH_RETRIES", "1"))
+
+# Pre-generated question pool keyed by (subject, topic, difficulty, grade)
+# A background worker refills a key once it drops below the low-water mark
+QUESTION_POOL_ENABLED = os.getenv("QUESTION_POOL_ENABLED", "true").lower() == "true"
+QUESTION_POOL_PATH = os.getenv("QUESTION_POOL_PATH", "./cache/question_pool.sqlite3")
+QUESTION_POOL_LOW_WATER = int(os.getenv("QUESTION_POOL_LOW_WATER", "3"))
+QUESTION_POOL_REFILL_SIZE = int(os.getenv("QUESTION_POOL_REFILL_SIZE", "5"))
+# Most refills queued when a student logs in (weak subjects' topics, recent topics first)
+QUESTION_POOL_WARM_MAX_KEYS = int(os.getenv("QUESTION_POOL_WARM_MAX_KEYS", "4"))
 
 # Error Analysis Settings
 ERROR_ANALYSIS_DEPTH = "detailed"  # "simple" or "detailed"
 INCLUDE_HINTS = True
 INCLUDE_SIMILAR_PROBLEMS = True
+# Request root cause, explanation, hints and similar problems as one JSON response
+ERROR_ANALYSIS_SINGLE_CALL = os.getenv("ERROR_ANALYSIS_SINGLE_CALL", "true").lower() == "true"
 
 # Learning Data Settings
 STUDENT_DATA_DIR = "./students"
+# Student storage backend: "json" (one file per student) or "sqlite"
+# (STUDENT_DB_FILE inside the student data directory, WAL mode)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json").lower()
+STUDENT_DB_FILE = os.getenv("STUDENT_DB_FILE", "students.sqlite3")
+# JSON backend: files are replaced atomically and writers take per-student advisory
+# locks, so several worker processes can share one student data directory
+STUDENT_LOCK_TIMEOUT = float(os.getenv("STUDENT_LOCK_TIMEOUT", "10"))  # seconds
+# JSON backend layout: "flat" (all files in STUDENT_DATA_DIR) or "sharded"
+# (STUDENT_DATA_DIR/ab/cd/<id>/ by MD5 prefix; unmigrated flat students are still found).
+# Move existing students with: python -m utils.student_layout
+STUDENT_DATA_LAYOUT = os.getenv("STUDENT_DATA_LAYOUT", "flat").lower()
 LEARNING_RECORDS_FILE = "learning_records.json"
 PROGRESS_TRACKING = True
+# Learning records are appended to records_<id>.jsonl, one JSON object per line.
+# fsync policy: "always" (every record), "interval" (at most once per
+# LEARNING_RECORD_FSYNC_INTERVAL seconds per file) or "never" (leave it to the OS)
+LEARNING_RECORD_FSYNC = os.getenv("LEARNING_RECORD_FSYNC", "never").lower()
+LEARNING_RECORD_FSYNC_INTERVAL = float(os.getenv("LEARNING_RECORD_FSYNC_INTERVAL", "1.0"))  # seconds
+# Recent answers kept in each student's running progress counters; summaries over
+# at most this many records never read the learning records
+PROGRESS_RECENT_WINDOW = int(os.getenv("PROGRESS_RECENT_WINDOW", "50"))
+# Students whose progress counters are kept in memory (least recently used are reloaded)
+PROGRESS_AGGREGATES_CACHE_SIZE = int(os.getenv("PROGRESS_AGGREGATES_CACHE_SIZE", "1000"))
+# Write-behind buffer for answer records: each record is appended (and fsynced) to a
+# small journal, then written to student storage in batches once
+# RECORD_BUFFER_MAX_RECORDS are pending or the oldest has waited
+# RECORD_BUFFER_MAX_SECONDS, and at the end of every session. A background thread
+# checks the age limit every RECORD_BUFFER_FLUSH_CHECK_SECONDS (0 disables it), so
+# records of students who stop answering are written without waiting for new ones
+RECORD_BUFFER_ENABLED = os.getenv("RECORD_BUFFER_ENABLED", "true").lower() == "true"
+RECORD_BUFFER_MAX_RECORDS = int(os.getenv("RECORD_BUFFER_MAX_RECORDS", "20"))
+RECORD_BUFFER_MAX_SECONDS = float(os.getenv("RECORD_BUFFER_MAX_SECONDS", "30"))
+RECORD_BUFFER_FLUSH_CHECK_SECONDS = float(os.getenv("RECORD_BUFFER_FLUSH_CHECK_SECONDS", "5"))
+RECORD_BUFFER_JOURNAL_FSYNC = os.getenv("RECORD_BUFFER_JOURNAL_FSYNC", "true").lower() == "true"
+# In-process LRU caches of student profiles and of each student's most recent
+# STUDENT_RECORDS_CACHE_TAIL learning records (kept up to date on every save and
+# checked against the stored file mtime/size or SQLite data version on every read,
+# so writes by other processes sharing the data are picked up)
+STUDENT_PROFILE_CACHE_SIZE = int(os.getenv("STUDENT_PROFILE_CACHE_SIZE", "1000"))  # students
+STUDENT_RECORDS_CACHE_SIZE = int(os.getenv("STUDENT_RECORDS_CACHE_SIZE", "1000"))  # students
+STUDENT_RECORDS_CACHE_TAIL = int(os.getenv("STUDENT_RECORDS_CACHE_TAIL", "100"))  # records each
 
 # Feedback Settings
 FEEDBACK_LOOP_ENABLED = True
@@ -179,4 +292,5 @@ MIN_CONFIDENCE_SCORE = 0.5
 
 # UI Settings
 VERBOSE_OUTPUT = True
+STREAM_FEEDBACK = os.getenv("STREAM_FEEDBACK", "true").lower() == "true"  # print explanations as they arrive
 LANGUAGE = "zh"  # "zh" for Chinese, "en" for English
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用測試工具：以假供應商取代 LLM 呼叫，測試資料只寫入暫存目錄
+
+pytest 透過 fake_llm 與 fake_app fixture 使用；測試檔直接以
+python test_*.py 執行時則匯入 make_fake_llm 與 fake_app_factory。
+不需要假供應商的腳本式測試以 isolated_app() 取得系統實例。
+"""
+import atexit
+import shutil
+import tempfile
+from typing import Callable, List, Optional, Union
+
+from main import KnowledgeFuelStation
+from models.llm_client import LLMClient
+from models.question_pool import QuestionPool
+from models.response_cache import ResponseCache
+from utils import DataProcessor, QuestionBankRegistry
+
+try:
+    import pytest
+except ImportError:  # 直接執行測試檔時不需要 pytest
+    pytest = None
+
+# responder(prompt, system_message, max_tokens) 回傳回應文字或拋出例外；
+# 也可以是依序回傳的列表（列表中的例外會被拋出）
+Responder = Union[Callable[[str, Optional[str], int], str], List]
+
+
+def install_fake_provider(client: LLMClient, responder: Responder) -> LLMClient:
+    """
+    把客戶端的供應商呼叫換成 responder（不呼叫真實 API）
+
+    每次呼叫都計入 provider_calls 與單次作答的 llm_calls，
+    送出的提示依序記錄在 client.prompts。
+
+    Returns:
+        同一個客戶端
+    """
+    if isinstance(responder, list):
+        queue = list(responder)
+
+        def responder(prompt, system_message, max_tokens):
+            item = queue.pop(0)
+            if isinstance(item, Exception):
+                raise item
+            return item
+
+    client.prompts = []
+
+    def fake_call(prompt, system_message, temperature, max_tokens):
+        client._count_provider_call()
+        client.prompts.append(prompt)
+        return responder(prompt, system_message, max_tokens)
+
+    client._call_provider = fake_call
+    return client
+
+
+def make_fake_llm(responder: Responder, cache: Optional[ResponseCache] = None, **kwargs) -> LLMClient:
+    """
+    建立使用假供應商的客戶端
+
+    Args:
+        responder: 見 Responder
+        cache: 回應快取（None 表示不快取，不會開啟預設的 ./cache）
+        **kwargs: 其他 LLMClient 參數
+
+    Returns:
+        LLMClient
+    """
+    client = LLMClient(use_cache=cache is not None, cache=cache, **kwargs)
+    return install_fake_provider(client, responder)
+
+
+def fake_app_factory(directory: str) -> Callable[..., KnowledgeFuelStation]:
+    """
+    建立系統實例的函式：記憶體題目池，學生資料放在 directory 下各自的子目錄，
+    不使用預設的 ./cache 與 ./students
+
+    Args:
+        directory: 暫存目錄
+
+    Returns:
+        make_app(responder=None) -> KnowledgeFuelStation；
+        responder 為 None 時使用真實供應商（不快取回應）
+    """
+    def make_app(responder: Optional[Responder] = None) -> KnowledgeFuelStation:
+        data_dir = tempfile.mkdtemp(prefix="students_", dir=directory)
+        llm = make_fake_llm(responder) if responder is not None else LLMClient(use_cache=False)
+        return KnowledgeFuelStation(
+            llm=llm,
+            question_pool=QuestionPool(db_path=None),
+            # 不緩衝紀錄：暫存目錄刪除後，程式結束時不會再有待寫入的紀錄
+            data_processor=DataProcessor(
+                data_dir, bank_registry=QuestionBankRegistry.shared(), buffer_records=False
+            )
+        )
+    return make_app
+
+
+def isolated_app() -> KnowledgeFuelStation:
+    """
+    建立使用真實供應商的系統實例，學生資料與題目池不寫入預設目錄
+
+    暫存目錄在程式結束時刪除。
+
+    Returns:
+        KnowledgeFuelStation
+    """
+    directory = tempfile.mkdtemp(prefix="kfs_test_")
+    atexit.register(shutil.rmtree, directory, True)
+    return fake_app_factory(directory)()
+
+
+if pytest is not None:
+    @pytest.fixture
+    def fake_llm():
+        """make_fake_llm"""
+        return make_fake_llm
+
+    @pytest.fixture
+    def fake_app(tmp_path):
+        """fake_app_factory(tmp_path)"""
+        return fake_app_factory(str(tmp_path))
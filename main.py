@@ -6,10 +6,16 @@ Interactive learning assistant using LLM
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Optional
-from models import LLMClient, QuestionGenerator, ErrorAnalyzer
-from utils import DataProcessor, ReportGenerator
-from config import SUBJECTS, SUBJECT_CORRECTIONS
+from typing import Callable, Dict, List, Optional
+from models import LLMClient, QuestionGenerator, ErrorAnalyzer, QuestionPool
+from utils import DataProcessor, ReportGenerator, QuestionBankRegistry, UsedQuestionSet
+from config import (
+    SUBJECTS,
+    SUBJECT_CORRECTIONS,
+    SUBJECT_BANK_FILES,
+    STREAM_FEEDBACK,
+    QUESTION_POOL_ENABLED,
+)
 
 # Base directory for locating resources regardless of execution CWD
 BASE_DIR = Path(__file__).resolve().parent
@@ -18,12 +24,28 @@ BASE_DIR = Path(__file__).resolve().parent
 class KnowledgeFuelStation:
     """Main application class for Knowledge Fuel Station"""
 
-    def __init__(self):
-        """Initialize the application"""
-        self.llm = LLMClient()
-        self.question_generator = QuestionGenerator(self.llm)
+    def __init__(
+        self,
+        llm: Optional[LLMClient] = None,
+        question_pool: Optional[QuestionPool] = None,
+        data_processor: Optional[DataProcessor] = None
+    ):
+        """
+        Initialize the application
+        
+        Args:
+            llm: LLM client (None creates one with the shared response cache)
+            question_pool: Question pool (None creates the configured one if enabled)
+            data_processor: Student data processor (None uses STUDENT_DATA_DIR)
+        """
+        self.llm = llm or LLMClient()
+        if question_pool is None and QUESTION_POOL_ENABLED:
+            question_pool = QuestionPool()
+        self.question_pool = question_pool
+        self.question_generator = QuestionGenerator(self.llm, pool=self.question_pool)
         self.error_analyzer = ErrorAnalyzer(self.llm)
-        self.data_processor = DataProcessor()
+        # Question banks are loaded once per process and shared by every instance
+        self.data_processor = data_processor or DataProcessor(bank_registry=QuestionBankRegistry.shared())
         self.report_generator = ReportGenerator()
         self.current_student = None
         self.subject_corrections = {}  # Track corrected subjects in this session
@@ -41,8 +63,41 @@ class KnowledgeFuelStation:
         profile = self.data_processor.load_student_profile(student_id)
         if profile:
             self.current_student = profile
+            # Pre-generate this student's questions while they pick subjects
+            if self.llm.is_available():
+                self.question_generator.warm_pool(profile)
         return profile
     
+    def load_question_banks(self, subjects: List[str]) -> int:
+        """
+        Load the question bank file of each subject
+        
+        Args:
+            subjects: Subject names (already corrected)
+            
+        Returns:
+            Number of questions loaded
+        """
+        banks = []
+        for subject in subjects:
+            bank_file = SUBJECT_BANK_FILES.get(subject)
+            if bank_file:
+                full_path = (BASE_DIR / bank_file).resolve()
+                if full_path.exists():
+                    banks.append((str(full_path), subject))
+                else:
+                    print(f"  ⚠ {subject}: 題庫文件不存在 ({bank_file})")
+            else:
+                print(f"  ⚠ {subject}: 無對應題庫")
+        
+        # All banks are parsed together (in parallel when they need re-parsing)
+        loaded_count = 0
+        for (_, subject), count in zip(banks, self.data_processor.load_question_bank_files(banks)):
+            if count > 0:
+                print(f"  ✓ {subject}: 載入 {count} 題")
+                loaded_count += count
+        return loaded_count
+    
     def correct_subject_name(self, subject_input: str) -> str:
         """
         Correct subject name based on input (handles typos)
@@ -105,7 +160,7 @@ class KnowledgeFuelStation:
             "recent_scores": {},
             "recent_topics": [],
             "total_sessions": 0,
-            "used_questions": [],
+            "used_questions": UsedQuestionSet(),
             "creation_date": str(__import__('datetime').datetime.now())
         }
         
@@ -157,10 +212,23 @@ class KnowledgeFuelStation:
             )
         else:
             # Pure LLM mode
-            questions = self.question_generator.generate_quiz(
-                student_profile,
-                num_questions=num_questions_per_subject or 3
-            )
+            num_questions = num_questions_per_subject or 3
+            questions = []
+            if self.llm.is_available():
+                questions = self.question_generator.generate_quiz(
+                    student_profile,
+                    num_questions=num_questions
+                )
+            # LLM down or returned unusable items: fall back to the question bank
+            if len(questions) < num_questions:
+                for subject in student_profile.get("weak_subjects", []):
+                    missing = num_questions - len(questions)
+                    if missing <= 0:
+                        break
+                    questions.extend(self._bank_fallback_questions(
+                        subject, missing, UsedQuestionSet.from_profile(student_profile), len(questions),
+                        student_profile.setdefault("question_cursors", {})
+                    ))
         
         session = {
             "student_id": student_profile["student_id"],
@@ -190,7 +258,8 @@ class KnowledgeFuelStation:
         weak_subjects = student_profile.get("weak_subjects", [])
         num_questions_per_subject = num_questions_per_subject or 3  # Default
         
-        used_questions = student_profile.get("used_questions", [])
+        used_questions = UsedQuestionSet.from_profile(student_profile)
+        cursors = student_profile.setdefault("question_cursors", {})
         
         for subject in weak_subjects:
             # Check if question bank has questions for this subject
@@ -199,35 +268,32 @@ class KnowledgeFuelStation:
             if bank_count > 0:
                 # Use questions from bank (up to num_questions_per_subject)
                 for _ in range(min(num_questions_per_subject, bank_count)):
-                    bank_question = self.data_processor.get_question_from_bank(subject, used_questions)
+                    bank_question = self.data_processor.get_question_from_bank(subject, used_questions, cursors)
                     if bank_question:
                         # Format bank question to match expected structure
-                        formatted_q = {
-                            "id": len(questions) + 1,
-                            "subject": bank_question.get("subject", subject),
-                            "difficulty": "中等",  # Default difficulty for bank questions
-                            "question": bank_question.get("question", ""),
-                            "options": bank_question.get("options", {}),
-                            "standard_answer": bank_question.get("correct_answer", "A"),
-                            "explanation": bank_question.get("explanation", ""),
-                            "topic": bank_question.get("scope", ""),
-                            "source": "question_bank"
-                        }
+                        formatted_q = self._format_bank_question(bank_question, len(questions) + 1, subject)
                         questions.append(formatted_q)
                         # Track this question to avoid repetition
                         q_hash = self.data_processor._get_question_hash(bank_question)
-                        used_questions.append(q_hash)
+                        used_questions.add(q_hash)
                         print(f"  📚 從題庫取得 {subject} 題目")
                 
                 # If bank questions < desired, fill with LLM
                 remaining = num_questions_per_subject - len([q for q in questions if q["subject"] == subject])
-                if remaining > 0:
+                if remaining > 0 and self.llm.is_available():
                     print(f"  🤖 生成 {remaining} 題 {subject} LLM問題補充")
                     # Create a temporary profile for this subject only
                     temp_profile = student_profile.copy()
                     temp_profile["weak_subjects"] = [subject]
                     llm_questions = self.question_generator.generate_quiz(temp_profile, num_questions=remaining)
                     questions.extend(llm_questions)
+                    remaining -= len(llm_questions)
+                if remaining > 0:
+                    # LLM unavailable or failed: reuse bank questions rather than leave gaps
+                    print(f"  📚 AI 暫時無法使用，以題庫題目補足 {remaining} 題")
+                    questions.extend(self._bank_fallback_questions(
+                        subject, remaining, used_questions, len(questions), cursors
+                    ))
             else:
                 # No bank questions, use pure LLM
                 print(f"  🤖 生成 {num_questions_per_subject} 題 {subject} LLM問題")
@@ -238,36 +304,107 @@ class KnowledgeFuelStation:
         
         return questions
 
+    def _format_bank_question(self, bank_question: Dict, question_id: int, subject: str = "") -> Dict:
+        """Convert a question bank entry to the session question structure"""
+        return {
+            "id": question_id,
+            "subject": bank_question.get("subject", subject),
+            "difficulty": "中等",  # Default difficulty for bank questions
+            "question": bank_question.get("question", ""),
+            "options": bank_question.get("options", {}),
+            "standard_answer": bank_question.get("correct_answer", "A"),
+            "explanation": bank_question.get("explanation", ""),
+            "topic": bank_question.get("scope", ""),
+            "source": "question_bank"
+        }
+
+    def _bank_fallback_questions(
+        self,
+        subject: str,
+        count: int,
+        used_questions: UsedQuestionSet,
+        start_index: int,
+        cursors: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Take questions from the bank when the LLM cannot supply them
+        
+        Unused questions are preferred; already-used ones are allowed as a
+        last resort so the session is not left short.
+        
+        Args:
+            subject: Subject to draw from
+            count: Number of questions wanted
+            used_questions: Hashes of used questions (updated in place)
+            start_index: Number of questions already in the session
+            cursors: Student's sampler cursors (profile["question_cursors"])
+            
+        Returns:
+            Formatted bank questions (may be fewer than count)
+        """
+        questions = []
+        if not self.data_processor.has_question_bank(subject):
+            return questions
+        for _ in range(count):
+            bank_question = (
+                self.data_processor.get_question_from_bank(subject, used_questions, cursors)
+                or self.data_processor.get_question_from_bank(subject, cursors=cursors)
+            )
+            if not bank_question:
+                break
+            questions.append(self._format_bank_question(bank_question, start_index + len(questions) + 1, subject))
+            used_questions.add(self.data_processor._get_question_hash(bank_question))
+        return questions
+
     def process_answer(
         self,
         session: Dict,
         question_index: int,
-        student_answer: str
+        student_answer: str,
+        on_feedback_chunk: Optional[Callable[[str], None]] = None,
+        explain_anyway: bool = False
     ) -> Dict:
         """
         Process student's answer and provide feedback
         
+        The answer is graded first; error analysis (LLM calls) only runs for
+        wrong answers, or for correct ones when explain_anyway is set.
+        
         Args:
             session: Current learning session
             question_index: Index of the question
             student_answer: Student's answer
+            on_feedback_chunk: If given, the feedback text is streamed to this
+                               callback as it is generated
+            explain_anyway: Also analyze and explain a correct answer
             
         Returns:
-            Feedback and analysis
+            Feedback and analysis ("analysis" is None when it was skipped;
+            "llm_calls" is the number of provider calls this answer cost)
         """
+        # Counted per request: background question pool refills are not included
+        with LLMClient.count_calls() as calls:
+            response = self._process_answer(
+                session, question_index, student_answer, on_feedback_chunk, explain_anyway
+            )
+        if "llm_calls" in response:
+            response["llm_calls"] = calls.calls
+        return response
+
+    def _process_answer(
+        self,
+        session: Dict,
+        question_index: int,
+        student_answer: str,
+        on_feedback_chunk: Optional[Callable[[str], None]],
+        explain_anyway: bool
+    ) -> Dict:
+        """Grade, analyze and record one answer (see process_answer)"""
         if question_index >= len(session["questions"]):
             return {"error": "Invalid question index"}
         
         question = session["questions"][question_index]
         
-        # Analyze the answer
-        analysis = self.error_analyzer.analyze_error(
-            question=question["question"],
-            student_answer=student_answer,
-            correct_answer=question["standard_answer"],
-            subject=question.get("subject")
-        )
-        
         # Check if answer is correct (enhanced check with option matching)
         is_correct = self._check_answer_correctness(
             student_answer,
@@ -275,6 +412,23 @@ class KnowledgeFuelStation:
             question  # Pass full question data for option matching
         )
         
+        needs_analysis = not is_correct or explain_anyway
+        
+        # Stream the feedback header before the explanation starts generating
+        if on_feedback_chunk and needs_analysis:
+            on_feedback_chunk(self._analysis_header(is_correct))
+        
+        # Analyze the answer only when the feedback will use it
+        analysis = None
+        if needs_analysis:
+            analysis = self.error_analyzer.analyze_error(
+                question=question["question"],
+                student_answer=student_answer,
+                correct_answer=question["standard_answer"],
+                subject=question.get("subject"),
+                on_explanation_chunk=on_feedback_chunk
+            )
+        
         # Debug info (optional, can be disabled by setting DEBUG=False in config)
         if hasattr(self, 'debug') and self.debug:
             print(f"\n[答案驗證]")
@@ -291,6 +445,14 @@ class KnowledgeFuelStation:
                         marker += " ← 正確答案"
                     print(f"    {letter}. {content}{marker}")
         
+        feedback = self._generate_feedback(analysis, is_correct)
+        if on_feedback_chunk:
+            if analysis is None:
+                on_feedback_chunk(feedback)
+            else:
+                # Header and explanation were already streamed; send the hints
+                on_feedback_chunk("\n" + self._format_hint_feedback(analysis))
+        
         response = {
             "question_index": question_index,
             "question": question["question"],
@@ -298,7 +460,9 @@ class KnowledgeFuelStation:
             "correct_answer": question["standard_answer"],
             "is_correct": is_correct,
             "analysis": analysis,
-            "feedback": self._generate_feedback(analysis, is_correct)
+            "feedback": feedback,
+            "feedback_streamed": on_feedback_chunk is not None,
+            "llm_calls": 0
         }
         
         session["responses"].append(response)
@@ -381,21 +545,9 @@ class KnowledgeFuelStation:
         Returns:
             List of scope names sorted by error frequency
         """
-        scope_errors: Dict[str, int] = {}
-        
-        # Load all historical records for this student
-        records = self.data_processor.get_learning_records(student_id)
-        if not records:
-            return []
-        
-        for record in records:
-            if record.get("correct") is False:
-                scope = record.get("scope") or "未分類"
-                scope_errors[scope] = scope_errors.get(scope, 0) + 1
-        
-        # Sort by error count (descending) and return top N
-        sorted_scopes = sorted(scope_errors.items(), key=lambda x: x[1], reverse=True)
-        return [scope for scope, _ in sorted_scopes[:top_n]]
+        # Error counts per scope over all historical records, most errors first
+        scope_errors = self.data_processor.get_error_scope_counts(student_id)
+        return list(scope_errors)[:top_n]
 
     def _generate_review_questions(
         self,
@@ -415,13 +567,13 @@ class KnowledgeFuelStation:
             List of review questions
         """
         # Base used hashes: already asked questions for this session + historically used
-        existing_used_hashes: List[str] = []
+        existing_used_hashes = UsedQuestionSet()
         if self.current_student:
-            existing_used_hashes.extend(self.current_student.get("used_questions", []))
-        session_used_hashes: List[str] = []
+            existing_used_hashes = UsedQuestionSet.from_profile(self.current_student).copy()
         if session:
             for q in session.get("questions", []):
-                session_used_hashes.append(self.data_processor._get_question_hash(q))
+                existing_used_hashes.add(self.data_processor._get_question_hash(q))
+        cursors = self.current_student.setdefault("question_cursors", {}) if self.current_student else {}
 
         if review_mode == "session" and session:
             # Generate based on session error scopes with weighted distribution
@@ -441,29 +593,32 @@ class KnowledgeFuelStation:
             target_scopes = [s for s, _ in scopes_sorted]
             
             questions: List[Dict] = []
-            used_hashes: List[str] = existing_used_hashes + session_used_hashes
+            used_hashes = existing_used_hashes
             idx = 0
             while len(questions) < num_questions and target_scopes:
                 scope = target_scopes[idx % len(target_scopes)]
                 subj = scope_subject.get(scope)
-                qs = self.data_processor.get_questions_by_scope(scope=scope, subject=subj, used_questions=used_hashes, limit=1)
-                if qs:
-                    q = qs[0]
-                    questions.append({
-                        "id": len(questions)+1,
-                        "subject": q.get("subject", subj or ""),
-                        "difficulty": "中等",
-                        "question": q.get("question", ""),
-                        "options": q.get("options", {}),
-                        "standard_answer": q.get("correct_answer", "A"),
-                        "explanation": q.get("explanation", ""),
-                        "topic": q.get("scope", scope),
-                        "source": "question_bank"
-                    })
-                    used_hashes.append(self.data_processor._get_question_hash(q))
+                qs = self.data_processor.get_questions_by_scope(
+                    scope=scope, subject=subj, used_questions=used_hashes, limit=1, cursors=cursors
+                )
+                if not qs:
+                    # Nothing in the bank for this scope: stop cycling through it
+                    target_scopes.remove(scope)
+                    continue
+                q = qs[0]
+                questions.append({
+                    "id": len(questions)+1,
+                    "subject": q.get("subject", subj or ""),
+                    "difficulty": "中等",
+                    "question": q.get("question", ""),
+                    "options": q.get("options", {}),
+                    "standard_answer": q.get("correct_answer", "A"),
+                    "explanation": q.get("explanation", ""),
+                    "topic": q.get("scope", scope),
+                    "source": "question_bank"
+                })
+                used_hashes.add(self.data_processor._get_question_hash(q))
                 idx += 1
-                if idx > 50:
-                    break
             return questions[:num_questions]
         
         elif review_mode == "history":
@@ -475,9 +630,11 @@ class KnowledgeFuelStation:
             if not top_scopes:
                 return []
             questions: List[Dict] = []
-            used_hashes: List[str] = existing_used_hashes + session_used_hashes
+            used_hashes = existing_used_hashes
             for scope in top_scopes:
-                qs = self.data_processor.get_questions_by_scope(scope=scope, subject=None, used_questions=used_hashes, limit=3)
+                qs = self.data_processor.get_questions_by_scope(
+                    scope=scope, subject=None, used_questions=used_hashes, limit=3, cursors=cursors
+                )
                 for q in qs:
                     questions.append({
                         "id": len(questions)+1,
@@ -490,7 +647,7 @@ class KnowledgeFuelStation:
                         "topic": q.get("scope", scope),
                         "source": "question_bank"
                     })
-                    used_hashes.append(self.data_processor._get_question_hash(q))
+                    used_hashes.add(self.data_processor._get_question_hash(q))
             return questions[:9]  # 3 scopes × 3 questions
         
         return []
@@ -512,17 +669,23 @@ class KnowledgeFuelStation:
         correct_count = sum(1 for r in session["responses"] if r["is_correct"])
         total_count = len(session["responses"])
         accuracy = (correct_count / total_count * 100) if total_count > 0 else 0
-        
-        # Update student's used_questions list
+
+        # Write this session's buffered answer records to storage
+        self.data_processor.flush_records(session["student_id"])
+
+        # Update student's used_questions set
         if self.current_student:
-            student_profile = self.data_processor.load_student_profile(session["student_id"])
+            # The in-memory profile already holds this session's sampler positions
+            if self.current_student.get("student_id") == session["student_id"]:
+                student_profile = self.current_student
+            else:
+                student_profile = self.data_processor.load_student_profile(session["student_id"])
             if student_profile:
                 # Get all questions from this session
                 for i, question in enumerate(session.get("questions", [])):
                     if i < len(session.get("responses", [])):
                         q_hash = self.data_processor._get_question_hash(question)
-                        if q_hash not in student_profile.get("used_questions", []):
-                            student_profile.setdefault("used_questions", []).append(q_hash)
+                        UsedQuestionSet.from_profile(student_profile).add(q_hash)
                 
                 # Save updated profile
                 self.data_processor.save_student_profile(session["student_id"], student_profile)
@@ -655,23 +818,42 @@ class KnowledgeFuelStation:
         # Fallback: exact match or containment
         return student_clean == correct_clean or student_clean in correct_clean or correct_clean in student_clean
 
-    def _generate_feedback(self, analysis: Dict, is_correct: bool) -> str:
+    def _generate_feedback(self, analysis: Optional[Dict], is_correct: bool) -> str:
         """
         Generate user-friendly feedback
         
         Args:
-            analysis: Error analysis dictionary
+            analysis: Error analysis dictionary (None if analysis was skipped)
             is_correct: Whether answer was correct
             
         Returns:
             Feedback message
         """
-        if is_correct:
-            return "✅ 正確！很好地掌握了這個知識點。"
+        if analysis is None:
+            return self._feedback_header(is_correct)
         
-        feedback = "❌ 答案不正確。\n\n"
+        feedback = self._analysis_header(is_correct)
         feedback += analysis.get("explanation", "")
+        feedback += self._format_hint_feedback(analysis)
         
+        return feedback
+
+    def _feedback_header(self, is_correct: bool) -> str:
+        """Opening line of the feedback message"""
+        if is_correct:
+            return "✅ 正確！很好地掌握了這個知識點。"
+        return "❌ 答案不正確。\n\n"
+
+    def _analysis_header(self, is_correct: bool) -> str:
+        """Opening line followed by the separator that comes before the explanation"""
+        header = self._feedback_header(is_correct)
+        if is_correct:
+            header += "\n\n"
+        return header
+
+    def _format_hint_feedback(self, analysis: Dict) -> str:
+        """Format the hint bullets appended after the explanation"""
+        feedback = ""
         if analysis.get("hints"):
             # 僅提供精簡建議內容，不包含思考過程的前綴
             for hint in analysis["hints"][:2]:
@@ -721,6 +903,27 @@ class KnowledgeFuelStation:
             return (analysis.get('root_cause') or '基礎觀念需加強')[:20]
 
 
+def _print_chunk(chunk: str) -> None:
+    print(chunk, end="", flush=True)
+
+
+def _answer_with_feedback(
+    app: KnowledgeFuelStation,
+    session: Dict,
+    question_index: int,
+    student_answer: str
+) -> Dict:
+    """Process an answer and print its feedback (streamed when enabled)"""
+    if STREAM_FEEDBACK:
+        print()
+        feedback = app.process_answer(session, question_index, student_answer, on_feedback_chunk=_print_chunk)
+        print()
+    else:
+        feedback = app.process_answer(session, question_index, student_answer)
+        print(f"\n{feedback['feedback']}")
+    return feedback
+
+
 def interactive_learning_session():
     """Interactive learning session with user input"""
     
@@ -781,70 +984,13 @@ def interactive_learning_session():
     print("\n" + "="*50)
     print("自動載入題庫...\n")
     
-    # Map subjects to question bank files
-    subject_to_file = {
-        "國文": "question_banks/chinese.txt",
-        "語文": "question_banks/chinese.txt",
-        "英語": "question_banks/english.txt",
-        "數學": "question_banks/math.txt",
-        "社會": "question_banks/society.txt",
-        "自然": "question_banks/science.txt"
-    }
-    
-    loaded_count = 0
-    
-    for subject in selected_subjects:
-        bank_file = subject_to_file.get(subject)
-        if bank_file:
-            full_path = (BASE_DIR / bank_file).resolve()
-            if full_path.exists():
-                count = app.data_processor.load_question_bank_file(str(full_path), subject)
-                if count > 0:
-                    print(f"  ✓ {subject}: 載入 {count} 題")
-                    loaded_count += count
-            else:
-                print(f"  ⚠ {subject}: 題庫文件不存在 ({bank_file})")
-        else:
-            print(f"  ⚠ {subject}: 無對應題庫")
+    loaded_count = app.load_question_banks(selected_subjects)
     
     if loaded_count > 0:
         print(f"\n✅ 共載入 {loaded_count} 題題庫\n")
     else:
         print(f"\n⚠ 未能載入任何題庫，將使用AI生成\n")
-
-        # Reload question banks for newly selected subjects
-        print("\n" + "="*50)
-        print("重新載入題庫...\n")
-        
-        subject_to_file = {
-            "國文": "question_banks/chinese.txt",
-            "語文": "question_banks/chinese.txt",
-            "英語": "question_banks/english.txt",
-            "數學": "question_banks/math.txt",
-            "社會": "question_banks/society.txt",
-            "自然": "question_banks/science.txt"
-        }
         
-        loaded_count = 0
-        for subject in selected_subjects:
-            bank_file = subject_to_file.get(subject)
-            if bank_file:
-                full_path = (BASE_DIR / bank_file).resolve()
-                if full_path.exists():
-                    count = app.data_processor.load_question_bank_file(str(full_path), subject)
-                    if count > 0:
-                        print(f"  ✓ {subject}: 載入 {count} 題")
-                        loaded_count += count
-                else:
-                    print(f"  ⚠ {subject}: 題庫文件不存在 ({bank_file})")
-            else:
-                print(f"  ⚠ {subject}: 無對應題庫")
-        
-        if loaded_count > 0:
-            print(f"\n✅ 共載入 {loaded_count} 題題庫\n")
-        else:
-            print(f"\n⚠ 未能載入任何題庫，將使用AI生成\n")
-
         # Optional: topic selection per subject
         choose_topics = input("\n是否要為本次科目指定主題範圍？(y/n): ").strip().lower()
         if choose_topics in ['y', 'yes', '是']:
@@ -909,9 +1055,7 @@ def interactive_learning_session():
             continue
         
         # Process answer
-        feedback = app.process_answer(session, i-1, student_answer)
-        
-        print(f"\n{feedback['feedback']}")
+        feedback = _answer_with_feedback(app, session, i-1, student_answer)
         
         # Show correct answer and explanation
         correct_answer = question.get('standard_answer', '')
@@ -1013,8 +1157,7 @@ def interactive_learning_session():
             print("❌ 請輸入有效的選項 (A/B/C/D)")
             continue
         
-        feedback = app.process_answer(review_session, i-1, student_answer)
-        print(f"\n{feedback['feedback']}")
+        feedback = _answer_with_feedback(app, review_session, i-1, student_answer)
         
         correct_answer = question.get('standard_answer', '')
         if student_answer != correct_answer:
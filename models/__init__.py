@@ -4,5 +4,7 @@ Initialize models package
 from .llm_client import LLMClient
 from .question_generator import QuestionGenerator
 from .error_analyzer import ErrorAnalyzer
+from .response_cache import ResponseCache
+from .question_pool import QuestionPool
 
-__all__ = ["LLMClient", "QuestionGenerator", "ErrorAnalyzer"]
+__all__ = ["LLMClient", "QuestionGenerator", "ErrorAnalyzer", "ResponseCache", "QuestionPool"]
@@ -1,29 +1,53 @@
 """
 Error Analyzer - Analyzes student errors and provides detailed explanations
 """
-from typing import Optional, Dict, List
+import asyncio
+import json
+import re
+from typing import Callable, Optional, Dict, List
 from models.llm_client import LLMClient
-from config import ERROR_ANALYSIS_DEPTH, INCLUDE_HINTS, INCLUDE_SIMILAR_PROBLEMS
+from config import (
+    ERROR_ANALYSIS_DEPTH,
+    ERROR_ANALYSIS_SINGLE_CALL,
+    INCLUDE_HINTS,
+    INCLUDE_SIMILAR_PROBLEMS,
+)
+
+
+EXPLANATION_SYSTEM_MESSAGE = "你是一位耐心的教師。根據給定的正確答案提供簡潔的解釋，不要提出假設性問題或要求提供信息。"
+STRUCTURED_ANALYSIS_SYSTEM_MESSAGE = "你是一位耐心的教師，擅長分析學生的錯誤。只輸出有效的 JSON 物件，不要加入其他文字。"
+
+# Field -> maximum number of items kept (None for plain text fields)
+ANALYSIS_FIELD_LIMITS = {
+    "root_cause": None,
+    "explanation": None,
+    "hints": 3,
+    "similar_problems": 2,
+}
 
 
 class ErrorAnalyzer:
     """Analyze student errors and provide comprehensive feedback"""
 
-    def __init__(self, llm_client: LLMClient):
+    def __init__(self, llm_client: LLMClient, single_call: bool = ERROR_ANALYSIS_SINGLE_CALL):
         """
         Initialize error analyzer
         
         Args:
             llm_client: LLM client instance
+            single_call: Request all analysis fields in one JSON response and
+                         fall back to per-field calls only for missing fields
         """
         self.llm = llm_client
+        self.single_call = single_call
 
     def analyze_error(
         self,
         question: str,
         student_answer: str,
         correct_answer: str,
-        subject: Optional[str] = None
+        subject: Optional[str] = None,
+        on_explanation_chunk: Optional[Callable[[str], None]] = None
     ) -> Dict[str, str]:
         """
         Analyze student error and provide explanation
@@ -33,11 +57,49 @@ class ErrorAnalyzer:
             student_answer: Student's incorrect answer
             correct_answer: The correct answer
             subject: Subject area
+            on_explanation_chunk: If given, the explanation is streamed and
+                                  each text chunk is passed to this callback
             
         Returns:
             Dictionary with analysis, explanation, hints, etc.
         """
-        analysis = {
+        analysis = self._new_analysis(question, student_answer, correct_answer)
+        
+        # When streaming, explain first so text reaches the student right away
+        # (the explanation prompt does not depend on the root cause)
+        streamed = ""
+        if on_explanation_chunk:
+            streamed = self._generate_explanation(
+                question, student_answer, correct_answer, "",
+                on_chunk=on_explanation_chunk
+            )
+            analysis["explanation"] = streamed
+        
+        # Single-call mode: one JSON response covering every remaining field
+        if self.single_call:
+            fields = self._missing_fields(analysis)
+            if fields:
+                response = self.llm.generate_text(
+                    self._build_structured_prompt(question, student_answer, correct_answer, subject, fields),
+                    system_message=STRUCTURED_ANALYSIS_SYSTEM_MESSAGE
+                )
+                analysis.update(self._parse_analysis_json(response, fields))
+        
+        # Per-field calls only for whatever is still missing
+        self._fill_missing_fields(analysis, subject)
+        
+        # Nothing was streamed (empty stream): send the explanation filled in above
+        if on_explanation_chunk and not streamed and analysis["explanation"]:
+            on_explanation_chunk(analysis["explanation"])
+        
+        # Step 5: Overall analysis summary
+        analysis["analysis"] = self._create_analysis_summary(analysis)
+        
+        return analysis
+
+    def _new_analysis(self, question: str, student_answer: str, correct_answer: str) -> Dict:
+        """Empty analysis result"""
+        return {
             "question": question,
             "student_answer": student_answer,
             "correct_answer": correct_answer,
@@ -47,33 +109,48 @@ class ErrorAnalyzer:
             "hints": [],
             "similar_problems": []
         }
+
+    def _requested_fields(self) -> List[str]:
+        """Analysis fields enabled by configuration"""
+        fields = ["root_cause", "explanation"]
+        if INCLUDE_HINTS:
+            fields.append("hints")
+        if INCLUDE_SIMILAR_PROBLEMS:
+            fields.append("similar_problems")
+        return fields
+
+    def _missing_fields(self, analysis: Dict) -> List[str]:
+        return [field for field in self._requested_fields() if not analysis.get(field)]
+
+    def _fill_missing_fields(self, analysis: Dict, subject: Optional[str]) -> None:
+        """Generate any empty analysis field with its dedicated LLM call"""
+        question = analysis["question"]
+        student_answer = analysis["student_answer"]
+        correct_answer = analysis["correct_answer"]
         
         # Step 1: Identify the root cause
-        analysis["root_cause"] = self._identify_root_cause(
-            question, student_answer, correct_answer, subject
-        )
+        if not analysis["root_cause"]:
+            analysis["root_cause"] = self._identify_root_cause(
+                question, student_answer, correct_answer, subject
+            )
         
         # Step 2: Provide explanation
-        analysis["explanation"] = self._generate_explanation(
-            question, student_answer, correct_answer, analysis["root_cause"]
-        )
+        if not analysis["explanation"]:
+            analysis["explanation"] = self._generate_explanation(
+                question, student_answer, correct_answer, analysis["root_cause"]
+            )
         
         # Step 3: Generate hints for improvement
-        if INCLUDE_HINTS:
+        if INCLUDE_HINTS and not analysis["hints"]:
             analysis["hints"] = self._generate_hints(
                 question, student_answer, analysis["root_cause"]
             )
         
         # Step 4: Suggest similar problems
-        if INCLUDE_SIMILAR_PROBLEMS:
+        if INCLUDE_SIMILAR_PROBLEMS and not analysis["similar_problems"]:
             analysis["similar_problems"] = self._generate_similar_problems(
                 question, subject
             )
-        
-        # Step 5: Overall analysis summary
-        analysis["analysis"] = self._create_analysis_summary(analysis)
-        
-        return analysis
 
     def analyze_multiple_errors(
         self,
@@ -92,20 +169,191 @@ class ErrorAnalyzer:
         Returns:
             Pattern analysis with recommendations
         """
-        analyses = []
-        error_patterns = {}
-        subject_performance = {}
+        analyses = self._analyze_errors_batched(error_cases)
+        return self._summarize_error_analyses(error_cases, analyses)
+
+    def _analyze_errors_batched(self, error_cases: List[Dict]) -> List[Dict]:
+        """
+        Analyze many errors with concurrent LLM batches
+        
+        In single-call mode one structured request per error is sent in a
+        single batch. Otherwise the first batch requests root cause,
+        explanation and similar problems for every error and the second
+        requests hints, which need the root cause.
+        """
+        if self.single_call:
+            return self._analyze_errors_structured_batch(error_cases)
         
-        # Analyze each error
+        analyses = []
+        requests = []
         for error_case in error_cases:
-            analysis = self.analyze_error(
+            question = error_case.get("question")
+            student_answer = error_case.get("student_answer")
+            correct_answer = error_case.get("correct_answer")
+            subject = error_case.get("subject")
+            analyses.append(self._new_analysis(question, student_answer, correct_answer))
+            requests.append(self._build_root_cause_prompt(
+                question, student_answer, correct_answer, subject
+            ))
+            requests.append((
+                self._build_explanation_prompt(question, student_answer, correct_answer),
+                EXPLANATION_SYSTEM_MESSAGE
+            ))
+            if INCLUDE_SIMILAR_PROBLEMS:
+                requests.append(self._build_similar_problems_prompt(question, subject))
+        
+        per_case = 3 if INCLUDE_SIMILAR_PROBLEMS else 2
+        results = self.llm.generate_batch(requests)
+        for i, analysis in enumerate(analyses):
+            base = i * per_case
+            analysis["root_cause"] = results[base]["text"]
+            analysis["explanation"] = results[base + 1]["text"]
+            if INCLUDE_SIMILAR_PROBLEMS:
+                analysis["similar_problems"] = self._parse_numbered_lines(results[base + 2]["text"], 2)
+        
+        if INCLUDE_HINTS and analyses:
+            hint_results = self.llm.generate_batch([
+                self._build_hints_prompt(a["question"], a["student_answer"], a["root_cause"])
+                for a in analyses
+            ])
+            for analysis, result in zip(analyses, hint_results):
+                analysis["hints"] = self._parse_numbered_lines(result["text"], 3)
+        
+        for analysis in analyses:
+            analysis["analysis"] = self._create_analysis_summary(analysis)
+        
+        return analyses
+
+    def _analyze_errors_structured_batch(self, error_cases: List[Dict]) -> List[Dict]:
+        """Analyze many errors with one structured request each, sent as one batch"""
+        fields = self._requested_fields()
+        analyses = [
+            self._new_analysis(
                 error_case.get("question"),
                 error_case.get("student_answer"),
-                error_case.get("correct_answer"),
-                error_case.get("subject")
+                error_case.get("correct_answer")
             )
-            analyses.append(analysis)
+            for error_case in error_cases
+        ]
+        results = self.llm.generate_batch([
+            (
+                self._build_structured_prompt(
+                    error_case.get("question"),
+                    error_case.get("student_answer"),
+                    error_case.get("correct_answer"),
+                    error_case.get("subject"),
+                    fields
+                ),
+                STRUCTURED_ANALYSIS_SYSTEM_MESSAGE
+            )
+            for error_case in error_cases
+        ])
+        for error_case, analysis, result in zip(error_cases, analyses, results):
+            analysis.update(self._parse_analysis_json(result["text"], fields))
+            self._fill_missing_fields(analysis, error_case.get("subject"))
+            analysis["analysis"] = self._create_analysis_summary(analysis)
+        
+        return analyses
+
+    def _build_structured_prompt(
+        self,
+        question: str,
+        student_answer: str,
+        correct_answer: str,
+        subject: Optional[str],
+        fields: List[str]
+    ) -> str:
+        """Build prompt asking for the requested analysis fields as one JSON object"""
+        
+        descriptions = {
+            "root_cause": '"root_cause": 字串，用一句話簡潔地指出錯誤的根本原因',
+            "explanation": f'"explanation": 字串，清晰易懂地說明為什麼選項 {correct_answer} 是正確的，以及關鍵概念或規則；直接、簡潔，避免反覆推導',
+            "hints": '"hints": 3個字串的陣列（不要加編號），循序漸進的提示，從簡單到複雜，引導學生獨立找到正確答案',
+            "similar_problems": '"similar_problems": 2個字串的陣列（不要加編號），考察相同知識點、難度相近且獨立完整的練習題',
+        }
+        field_lines = "\n".join(f"- {descriptions[field]}" for field in fields)
+        
+        return f"""分析學生的錯誤，並以一個 JSON 物件回答：
+
+題目：{question}
+學生答案：{student_answer}
+正確答案：{correct_answer}
+科目：{subject or '未指定'}
+
+JSON 欄位：
+{field_lines}
+
+只輸出 JSON 物件，不要使用 Markdown 或加入其他文字。"""
+
+    @staticmethod
+    def _parse_analysis_json(response: str, fields: List[str]) -> Dict:
+        """
+        Parse a structured analysis response
+        
+        Tolerates Markdown code fences, text around the object and truncated
+        output (each field is then recovered individually). Fields that are
+        absent or empty are left out of the result.
+        
+        Args:
+            response: Raw LLM response
+            fields: Fields that were requested
             
+        Returns:
+            Dictionary with the fields that were found
+        """
+        if not response:
+            return {}
+        
+        data = None
+        text = re.sub(r'^```(?:json)?\s*|\s*```$', '', response.strip())
+        start = text.find('{')
+        end = text.rfind('}')
+        if start != -1 and end > start:
+            try:
+                data = json.loads(text[start:end + 1])
+            except ValueError:
+                data = None
+        
+        if not isinstance(data, dict):
+            # Recover string fields and string arrays one by one
+            data = {}
+            for field in fields:
+                match = re.search(r'"%s"\s*:\s*("(?:[^"\\]|\\.)*"|\[[^\]]*\])' % field, text, re.S)
+                if not match:
+                    continue
+                try:
+                    data[field] = json.loads(match.group(1))
+                except ValueError:
+                    continue
+        
+        parsed = {}
+        for field in fields:
+            value = data.get(field)
+            limit = ANALYSIS_FIELD_LIMITS[field]
+            if limit is None:
+                if isinstance(value, list):
+                    value = "\n".join(str(v) for v in value)
+                value = str(value).strip() if value else ""
+            else:
+                if isinstance(value, str):
+                    value = value.split('\n')
+                if not isinstance(value, list):
+                    value = []
+                value = [str(v).strip() for v in value if str(v).strip()][:limit]
+            if value:
+                parsed[field] = value
+        return parsed
+
+    def _summarize_error_analyses(
+        self,
+        error_cases: List[Dict],
+        analyses: List[Dict]
+    ) -> Dict[str, any]:
+        """Aggregate per-error analyses into patterns and a summary"""
+        error_patterns = {}
+        subject_performance = {}
+        
+        for error_case, analysis in zip(error_cases, analyses):
             # Track patterns
             root_cause = analysis["root_cause"]
             error_patterns[root_cause] = error_patterns.get(root_cause, 0) + 1
@@ -127,6 +375,89 @@ class ErrorAnalyzer:
             "summary": summary
         }
 
+    async def aanalyze_error(
+        self,
+        question: str,
+        student_answer: str,
+        correct_answer: str,
+        subject: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Analyze student error using concurrent LLM calls
+        
+        Same result as analyze_error. In single-call mode one structured
+        request is made first; remaining root cause, explanation and similar
+        problems are requested together and hints wait for the root cause.
+        """
+        analysis = self._new_analysis(question, student_answer, correct_answer)
+
+        if self.single_call:
+            fields = self._requested_fields()
+            response = await self.llm.agenerate_text(
+                self._build_structured_prompt(question, student_answer, correct_answer, subject, fields),
+                system_message=STRUCTURED_ANALYSIS_SYSTEM_MESSAGE
+            )
+            analysis.update(self._parse_analysis_json(response, fields))
+
+        async def root_cause() -> str:
+            if analysis["root_cause"]:
+                return analysis["root_cause"]
+            return await self.llm.agenerate_text(
+                self._build_root_cause_prompt(question, student_answer, correct_answer, subject)
+            )
+
+        async def explanation() -> str:
+            if analysis["explanation"]:
+                return analysis["explanation"]
+            return await self.llm.agenerate_text(
+                self._build_explanation_prompt(question, student_answer, correct_answer),
+                system_message=EXPLANATION_SYSTEM_MESSAGE
+            )
+
+        async def similar_problems() -> List[str]:
+            if not INCLUDE_SIMILAR_PROBLEMS or analysis["similar_problems"]:
+                return analysis["similar_problems"]
+            response = await self.llm.agenerate_text(
+                self._build_similar_problems_prompt(question, subject)
+            )
+            return self._parse_numbered_lines(response, 2)
+
+        root_cause_task = asyncio.ensure_future(root_cause())
+        explanation_task = asyncio.ensure_future(explanation())
+        similar_task = asyncio.ensure_future(similar_problems())
+
+        analysis["root_cause"] = await root_cause_task
+        if INCLUDE_HINTS and not analysis["hints"]:
+            response = await self.llm.agenerate_text(
+                self._build_hints_prompt(question, student_answer, analysis["root_cause"])
+            )
+            analysis["hints"] = self._parse_numbered_lines(response, 3)
+        analysis["explanation"] = await explanation_task
+        analysis["similar_problems"] = await similar_task
+
+        analysis["analysis"] = self._create_analysis_summary(analysis)
+        return analysis
+
+    async def aanalyze_multiple_errors(
+        self,
+        error_cases: List[Dict]
+    ) -> Dict[str, any]:
+        """
+        Analyze multiple errors concurrently to identify patterns
+        
+        Same arguments and result as analyze_multiple_errors.
+        """
+        analyses = await asyncio.gather(*[
+            self.aanalyze_error(
+                error_case.get("question"),
+                error_case.get("student_answer"),
+                error_case.get("correct_answer"),
+                error_case.get("subject")
+            )
+            for error_case in error_cases
+        ])
+        return self._summarize_error_analyses(error_cases, list(analyses))
+
     def generate_remedial_plan(
         self,
         student_name: str,
@@ -176,7 +507,19 @@ class ErrorAnalyzer:
     ) -> str:
         """Identify the root cause of the error"""
         
-        prompt = f"""分析以下錯誤的根本原因：
+        prompt = self._build_root_cause_prompt(question, student_answer, correct_answer, subject)
+        return self.llm.generate_text(prompt)
+
+    def _build_root_cause_prompt(
+        self,
+        question: str,
+        student_answer: str,
+        correct_answer: str,
+        subject: Optional[str]
+    ) -> str:
+        """Build prompt for root cause identification"""
+        
+        return f"""分析以下錯誤的根本原因：
 
     題目：{question}
     學生答案：{student_answer}
@@ -184,19 +527,39 @@ class ErrorAnalyzer:
     科目：{subject or '未指定'}
 
     請用一句話簡潔地指出根本原因。"""
-        
-        return self.llm.generate_text(prompt)
 
     def _generate_explanation(
         self,
         question: str,
         student_answer: str,
         correct_answer: str,
-        root_cause: str
+        root_cause: str,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Generate detailed explanation of the error (streamed to on_chunk if given)"""
+        
+        prompt = self._build_explanation_prompt(question, student_answer, correct_answer)
+        if on_chunk is None:
+            return self.llm.generate_text(
+                prompt,
+                system_message=EXPLANATION_SYSTEM_MESSAGE
+            )
+        
+        parts = []
+        for chunk in self.llm.generate_stream(prompt, system_message=EXPLANATION_SYSTEM_MESSAGE):
+            parts.append(chunk)
+            on_chunk(chunk)
+        return "".join(parts).strip()
+
+    def _build_explanation_prompt(
+        self,
+        question: str,
+        student_answer: str,
+        correct_answer: str
     ) -> str:
-        """Generate detailed explanation of the error"""
+        """Build prompt for error explanation"""
         
-        prompt = f"""為學生解釋他們的錯誤：
+        return f"""為學生解釋他們的錯誤：
 
 題目：{question}
 學生選擇：{student_answer}
@@ -207,11 +570,6 @@ class ErrorAnalyzer:
 2. 關鍵概念或規則說明
 
 解釋要直接、簡潔，避免反覆推導。"""
-        
-        return self.llm.generate_text(
-            prompt,
-            system_message="你是一位耐心的教師。根據給定的正確答案提供簡潔的解釋，不要提出假設性問題或要求提供信息。"
-        )
 
     def _generate_hints(
         self,
@@ -221,7 +579,19 @@ class ErrorAnalyzer:
     ) -> List[str]:
         """Generate helpful hints for improvement"""
         
-        prompt = f"""為幫助學生改正錯誤，請生成3個循序漸進的提示：
+        prompt = self._build_hints_prompt(question, student_answer, root_cause)
+        response = self.llm.generate_text(prompt)
+        return self._parse_numbered_lines(response, 3)
+
+    def _build_hints_prompt(
+        self,
+        question: str,
+        student_answer: str,
+        root_cause: str
+    ) -> str:
+        """Build prompt for improvement hints"""
+        
+        return f"""為幫助學生改正錯誤，請生成3個循序漸進的提示：
 
     題目：{question}
     學生答案：{student_answer}
@@ -229,16 +599,6 @@ class ErrorAnalyzer:
 
     提示應該從簡單到複雜，引導學生獨立找到正確答案。
     請以編號列表形式列出。"""
-        
-        response = self.llm.generate_text(prompt)
-        
-        # Parse hints from response
-        hints = []
-        for line in response.split('\n'):
-            if line.strip():
-                hints.append(line.strip())
-        
-        return hints[:3]
 
     def _generate_similar_problems(
         self,
@@ -247,9 +607,20 @@ class ErrorAnalyzer:
     ) -> List[str]:
         """Generate similar problems for practice"""
         
+        prompt = self._build_similar_problems_prompt(question, subject)
+        response = self.llm.generate_text(prompt)
+        return self._parse_numbered_lines(response, 2)
+
+    def _build_similar_problems_prompt(
+        self,
+        question: str,
+        subject: Optional[str]
+    ) -> str:
+        """Build prompt for similar practice problems"""
+        
         subject_str = subject or "相关"
         
-        prompt = f"""基於以下題目，生成2個類似的練習題目：
+        return f"""基於以下題目，生成2個類似的練習題目：
 
     原題：{question}
 
@@ -260,16 +631,16 @@ class ErrorAnalyzer:
     4. 題目獨立完整
 
     請以編號列表形式列出。"""
-        
-        response = self.llm.generate_text(prompt)
-        
-        # Parse problems from response
-        problems = []
+
+    @staticmethod
+    def _parse_numbered_lines(response: str, limit: int) -> List[str]:
+        """Split a list-style response into at most `limit` non-empty lines"""
+        items = []
         for line in response.split('\n'):
             if line.strip():
-                problems.append(line.strip())
+                items.append(line.strip())
         
-        return problems[:2]
+        return items[:limit]
 
     def _create_analysis_summary(self, analysis: Dict) -> str:
         """Create a comprehensive analysis summary"""
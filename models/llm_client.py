@@ -3,7 +3,14 @@ LLM Client for interacting with OpenAI or Vertex AI (Gemini)
 """
 import os
 import json
-from typing import Optional, Dict, List
+import time
+import asyncio
+import contextvars
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Iterator, Union, Tuple, Callable, Awaitable
 from config import (
     LLM_PROVIDER,
     OPENAI_API_KEY,
@@ -17,21 +24,82 @@ from config import (
     GENERATIVEAI_MODEL_NAME,
     SERVICE_ACCOUNT_JSON_PATH,
     SERVICE_ACCOUNT_INFO,
+    LLM_CACHE_ENABLED,
+    LLM_MAX_CONCURRENCY,
+    LLM_PROVIDER_CONCURRENCY,
+    LLM_BATCH_MAX_WORKERS,
+    LLM_MAX_RETRIES,
+)
+from models.response_cache import ResponseCache, get_default_cache
+from models.single_flight import SingleFlight, get_default_single_flight
+from models.resilience import (
+    ERROR_FATAL,
+    ERROR_CIRCUIT_OPEN,
+    LLMCallError,
+    backoff_delay,
+    classify_error,
+    get_circuit_breaker,
+    make_result,
 )
 
 # Lazy imports inside client to avoid hard dependency
 
+# asyncio.Semaphore is bound to the event loop it is first used on, so keep one
+# semaphore per (event loop, provider); entries vanish with their loop.
+_loop_semaphores: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _provider_semaphore(provider: str, limit: Optional[int] = None) -> asyncio.Semaphore:
+    """Get the concurrency semaphore for a provider on the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphores = _loop_semaphores.setdefault(loop, {})
+    if provider not in semaphores:
+        size = limit or LLM_PROVIDER_CONCURRENCY.get(provider, LLM_MAX_CONCURRENCY)
+        semaphores[provider] = asyncio.Semaphore(max(1, size))
+    return semaphores[provider]
+
+
+class CallCounter:
+    """Provider calls made on behalf of one request (see LLMClient.count_calls)"""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def add(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+
+# Counter of the request running in this context; asyncio tasks and batch
+# workers inherit it, background threads (e.g. question pool refills) do not
+_request_calls: contextvars.ContextVar = contextvars.ContextVar("llm_request_calls", default=None)
+
 
 class LLMClient:
     """Client for LLM API interactions"""
 
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        use_cache: bool = LLM_CACHE_ENABLED,
+        max_concurrency: Optional[int] = None,
+        single_flight: Optional[SingleFlight] = None
+    ):
         """
         Initialize LLM client
         
         Args:
             api_key: API key (OpenAI) if using OpenAI
             model: Model name (OpenAI or Gemini)
+            cache: Response cache (defaults to the shared process-wide cache)
+            use_cache: Enable response caching
+            max_concurrency: Max in-flight async requests for this provider
+                             (defaults to LLM_PROVIDER_CONCURRENCY)
+            single_flight: Coalescer for identical concurrent requests
+                           (defaults to the shared process-wide instance)
         """
         self.provider = LLM_PROVIDER.lower()
         
@@ -50,6 +118,13 @@ class LLMClient:
         
         self.temperature = TEMPERATURE
         self.max_tokens = MAX_TOKENS
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        self.provider_calls = 0
+        self._stats_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self.max_retries = LLM_MAX_RETRIES
+        self.breaker = get_circuit_breaker(self.provider)
+        self.single_flight = single_flight or get_default_single_flight()
         self._init_provider()
 
     def _init_provider(self):
@@ -124,7 +199,8 @@ class LLMClient:
         prompt: str,
         system_message: Optional[str] = None,
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True
     ) -> str:
         """
         Generate text using LLM
@@ -134,61 +210,425 @@ class LLMClient:
             system_message: System message for context
             temperature: Sampling temperature
             max_tokens: Maximum response length
+            use_cache: Serve/store this request through the response cache
             
         Returns:
-            Generated text response
+            Generated text response ("" if the call failed; use
+            generate_result to see why)
+        """
+        return self.generate_result(
+            prompt, system_message, temperature, max_tokens, use_cache
+        )["text"]
+
+    def generate_result(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Dict:
+        """
+        Generate text using LLM and report how the call went
+        
+        Same arguments as generate_text. Rate-limit and transient failures
+        are retried with jittered exponential backoff; while the provider's
+        circuit breaker is open the call fails immediately.
+        
+        Identical concurrent requests (same cache key) share one provider
+        call; callers that joined another's call get shared=True.
+        
+        Returns:
+            Dictionary with keys ok, text, error, error_type (rate_limit /
+            transient / fatal / circuit_open), attempts, cached and shared
+        """
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
+
+        def call() -> Dict:
+            return self._call_with_retry(
+                lambda: self._call_provider(prompt, system_message, temperature, max_tokens)
+            )
+
+        if not use_cache:
+            return call()
+
+        key = self.cache_key(prompt, system_message, temperature, max_tokens)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return make_result(cached, cached=True)
+
+        def call_and_store() -> Dict:
+            result = call()
+            # Never cache failures
+            if self.cache and result["ok"]:
+                self.cache.set(key, result["text"])
+            return result
+
+        result, shared = self.single_flight.do(key, call_and_store)
+        return dict(result, shared=shared)
+
+    def is_available(self) -> bool:
+        """
+        Check whether LLM calls can currently be attempted
+        
+        Returns:
+            False if the provider is not initialized or its circuit is open
         """
+        return self._provider_ready() and not self.breaker.is_open()
+
+    def _provider_ready(self) -> bool:
+        if self.provider == "openai":
+            return bool(self._openai)
+        if self.provider == "vertexai":
+            return bool(self._GenerativeModel)
+        if self.provider == "generativeai":
+            return bool(self._genai)
+        return False
+
+    def _call_with_retry(self, call: Callable[[], str]) -> Dict:
+        """Run a provider call with classified retries and circuit breaking"""
+        attempts = 0
+        while True:
+            if not self.breaker.allow_request():
+                return make_result(
+                    error=f"{self.provider} circuit open, call skipped",
+                    error_type=ERROR_CIRCUIT_OPEN,
+                    attempts=attempts
+                )
+            attempts += 1
+            try:
+                text = call()
+            except Exception as e:
+                error_type = classify_error(e)
+                if error_type == ERROR_FATAL:
+                    # Request-specific failure; says nothing about provider health
+                    self.breaker.release()
+                    print(f"Error calling LLM ({self.provider}): {str(e)}")
+                    return make_result(error=str(e), error_type=error_type, attempts=attempts)
+                self.breaker.record_failure()
+                if attempts > self.max_retries:
+                    print(f"Error calling LLM ({self.provider}, {attempts} attempts): {str(e)}")
+                    return make_result(error=str(e), error_type=error_type, attempts=attempts)
+                time.sleep(backoff_delay(attempts, error_type))
+                continue
+            self.breaker.record_success()
+            if not text:
+                return make_result(error="empty response", error_type=ERROR_FATAL, attempts=attempts)
+            return make_result(text, attempts=attempts)
+
+    def cache_key(
+        self,
+        prompt: str,
+        system_message: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Build the response-cache key for a request on this client"""
+        return ResponseCache.make_key(
+            self.provider, self.model, system_message, prompt, temperature, max_tokens
+        )
+
+    def cache_stats(self) -> Dict:
+        """
+        Get response cache statistics
+        
+        Returns:
+            Cache statistics plus the number of real provider calls made
+        """
+        stats = self.cache.stats() if self.cache else {}
+        stats["provider_calls"] = self.provider_calls
+        stats["circuit"] = self.breaker.stats()
+        stats["single_flight"] = self.single_flight.stats()
+        return stats
+
+    def _count_provider_call(self) -> None:
+        with self._stats_lock:
+            self.provider_calls += 1
+        counter = _request_calls.get()
+        if counter is not None:
+            counter.add()
+
+    @staticmethod
+    @contextmanager
+    def count_calls() -> Iterator[CallCounter]:
+        """
+        Count the provider calls made by the code inside the with block
+        
+        Unlike differences of provider_calls, calls made concurrently by other
+        requests or background threads are not included.
+        
+        Yields:
+            CallCounter whose .calls is the number of provider calls so far
+        """
+        counter = CallCounter()
+        token = _request_calls.set(counter)
+        try:
+            yield counter
+        finally:
+            _request_calls.reset(token)
+
+    def generate_batch(
+        self,
+        requests: List[Union[str, Tuple, Dict]],
+        max_workers: Optional[int] = None,
+        as_completed_order: bool = False
+    ) -> Union[List[Dict], Iterator[Dict]]:
+        """
+        Run many generate_text requests concurrently on a thread pool
+        
+        Args:
+            requests: Each item is a prompt string, a tuple
+                      (prompt, system_message, params) or a dict with keys
+                      prompt / system_message / params; params may hold
+                      temperature, max_tokens and use_cache
+            max_workers: Thread pool size (defaults to LLM_BATCH_MAX_WORKERS)
+            as_completed_order: Return an iterator yielding results as they
+                                finish instead of an ordered list
+            
+        Returns:
+            Result dicts {"index", "prompt", "text", "error", "error_type"}
+            in request order, or an iterator over them in completion order
+        """
+        normalized = [self._normalize_batch_request(r) for r in requests]
+        workers = max(1, min(max_workers or LLM_BATCH_MAX_WORKERS, len(normalized) or 1))
+        
+        if as_completed_order:
+            return self._iter_batch(normalized, workers)
+        
+        results: List[Optional[Dict]] = [None] * len(normalized)
+        for result in self._iter_batch(normalized, workers):
+            results[result["index"]] = result
+        return results
+
+    def _iter_batch(self, normalized: List[Dict], workers: int) -> Iterator[Dict]:
+        """Yield batch results in completion order"""
+        if not normalized:
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Each worker runs in a copy of the caller's context (request call counter)
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._run_batch_item, i, item): i
+                for i, item in enumerate(normalized)
+            }
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _run_batch_item(self, index: int, item: Dict) -> Dict:
+        """Execute one batch request, capturing its error instead of raising"""
+        result = {
+            "index": index,
+            "prompt": item["prompt"],
+            "text": "",
+            "error": None,
+            "error_type": None
+        }
+        try:
+            outcome = self.generate_result(
+                item["prompt"],
+                system_message=item["system_message"],
+                **item["params"]
+            )
+            result["text"] = outcome["text"]
+            result["error"] = outcome["error"]
+            result["error_type"] = outcome["error_type"]
+        except Exception as e:
+            result["error"] = str(e)
+            result["error_type"] = ERROR_FATAL
+        return result
+
+    @staticmethod
+    def _normalize_batch_request(request: Union[str, Tuple, Dict]) -> Dict:
+        """Convert a batch request item to {"prompt", "system_message", "params"}"""
+        if isinstance(request, str):
+            return {"prompt": request, "system_message": None, "params": {}}
+        if isinstance(request, dict):
+            return {
+                "prompt": request["prompt"],
+                "system_message": request.get("system_message"),
+                "params": dict(request.get("params") or {})
+            }
+        prompt = request[0]
+        system_message = request[1] if len(request) > 1 else None
+        params = dict(request[2]) if len(request) > 2 and request[2] else {}
+        return {"prompt": prompt, "system_message": system_message, "params": params}
+
+    def _call_provider(
+        self,
+        prompt: str,
+        system_message: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Send a single completion request to the configured provider (raises on failure)"""
+        self._count_provider_call()
         if self.provider == "openai" and self._openai:
             messages = []
             if system_message:
                 messages.append({"role": "system", "content": system_message})
             messages.append({"role": "user", "content": prompt})
-            try:
-                response = self._openai.ChatCompletion.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature or self.temperature,
-                    max_tokens=max_tokens or self.max_tokens
-                )
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                print(f"Error calling LLM: {str(e)}")
-                return ""
+            response = self._openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            return response.choices[0].message.content.strip()
         elif self.provider == "vertexai" and self._GenerativeModel:
-            try:
-                model = self._GenerativeModel(self.model)
-                sys_prompt = system_message or ""
-                full_prompt = (sys_prompt + "\n\n" + prompt).strip()
-                resp = model.generate_content(
-                    full_prompt,
-                    generation_config={
-                        "temperature": temperature or self.temperature,
-                        "max_output_tokens": max_tokens or self.max_tokens,
-                    },
-                )
-                return (resp.text or "").strip()
-            except Exception as e:
-                print(f"Error calling LLM (Vertex AI): {str(e)}")
-                return ""
+            model = self._GenerativeModel(self.model)
+            sys_prompt = system_message or ""
+            full_prompt = (sys_prompt + "\n\n" + prompt).strip()
+            resp = model.generate_content(
+                full_prompt,
+                generation_config={
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens,
+                },
+            )
+            return (resp.text or "").strip()
         elif self.provider == "generativeai" and self._genai:
+            model = self._genai.GenerativeModel(self.model)
+            sys_prompt = system_message or ""
+            full_prompt = (sys_prompt + "\n\n" + prompt).strip()
+            response = model.generate_content(
+                full_prompt,
+                generation_config=self._genai.types.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens,
+                ),
+            )
+            return (response.text or "").strip()
+        else:
+            raise LLMCallError("LLM provider not initialized", ERROR_FATAL)
+
+    def generate_stream(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Iterator[str]:
+        """
+        Generate text using LLM, yielding chunks as they arrive
+        
+        Args:
+            prompt: User prompt
+            system_message: System message for context
+            temperature: Sampling temperature
+            max_tokens: Maximum response length
+            use_cache: Serve/store this request through the response cache
+            
+        Yields:
+            Text chunks; joined they equal the generate_text result. A
+            failure before the first chunk is retried like generate_text;
+            a failure mid-stream ends the stream early.
+        """
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
+
+        key = None
+        if use_cache and self.cache:
+            key = self.cache_key(prompt, system_message, temperature, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        attempts = 0
+        while True:
+            if not self.breaker.allow_request():
+                print(f"Error calling LLM ({self.provider}): circuit open, call skipped")
+                return
+            attempts += 1
+            started = False
             try:
-                model = self._genai.GenerativeModel(self.model)
-                sys_prompt = system_message or ""
-                full_prompt = (sys_prompt + "\n\n" + prompt).strip()
-                response = model.generate_content(
-                    full_prompt,
-                    generation_config=self._genai.types.GenerationConfig(
-                        temperature=temperature or self.temperature,
-                        max_output_tokens=max_tokens or self.max_tokens,
-                    ),
-                )
-                return (response.text or "").strip()
+                for chunk in self._stream_provider(prompt, system_message, temperature, max_tokens):
+                    if not started:
+                        # Match generate_text, which strips leading whitespace
+                        chunk = chunk.lstrip()
+                        if not chunk:
+                            continue
+                        started = True
+                    parts.append(chunk)
+                    yield chunk
             except Exception as e:
-                print(f"Error calling LLM (Google Generative AI): {str(e)}")
-                return ""
+                error_type = classify_error(e)
+                if error_type == ERROR_FATAL:
+                    self.breaker.release()
+                else:
+                    self.breaker.record_failure()
+                if error_type == ERROR_FATAL or started or attempts > self.max_retries:
+                    print(f"Error calling LLM ({self.provider}): {str(e)}")
+                    return
+                time.sleep(backoff_delay(attempts, error_type))
+                continue
+            self.breaker.record_success()
+            break
+
+        text = "".join(parts).strip()
+        if key and text:
+            self.cache.set(key, text)
+
+    def _stream_provider(
+        self,
+        prompt: str,
+        system_message: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> Iterator[str]:
+        """Stream a single completion request from the configured provider (raises on failure)"""
+        self._count_provider_call()
+        if self.provider == "openai" and self._openai:
+            messages = []
+            if system_message:
+                messages.append({"role": "system", "content": system_message})
+            messages.append({"role": "user", "content": prompt})
+            response = self._openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            for chunk in response:
+                content = chunk.choices[0].delta.get("content")
+                if content:
+                    yield content
+        elif self.provider == "vertexai" and self._GenerativeModel:
+            model = self._GenerativeModel(self.model)
+            sys_prompt = system_message or ""
+            full_prompt = (sys_prompt + "\n\n" + prompt).strip()
+            responses = model.generate_content(
+                full_prompt,
+                generation_config={
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens,
+                },
+                stream=True,
+            )
+            for chunk in responses:
+                if chunk.text:
+                    yield chunk.text
+        elif self.provider == "generativeai" and self._genai:
+            model = self._genai.GenerativeModel(self.model)
+            sys_prompt = system_message or ""
+            full_prompt = (sys_prompt + "\n\n" + prompt).strip()
+            response = model.generate_content(
+                full_prompt,
+                generation_config=self._genai.types.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens,
+                ),
+                stream=True,
+            )
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
         else:
-            print("LLM provider not initialized")
-            return ""
+            raise LLMCallError("LLM provider not initialized", ERROR_FATAL)
 
     def generate_multiple(
         self,
@@ -209,7 +649,8 @@ class LLMClient:
         """
         responses = []
         for _ in range(num_variations):
-            response = self.generate_text(prompt, system_message)
+            # Variations must be fresh samples, so bypass the response cache
+            response = self.generate_text(prompt, system_message, use_cache=False)
             if response:
                 responses.append(response)
         return responses
@@ -222,39 +663,211 @@ class LLMClient:
             messages: List of message dictionaries with 'role' and 'content'
             
         Returns:
-            Assistant response
+            Assistant response ("" if the call failed)
         """
+        return self._call_with_retry(lambda: self._chat_provider(messages))["text"]
+
+    def _chat_provider(self, messages: List[Dict[str, str]]) -> str:
+        """Send a chat request to the configured provider (raises on failure)"""
+        self._count_provider_call()
         if self.provider == "openai" and self._openai:
-            try:
-                response = self._openai.ChatCompletion.create(
-                    model=self.model,
-                    messages=messages,
+            response = self._openai.ChatCompletion.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            return response.choices[0].message.content.strip()
+        elif self.provider == "vertexai" and self._GenerativeModel:
+            # Convert chat messages into a single prompt for simplicity
+            prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+            model = self._GenerativeModel(self.model)
+            resp = model.generate_content(
+                prompt,
+                generation_config={
+                    "temperature": self.temperature,
+                    "max_output_tokens": self.max_tokens,
+                },
+            )
+            return (resp.text or "").strip()
+        elif self.provider == "generativeai" and self._genai:
+            prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+            model = self._genai.GenerativeModel(self.model)
+            response = model.generate_content(
+                prompt,
+                generation_config=self._genai.types.GenerationConfig(
                     temperature=self.temperature,
-                    max_tokens=self.max_tokens
+                    max_output_tokens=self.max_tokens,
+                ),
+            )
+            return (response.text or "").strip()
+        else:
+            raise LLMCallError("LLM provider not initialized for chat", ERROR_FATAL)
+
+    async def agenerate_text(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Generate text using LLM without blocking the event loop
+        
+        Same arguments and return value as generate_text. Concurrent calls are
+        bounded by the provider semaphore of the running event loop.
+        """
+        result = await self.agenerate_result(
+            prompt, system_message, temperature, max_tokens, use_cache
+        )
+        return result["text"]
+
+    async def agenerate_result(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Dict:
+        """
+        Async counterpart of generate_result
+        """
+        temperature = temperature or self.temperature
+        max_tokens = max_tokens or self.max_tokens
+
+        async def call() -> Dict:
+            return await self._acall_with_retry(
+                lambda: self._acall_provider(prompt, system_message, temperature, max_tokens)
+            )
+
+        if not use_cache:
+            return await call()
+
+        key = self.cache_key(prompt, system_message, temperature, max_tokens)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return make_result(cached, cached=True)
+
+        async def call_and_store() -> Dict:
+            result = await call()
+            if self.cache and result["ok"]:
+                self.cache.set(key, result["text"])
+            return result
+
+        result, shared = await self.single_flight.ado(key, call_and_store)
+        return dict(result, shared=shared)
+
+    async def achat(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Multi-turn conversation without blocking the event loop
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content'
+            
+        Returns:
+            Assistant response ("" if the call failed)
+        """
+        result = await self._acall_with_retry(lambda: self._achat_provider(messages))
+        return result["text"]
+
+    async def _acall_with_retry(self, make_call: Callable[[], Awaitable[str]]) -> Dict:
+        """Async counterpart of _call_with_retry; the semaphore is not held while backing off"""
+        attempts = 0
+        while True:
+            if not self.breaker.allow_request():
+                return make_result(
+                    error=f"{self.provider} circuit open, call skipped",
+                    error_type=ERROR_CIRCUIT_OPEN,
+                    attempts=attempts
                 )
-                return response.choices[0].message.content.strip()
-            except Exception as e:
-                print(f"Error in chat: {str(e)}")
-                return ""
-        elif self.provider == "vertexai" and self._GenerativeModel:
+            attempts += 1
             try:
-                # Convert chat messages into a single prompt for simplicity
-                prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
-                model = self._GenerativeModel(self.model)
-                resp = model.generate_content(
-                    prompt,
-                    generation_config={
-                        "temperature": self.temperature,
-                        "max_output_tokens": self.max_tokens,
-                    },
-                )
-                return (resp.text or "").strip()
+                async with _provider_semaphore(self.provider, self.max_concurrency):
+                    text = await make_call()
             except Exception as e:
-                print(f"Error in chat (Vertex AI): {str(e)}")
-                return ""
-        else:
-            print("LLM provider not initialized for chat")
-            return ""
+                error_type = classify_error(e)
+                if error_type == ERROR_FATAL:
+                    self.breaker.release()
+                    print(f"Error calling LLM ({self.provider}): {str(e)}")
+                    return make_result(error=str(e), error_type=error_type, attempts=attempts)
+                self.breaker.record_failure()
+                if attempts > self.max_retries:
+                    print(f"Error calling LLM ({self.provider}, {attempts} attempts): {str(e)}")
+                    return make_result(error=str(e), error_type=error_type, attempts=attempts)
+                await asyncio.sleep(backoff_delay(attempts, error_type))
+                continue
+            self.breaker.record_success()
+            if not text:
+                return make_result(error="empty response", error_type=ERROR_FATAL, attempts=attempts)
+            return make_result(text, attempts=attempts)
+
+    async def _achat_provider(self, messages: List[Dict[str, str]]) -> str:
+        """Send a chat request to the configured provider (async, raises on failure)"""
+        if self.provider == "openai" and self._openai:
+            self._count_provider_call()
+            response = await self._openai.ChatCompletion.acreate(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            return response.choices[0].message.content.strip()
+        # Gemini providers take chat history as a single prompt
+        prompt = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+        return await self._acall_gemini(prompt, self.temperature, self.max_tokens)
+
+    async def _acall_provider(
+        self,
+        prompt: str,
+        system_message: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Send a single completion request to the configured provider (async, raises on failure)"""
+        if self.provider == "openai" and self._openai:
+            self._count_provider_call()
+            messages = []
+            if system_message:
+                messages.append({"role": "system", "content": system_message})
+            messages.append({"role": "user", "content": prompt})
+            response = await self._openai.ChatCompletion.acreate(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            return response.choices[0].message.content.strip()
+        sys_prompt = system_message or ""
+        full_prompt = (sys_prompt + "\n\n" + prompt).strip()
+        return await self._acall_gemini(full_prompt, temperature, max_tokens)
+
+    async def _acall_gemini(self, full_prompt: str, temperature: float, max_tokens: int) -> str:
+        """Call Vertex AI or Google Generative AI with their native async API"""
+        self._count_provider_call()
+        if self.provider == "vertexai" and self._GenerativeModel:
+            model = self._GenerativeModel(self.model)
+            resp = await model.generate_content_async(
+                full_prompt,
+                generation_config={
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens,
+                },
+            )
+            return (resp.text or "").strip()
+        elif self.provider == "generativeai" and self._genai:
+            model = self._genai.GenerativeModel(self.model)
+            response = await model.generate_content_async(
+                full_prompt,
+                generation_config=self._genai.types.GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens,
+                ),
+            )
+            return (response.text or "").strip()
+        raise LLMCallError("LLM provider not initialized", ERROR_FATAL)
 
     def create_system_prompt(self, context: str, task: str) -> str:
         """
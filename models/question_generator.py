@@ -1,23 +1,57 @@
 """
 Question Generator - Creates personalized learning questions
 """
+import asyncio
+import json
+import re
 from typing import Optional, List, Dict
 from models.llm_client import LLMClient
-from config import NUM_QUESTIONS_PER_SESSION, SUBJECTS, SUBJECT_TOPICS
+from models.question_pool import QuestionPool
+from utils.used_questions import UsedQuestionSet
+from config import (
+    MAX_TOKENS,
+    NUM_QUESTIONS_PER_SESSION,
+    QUESTION_BATCH_MODE,
+    QUESTION_BATCH_RETRIES,
+    QUESTION_POOL_WARM_MAX_KEYS,
+    SUBJECTS,
+    SUBJECT_TOPICS,
+)
+
+
+QUESTION_SYSTEM_MESSAGE = "你是一位優秀的教師，設計教學問題。生成一個清晰、有趣且能幫助學生學習的題目，並嚴格依照指定格式輸出。"
+QUESTION_SET_SYSTEM_MESSAGE = "你是一位優秀的教師，設計教學問題。生成清晰、有趣且能幫助學生學習的選擇題，只輸出有效的 JSON 陣列，不要加入其他文字。"
+
+# Output budget for one question inside a structured question-set response
+TOKENS_PER_BATCH_QUESTION = 400
 
 
 class QuestionGenerator:
     """Generate personalized questions based on student learning records"""
 
-    def __init__(self, llm_client: LLMClient):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        batch_mode: bool = QUESTION_BATCH_MODE,
+        pool: Optional[QuestionPool] = None
+    ):
         """
         Initialize question generator
         
         Args:
             llm_client: LLM client instance
+            batch_mode: Request each subject's questions as one JSON array
+                        instead of one prompt per question
+            pool: Pre-generated question pool served before live generation
+                  (refilled with this generator if it has no refill function)
         """
         self.llm = llm_client
+        self.batch_mode = batch_mode
+        self.pool = pool
+        if pool is not None and pool.refill is None:
+            pool.refill = self._generate_pool_questions
         self.question_count = 0
+        self.last_errors: List[Dict] = []  # Failed LLM results from the latest generation
 
     def generate_questions(
         self,
@@ -46,6 +80,328 @@ class QuestionGenerator:
             List of question dictionaries
         """
         num_questions = num_questions or NUM_QUESTIONS_PER_SESSION
+        subject, difficulty = self._resolve_subject_and_difficulty(
+            student_profile, subject, difficulty
+        )
+        
+        return self._generate_for_plan(
+            student_profile, [(subject, difficulty, num_questions)]
+        )
+
+    def _generate_for_plan(
+        self,
+        student_profile: Dict,
+        plan: List[tuple]
+    ) -> List[Dict[str, str]]:
+        """
+        Generate questions for several subjects in one concurrent batch
+        
+        Pooled questions are used first; only the shortfall is generated live.
+        
+        Args:
+            student_profile: Student information
+            plan: List of (subject, difficulty, num_questions)
+            
+        Returns:
+            Questions in plan order
+        """
+        self.last_errors = []
+        pooled = [
+            self._take_from_pool(student_profile, subject, difficulty, count)
+            for subject, difficulty, count in plan
+        ]
+        live_plan = [
+            (subject, difficulty, count - len(items))
+            for (subject, difficulty, count), items in zip(plan, pooled)
+        ]
+        
+        live = [[] for _ in plan]
+        if any(count > 0 for _, _, count in live_plan):
+            if self.batch_mode:
+                live = self._generate_question_sets(student_profile, live_plan)
+            else:
+                live = self._generate_single_questions(student_profile, live_plan)
+        
+        return self._assemble_questions(student_profile, plan, pooled, live)
+
+    def _assemble_questions(
+        self,
+        student_profile: Dict,
+        plan: List[tuple],
+        pooled: List[List[Dict]],
+        live: List[List[Dict]]
+    ) -> List[Dict[str, str]]:
+        """Turn parsed questions (pooled first, then live) into question entries"""
+        questions = []
+        for (subject, difficulty, count), pooled_items, live_items in zip(plan, pooled, live):
+            for i, parsed in enumerate(pooled_items + live_items):
+                questions.append(self._make_question_entry(
+                    parsed, i, student_profile, subject, difficulty
+                ))
+            self.question_count += count
+        return questions
+
+    def _generate_single_questions(
+        self,
+        student_profile: Dict,
+        plan: List[tuple]
+    ) -> List[List[Dict]]:
+        """
+        Generate questions with one prompt per question, all in one batch
+        
+        Args:
+            student_profile: Student information
+            plan: List of (subject, difficulty, num_questions)
+            
+        Returns:
+            Valid parsed questions for each plan entry
+        """
+        requests = []
+        for subject, difficulty, count in plan:
+            for i in range(count):
+                prompt = self._build_question_prompt(
+                    student_profile, subject, difficulty, i + 1
+                )
+                # Live generation must not replay a cached quiz
+                requests.append((prompt, QUESTION_SYSTEM_MESSAGE, {"use_cache": False}))
+        
+        results = self.llm.generate_batch(requests)
+        
+        parsed_items = []
+        position = 0
+        for subject, difficulty, count in plan:
+            items = []
+            for i in range(count):
+                result = results[position]
+                position += 1
+                if result["error"]:
+                    self.last_errors.append(result)
+                    continue
+                parsed = self._parse_multiple_choice(result["text"])
+                if parsed["valid"]:
+                    items.append(parsed)
+            parsed_items.append(items)
+        
+        return parsed_items
+
+    def _generate_question_sets(
+        self,
+        student_profile: Dict,
+        plan: List[tuple]
+    ) -> List[List[Dict]]:
+        """
+        Generate each subject's questions with one structured LLM call
+        
+        All subjects are requested in one concurrent batch. Items that fail
+        validation are re-requested (only the missing count) for up to
+        QUESTION_BATCH_RETRIES extra rounds.
+        
+        Args:
+            student_profile: Student information
+            plan: List of (subject, difficulty, num_questions)
+            
+        Returns:
+            Valid parsed questions for each plan entry
+        """
+        accepted = [[] for _ in plan]
+        for _ in range(QUESTION_BATCH_RETRIES + 1):
+            pending = [i for i, (_, _, count) in enumerate(plan) if len(accepted[i]) < count]
+            if not pending:
+                break
+            
+            requests = []
+            for i in pending:
+                subject, difficulty, count = plan[i]
+                requests.append(self._question_set_request(
+                    student_profile, subject, difficulty, count - len(accepted[i]),
+                    offset=len(accepted[i]), avoid=accepted[i]
+                ))
+            
+            for i, result in zip(pending, self.llm.generate_batch(requests)):
+                if result["error"]:
+                    self.last_errors.append(result)
+                    continue
+                self._accept_question_items(
+                    accepted[i], self._parse_question_set(result["text"]), plan[i][2]
+                )
+        
+        return accepted
+
+    def _question_set_request(
+        self,
+        student_profile: Dict,
+        subject: str,
+        difficulty: str,
+        count: int,
+        offset: int = 0,
+        avoid: Optional[List[Dict]] = None,
+        topics: Optional[List[str]] = None
+    ) -> tuple:
+        """Batch request item (prompt, system message, params) for a question set"""
+        prompt = self._build_question_set_prompt(
+            student_profile, subject, difficulty, count, offset, avoid or [], topics
+        )
+        # Fresh questions every time: the prompt is deterministic for an unchanged profile
+        params = {
+            "max_tokens": max(MAX_TOKENS, TOKENS_PER_BATCH_QUESTION * count),
+            "use_cache": False
+        }
+        return (prompt, QUESTION_SET_SYSTEM_MESSAGE, params)
+
+    def _accept_question_items(self, accepted: List[Dict], items: List, count: int) -> None:
+        """Append valid, non-duplicate items to accepted until count is reached"""
+        seen = {item["question"] for item in accepted}
+        for item in items:
+            if len(accepted) >= count:
+                break
+            parsed = self._validate_question_item(item)
+            if parsed is None or parsed["question"] in seen:
+                continue
+            seen.add(parsed["question"])
+            accepted.append(parsed)
+
+    def _take_from_pool(
+        self,
+        student_profile: Dict,
+        subject: str,
+        difficulty: str,
+        count: int
+    ) -> List[Dict]:
+        """Take up to count pre-generated questions the student has not seen, across the subject's topics"""
+        if self.pool is None or count <= 0:
+            return []
+        topics = self._choose_topics(student_profile, subject, len(SUBJECT_TOPICS.get(subject, [])) or 1)
+        return self.pool.take(
+            subject, topics, difficulty, student_profile.get("grade", "初一"), count,
+            used=UsedQuestionSet.from_profile(student_profile)
+        )
+
+    def _generate_pool_questions(
+        self,
+        subject: str,
+        topic: str,
+        difficulty: str,
+        grade: str,
+        count: int
+    ) -> List[Dict]:
+        """
+        Generate validated questions for one pool key (runs on the refill worker)
+        
+        Args:
+            subject: Subject name
+            topic: Topic every question should cover
+            difficulty: Difficulty level
+            grade: Student grade
+            count: Number of questions wanted
+            
+        Returns:
+            Valid parsed questions
+        """
+        if not self.llm.is_available():
+            return []
+        prompt, system_message, params = self._question_set_request(
+            {"grade": grade}, subject, difficulty, count, topics=[topic] * count
+        )
+        # params disable the cache: a cached response would only repeat pooled questions
+        result = self.llm.generate_result(prompt, system_message=system_message, **params)
+        accepted = []
+        self._accept_question_items(accepted, self._parse_question_set(result["text"]), count)
+        return accepted
+
+    def warm_pool(self, student_profile: Dict, max_keys: int = QUESTION_POOL_WARM_MAX_KEYS) -> int:
+        """
+        Queue background refills for the student's weak subjects
+        
+        Topics are visited in the order they will be drawn (recent topics
+        first), alternating between subjects. Only keys below the low-water
+        mark and not already queued are refilled, and at most max_keys per call.
+        
+        Args:
+            student_profile: Student information
+            max_keys: Maximum number of refills queued
+            
+        Returns:
+            Number of pool keys queued for refill
+        """
+        if self.pool is None or max_keys <= 0:
+            return 0
+        difficulty = self._determine_difficulty(student_profile)
+        grade = student_profile.get("grade", "初一")
+        topics_by_subject = [
+            (subject, self._choose_topics(student_profile, subject, len(SUBJECT_TOPICS.get(subject, [])) or 1))
+            for subject in student_profile.get("weak_subjects", SUBJECTS[:2])
+        ]
+        queued = 0
+        for position in range(max((len(topics) for _, topics in topics_by_subject), default=0)):
+            for subject, topics in topics_by_subject:
+                if position >= len(topics):
+                    continue
+                queued += self.pool.schedule_refill(self.pool.make_key(subject, topics[position], difficulty, grade))
+                if queued >= max_keys:
+                    return queued
+        return queued
+
+    async def agenerate_questions(
+        self,
+        student_profile: Dict,
+        num_questions: Optional[int] = None,
+        subject: Optional[str] = None,
+        difficulty: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Generate personalized questions with concurrent LLM calls
+        
+        Same arguments and result as generate_questions.
+        """
+        num_questions = num_questions or NUM_QUESTIONS_PER_SESSION
+        subject, difficulty = self._resolve_subject_and_difficulty(
+            student_profile, subject, difficulty
+        )
+        
+        pooled = self._take_from_pool(student_profile, subject, difficulty, num_questions)
+        remaining = num_questions - len(pooled)
+        accepted = []
+        
+        if remaining > 0 and self.batch_mode:
+            for _ in range(QUESTION_BATCH_RETRIES + 1):
+                if len(accepted) >= remaining:
+                    break
+                prompt, system_message, params = self._question_set_request(
+                    student_profile, subject, difficulty, remaining - len(accepted),
+                    offset=len(accepted), avoid=accepted
+                )
+                response = await self.llm.agenerate_text(
+                    prompt, system_message=system_message, **params
+                )
+                self._accept_question_items(
+                    accepted, self._parse_question_set(response), remaining
+                )
+        elif remaining > 0:
+            responses = await asyncio.gather(*[
+                self.llm.agenerate_text(
+                    self._build_question_prompt(student_profile, subject, difficulty, i + 1),
+                    system_message=QUESTION_SYSTEM_MESSAGE,
+                    use_cache=False
+                )
+                for i in range(remaining)
+            ])
+            for question_text in responses:
+                if question_text:
+                    parsed = self._parse_multiple_choice(question_text)
+                    if parsed["valid"]:
+                        accepted.append(parsed)
+        
+        return self._assemble_questions(
+            student_profile, [(subject, difficulty, num_questions)], [pooled], [accepted]
+        )
+
+    def _resolve_subject_and_difficulty(
+        self,
+        student_profile: Dict,
+        subject: Optional[str],
+        difficulty: Optional[str]
+    ) -> tuple:
+        """Fill in default subject (first weak subject) and difficulty"""
         
         # Determine subject focus
         if subject is None:
@@ -53,36 +409,28 @@ class QuestionGenerator:
             subject = weak_subjects[0] if weak_subjects else "數學"
         
         difficulty = difficulty or self._determine_difficulty(student_profile)
-        
-        questions = []
-        for i in range(num_questions):
-            prompt = self._build_question_prompt(
-                student_profile, subject, difficulty, i + 1
-            )
-            
-            question_text = self.llm.generate_text(
-                prompt,
-                system_message="你是一位優秀的教師，設計教學問題。生成一個清晰、有趣且能幫助學生學習的題目，並嚴格依照指定格式輸出。"
-            )
-            
-            if question_text:
-                # Parse the response to extract question, options, and answer
-                parsed = self._parse_multiple_choice(question_text)
-                
-                questions.append({
-                    "id": self.question_count + i + 1,
-                    "subject": subject,
-                    "difficulty": difficulty,
-                    "question": parsed.get("question", question_text),
-                    "options": parsed.get("options", {}),
-                    "standard_answer": parsed.get("answer", ""),
-                    "explanation": parsed.get("explanation", ""),
-                    "student_name": student_profile.get("name", "學生"),
-                    "created_for_weak_point": True
-                })
-        
-        self.question_count += num_questions
-        return questions
+        return subject, difficulty
+
+    def _make_question_entry(
+        self,
+        parsed: Dict,
+        index: int,
+        student_profile: Dict,
+        subject: str,
+        difficulty: str
+    ) -> Dict[str, str]:
+        """Build the question dictionary from parsed question fields"""
+        return {
+            "id": self.question_count + index + 1,
+            "subject": subject,
+            "difficulty": difficulty,
+            "question": parsed.get("question", ""),
+            "options": parsed.get("options", {}),
+            "standard_answer": parsed.get("answer", ""),
+            "explanation": parsed.get("explanation", ""),
+            "student_name": student_profile.get("name", "學生"),
+            "created_for_weak_point": True
+        }
 
     def generate_followup_question(
         self,
@@ -111,7 +459,7 @@ class QuestionGenerator:
     2. 逐步建立更深層的理解
     3. 與原始問題相關但從不同角度"""
         
-        followup = self.llm.generate_text(prompt)
+        followup = self.llm.generate_text(prompt, use_cache=False)
         
         if followup:
             return {
@@ -151,7 +499,7 @@ class QuestionGenerator:
 
     請以編號列表形式列出問題。"""
         
-        response = self.llm.generate_text(prompt)
+        response = self.llm.generate_text(prompt, use_cache=False)
         
         if response:
             # Parse response to extract individual questions
@@ -214,6 +562,143 @@ class QuestionGenerator:
         
         return prompt
 
+    def _build_question_set_prompt(
+        self,
+        student_profile: Dict,
+        subject: str,
+        difficulty: str,
+        count: int,
+        offset: int = 0,
+        avoid: Optional[List[Dict]] = None,
+        topics: Optional[List[str]] = None
+    ) -> str:
+        """Build prompt asking for count questions as one JSON array"""
+        
+        grade = student_profile.get("grade", "初一")
+        learning_style = student_profile.get("learning_style", "普通")
+        recent_topics = student_profile.get("recent_topics", [])
+        topics = topics or self._choose_topics(student_profile, subject, count, offset)
+        topic_lines = "\n".join(f"    {i + 1}. {topic}" for i, topic in enumerate(topics))
+        
+        prompt = f"""為一名{grade}學生生成{count}個{subject}選擇題，每題依序對應以下主題：
+{topic_lines}
+
+    學生資訊：
+    - 年級：{grade}
+    - 學習風格：{learning_style}
+    - 最近學習主題：{', '.join(recent_topics) if recent_topics else '基礎知識'}
+
+    題目要求（必須遵守）：
+    - 難度：{difficulty}
+    - 科目：{subject}
+    - 題型：單選題（四個選項，其中一個正確答案）
+    - 具體且能夠測試學生的理解
+    - 適合{grade}學生的認知水準
+    - 每題獨立，題目之間不重複
+
+    只輸出一個 JSON 陣列，每個元素格式如下：
+    {{"topic": "主題", "question": "題目", "options": {{"A": "選項A", "B": "選項B", "C": "選項C", "D": "選項D"}}, "answer": "B", "explanation": "簡單說明為什麼這個答案正確"}}
+
+    重要：answer 必須只包含單個字母（A/B/C/D）。"""
+        
+        if avoid:
+            existing = "\n".join(f"    - {item['question']}" for item in avoid)
+            prompt += f"\n\n    不要與以下已有題目重複：\n{existing}"
+        
+        return prompt
+
+    def _choose_topics(
+        self,
+        student_profile: Dict,
+        subject: str,
+        count: int,
+        offset: int = 0
+    ) -> List[str]:
+        """Pick count distinct topics (recent topics first), cycling when there are too few"""
+        candidates = []
+        for topic in student_profile.get("recent_topics", []) + SUBJECT_TOPICS.get(subject, []):
+            if topic and topic not in candidates:
+                candidates.append(topic)
+        if not candidates:
+            candidates = ["基礎知識"]
+        return [candidates[(offset + i) % len(candidates)] for i in range(count)]
+
+    @staticmethod
+    def _parse_question_set(response: str) -> List:
+        """
+        Parse a JSON array of questions from an LLM response
+        
+        Tolerates Markdown code fences and surrounding text. If the array is
+        malformed or truncated, every complete object is still recovered.
+        
+        Args:
+            response: Raw LLM response
+            
+        Returns:
+            List of raw items (not yet validated)
+        """
+        if not response:
+            return []
+        
+        text = re.sub(r'^```(?:json)?\s*|\s*```$', '', response.strip())
+        start = text.find('[')
+        end = text.rfind(']')
+        if start != -1 and end > start:
+            try:
+                data = json.loads(text[start:end + 1])
+                if isinstance(data, list):
+                    return data
+            except ValueError:
+                pass
+        
+        # Recover complete top-level objects one by one
+        items = []
+        decoder = json.JSONDecoder()
+        position = text.find('{')
+        while position != -1:
+            try:
+                item, position = decoder.raw_decode(text, position)
+                items.append(item)
+            except ValueError:
+                position += 1
+            position = text.find('{', position)
+        return items
+
+    @staticmethod
+    def _validate_question_item(item) -> Optional[Dict]:
+        """
+        Validate one structured question
+        
+        Args:
+            item: Raw item from _parse_question_set
+            
+        Returns:
+            Normalized {"question", "options", "answer", "explanation"} or
+            None if the item is unusable
+        """
+        if not isinstance(item, dict):
+            return None
+        
+        question = str(item.get("question") or "").strip()
+        options = item.get("options")
+        if not question or not isinstance(options, dict):
+            return None
+        
+        options = {letter: str(options.get(letter) or "").strip() for letter in "ABCD"}
+        if not all(options.values()) or len(set(options.values())) < 4:
+            return None
+        
+        answer = str(item.get("answer") or "").strip().upper()[:1]
+        if answer not in options:
+            return None
+        
+        return {
+            "question": question,
+            "options": options,
+            "answer": answer,
+            "explanation": str(item.get("explanation") or "").strip()
+        }
+
     def _determine_difficulty(self, student_profile: Dict) -> str:
         """Determine appropriate difficulty level based on student profile"""
         
@@ -253,17 +738,45 @@ class QuestionGenerator:
         questions_per_subject = max(1, num_questions // len(weak_subjects))
         remainder = num_questions % len(weak_subjects)
         
-        all_questions = []
+        plan = []
+        difficulty = self._determine_difficulty(student_profile)
         
         for i, subject in enumerate(weak_subjects):
             # Add one extra question to first few subjects if there's remainder
             num_for_subject = questions_per_subject + (1 if i < remainder else 0)
-            
-            subject_questions = self.generate_questions(
+            plan.append((subject, difficulty, num_for_subject))
+        
+        # All subjects are requested in a single fan-out batch
+        all_questions = self._generate_for_plan(student_profile, plan)
+        
+        return all_questions[:num_questions]
+
+    async def agenerate_quiz(
+        self,
+        student_profile: Dict,
+        num_questions: int = 5
+    ) -> List[Dict[str, str]]:
+        """
+        Generate a full quiz session with all subjects requested concurrently
+        
+        Same arguments and result as generate_quiz.
+        """
+        weak_subjects = student_profile.get("weak_subjects", SUBJECTS[:2])
+        
+        questions_per_subject = max(1, num_questions // len(weak_subjects))
+        remainder = num_questions % len(weak_subjects)
+        
+        subject_results = await asyncio.gather(*[
+            self.agenerate_questions(
                 student_profile,
-                num_questions=num_for_subject,
+                num_questions=questions_per_subject + (1 if i < remainder else 0),
                 subject=subject
             )
+            for i, subject in enumerate(weak_subjects)
+        ])
+        
+        all_questions = []
+        for subject_questions in subject_results:
             all_questions.extend(subject_questions)
         
         return all_questions[:num_questions]
@@ -306,9 +819,11 @@ class QuestionGenerator:
             elif line.startswith('解释：') or line.startswith('解釋：'):
                 result["explanation"] = line.replace('解释：', '').replace('解釋：', '').strip()
         
-        # Validation: ensure answer is a valid letter
+        # Validation: ensure answer is a valid letter. Do not guess one; an
+        # invalid item is dropped so the caller can fall back to the bank.
+        result["valid"] = result["answer"] in ['A', 'B', 'C', 'D'] and bool(result["question"])
         if result["answer"] not in ['A', 'B', 'C', 'D']:
-            print(f"⚠️  警告：答案格式不正確 - '{result['answer']}'，使用預設值 A")
-            result["answer"] = "A"
+            print(f"⚠️  警告：答案格式不正確 - '{result['answer']}'，略過此題")
+            result["answer"] = ""
         
         return result
@@ -0,0 +1,323 @@
+"""
+Question Pool - Persistent pool of pre-generated questions with background refill
+
+With a disk store the SQLite table is the pool itself: every process reads it
+and claims questions by deleting their rows, so two processes never hand out
+the same pooled question.
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (
+    QUESTION_POOL_PATH,
+    QUESTION_POOL_LOW_WATER,
+    QUESTION_POOL_REFILL_SIZE,
+)
+from utils.bank_store import question_hash
+
+# (subject, topic, difficulty, grade)
+PoolKey = Tuple[str, str, str, str]
+# refill(subject, topic, difficulty, grade, count) -> validated question dicts
+RefillFunction = Callable[[str, str, str, str, int], List[Dict]]
+
+
+class QuestionPool:
+    """Serve validated questions from SQLite (or memory) and keep each key topped up in the background"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = QUESTION_POOL_PATH,
+        low_water: int = QUESTION_POOL_LOW_WATER,
+        refill_size: int = QUESTION_POOL_REFILL_SIZE,
+        refill: Optional[RefillFunction] = None
+    ):
+        """
+        Initialize question pool
+
+        Args:
+            db_path: SQLite file path (None for a memory-only pool)
+            low_water: A key with fewer questions than this is refilled
+            refill_size: Questions requested per refill
+            refill: Function generating questions for a key
+        """
+        self.low_water = max(0, low_water)
+        self.refill_size = max(1, refill_size)
+        self.refill = refill
+        self._lock = threading.Lock()
+        self._items: Dict[PoolKey, deque] = {}  # memory-only pool: key -> deque of questions
+        self._conn = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._scheduled = set()
+        self._worker = None
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_failures = 0
+
+        if db_path:
+            self._open_disk(db_path)
+
+    def _open_disk(self, db_path: str) -> None:
+        """Open (or create) the SQLite store"""
+        try:
+            path = Path(db_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    subject TEXT NOT NULL,
+                    topic TEXT NOT NULL,
+                    difficulty TEXT NOT NULL,
+                    grade TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_questions_key ON questions (subject, topic, difficulty, grade, id)"
+            )
+            conn.commit()
+            self._conn = conn
+        except Exception as e:
+            print(f"Warning: question pool disk store unavailable, using memory only: {e}")
+            self._conn = None
+
+    @staticmethod
+    def make_key(subject: str, topic: str, difficulty: str, grade) -> PoolKey:
+        return (subject, topic, difficulty, str(grade))
+
+    def size(self, key: PoolKey) -> int:
+        with self._lock:
+            return self._size(key)
+
+    def _size(self, key: PoolKey) -> int:
+        """Pooled questions for a key (caller holds self._lock)"""
+        if self._conn is None:
+            return len(self._items.get(key, ()))
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM questions WHERE subject = ? AND topic = ? AND difficulty = ? AND grade = ?",
+            key
+        ).fetchone()[0]
+
+    def _rows(self, key: PoolKey) -> List[Tuple[Optional[int], Dict]]:
+        """(row id, question) pairs of a key, oldest first; row id is None in memory (caller holds self._lock)"""
+        if self._conn is None:
+            return [(None, question) for question in self._items.get(key, ())]
+        rows = self._conn.execute(
+            "SELECT id, payload FROM questions "
+            "WHERE subject = ? AND topic = ? AND difficulty = ? AND grade = ? ORDER BY id",
+            key
+        ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def _claim(self, key: PoolKey, row_id: Optional[int], question: Dict) -> bool:
+        """
+        Remove one question from the pool (caller holds self._lock)
+
+        Returns:
+            False if it is already gone (another process claimed the row first)
+        """
+        if self._conn is None:
+            self._items[key].remove(question)
+            return True
+        return self._conn.execute("DELETE FROM questions WHERE id = ?", (row_id,)).rowcount == 1
+
+    def put(self, key: PoolKey, questions: List[Dict]) -> int:
+        """
+        Add questions to a key, skipping ones already pooled
+
+        Args:
+            key: Pool key from make_key
+            questions: Validated question dicts
+
+        Returns:
+            Number of questions added
+        """
+        added = 0
+        now = time.time()
+        with self._lock:
+            try:
+                seen = {question.get("question") for _, question in self._rows(key)}
+                for question in questions:
+                    if question.get("question") in seen:
+                        continue
+                    seen.add(question.get("question"))
+                    if self._conn is None:
+                        self._items.setdefault(key, deque()).append(question)
+                    else:
+                        self._conn.execute(
+                            "INSERT INTO questions (subject, topic, difficulty, grade, payload, created_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            key + (json.dumps(question, ensure_ascii=False), now)
+                        )
+                    added += 1
+                if self._conn is not None:
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                print(f"Warning: question pool write failed: {e}")
+                return 0
+        return added
+
+    def take(
+        self,
+        subject: str,
+        topics: List[str],
+        difficulty: str,
+        grade,
+        count: int,
+        used=None
+    ) -> List[Dict]:
+        """
+        Take up to count questions, one topic at a time in round-robin order
+
+        Questions the student has already seen stay pooled for other students.
+        Each taken row is deleted in the same transaction; a row another
+        process deleted first is skipped. Keys that fall below the low-water
+        mark (including empty ones) are scheduled for a background refill.
+
+        Args:
+            subject: Subject name
+            topics: Topics to draw from, in preference order
+            difficulty: Difficulty level
+            grade: Student grade
+            count: Number of questions wanted
+            used: Question hashes the student has already seen (e.g. UsedQuestionSet)
+
+        Returns:
+            Taken question dicts (may be fewer than count)
+        """
+        keys = [self.make_key(subject, topic, difficulty, grade) for topic in dict.fromkeys(topics)]
+        taken = []
+        with self._lock:
+            try:
+                candidates = {
+                    key: deque(
+                        (row_id, question) for row_id, question in self._rows(key)
+                        if not used or self._question_id(subject, question) not in used
+                    )
+                    for key in keys
+                }
+                while len(taken) < count and any(candidates.values()):
+                    for key in keys:
+                        if candidates[key] and len(taken) < count:
+                            row_id, question = candidates[key].popleft()
+                            if self._claim(key, row_id, question):
+                                taken.append(question)
+                if self._conn is not None:
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                print(f"Warning: question pool read failed: {e}")
+                taken = []
+            self.hits += len(taken)
+            self.misses += count - len(taken)
+
+        for key in keys:
+            self.schedule_refill(key)
+        return taken
+
+    @staticmethod
+    def _question_id(subject: str, question: Dict) -> str:
+        """Hash the question will have in the session (and in the student's used_questions)"""
+        return question_hash({"subject": subject, "question": question.get("question", "")})
+
+    def schedule_refill(self, key: PoolKey) -> bool:
+        """
+        Queue a background refill if the key is below the low-water mark
+
+        Returns:
+            True if a refill was queued
+        """
+        if self.refill is None:
+            return False
+        with self._lock:
+            if key in self._scheduled or self._size(key) >= self.low_water:
+                return False
+            self._scheduled.add(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run_worker, name="question-pool-refill", daemon=True
+                )
+                self._worker.start()
+        self._queue.put(key)
+        return True
+
+    def _run_worker(self) -> None:
+        """Background loop generating questions for queued keys"""
+        while True:
+            key = self._queue.get()
+            try:
+                self.refill_now(key)
+            finally:
+                with self._lock:
+                    self._scheduled.discard(key)
+                self._queue.task_done()
+
+    def refill_now(self, key: PoolKey) -> int:
+        """
+        Generate questions for a key in the calling thread
+
+        Returns:
+            Number of questions added
+        """
+        try:
+            questions = self.refill(*key, self.refill_size) or []
+        except Exception as e:
+            questions = []
+            print(f"Warning: question pool refill failed for {key}: {e}")
+        with self._lock:
+            if questions:
+                self.refills += 1
+            else:
+                self.refill_failures += 1
+        return self.put(key, questions)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all queued refills have finished
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the queue drained in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict:
+        """
+        Get pool statistics
+
+        Returns:
+            Dictionary with hit/miss counters, refill counters and pool size
+        """
+        with self._lock:
+            if self._conn is None:
+                keys = sum(1 for items in self._items.values() if items)
+                size = sum(len(items) for items in self._items.values())
+            else:
+                keys, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(n), 0) FROM "
+                    "(SELECT COUNT(*) AS n FROM questions GROUP BY subject, topic, difficulty, grade)"
+                ).fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refills": self.refills,
+                "refill_failures": self.refill_failures,
+                "pending_refills": len(self._scheduled),
+                "keys": keys,
+                "size": size
+            }
@@ -0,0 +1,207 @@
+"""
+Resilience - Error classification, retry backoff and circuit breaking for LLM calls
+"""
+import random
+import threading
+import time
+from typing import Dict, Optional
+from config import (
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_CIRCUIT_FAILURE_THRESHOLD,
+    LLM_CIRCUIT_RESET_TIMEOUT,
+)
+
+# Error categories
+ERROR_RATE_LIMIT = "rate_limit"      # provider asked us to slow down; retry with longer backoff
+ERROR_TRANSIENT = "transient"        # timeouts, 5xx, dropped connections; retry
+ERROR_FATAL = "fatal"                # bad request, auth, safety block; do not retry
+ERROR_CIRCUIT_OPEN = "circuit_open"  # provider marked down; call was not attempted
+
+_RATE_LIMIT_MARKERS = (
+    "ratelimit", "rate limit", "rate_limit", "429", "resourceexhausted",
+    "resource exhausted", "resource_exhausted", "quota", "too many requests",
+)
+_TRANSIENT_MARKERS = (
+    "timeout", "timed out", "deadline", "temporarily", "unavailable", "connection",
+    "serviceunavailable", "internalservererror", "internal error", "apierror",
+    "tryagain", "try again", "overloaded", "500", "502", "503", "504",
+)
+
+
+class LLMCallError(Exception):
+    """Raised by provider calls that fail with a known category"""
+
+    def __init__(self, message: str, error_type: str = ERROR_FATAL):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+def classify_error(error: Exception) -> str:
+    """
+    Classify a provider exception
+
+    Args:
+        error: Exception raised by the provider SDK
+
+    Returns:
+        One of ERROR_RATE_LIMIT, ERROR_TRANSIENT, ERROR_FATAL
+    """
+    if isinstance(error, LLMCallError):
+        return error.error_type
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return ERROR_TRANSIENT
+
+    text = f"{type(error).__name__} {error}".lower()
+    if any(marker in text for marker in _RATE_LIMIT_MARKERS):
+        return ERROR_RATE_LIMIT
+    if any(marker in text for marker in _TRANSIENT_MARKERS):
+        return ERROR_TRANSIENT
+    return ERROR_FATAL
+
+
+def backoff_delay(
+    attempt: int,
+    error_type: str,
+    base_delay: float = LLM_RETRY_BASE_DELAY,
+    max_delay: float = LLM_RETRY_MAX_DELAY
+) -> float:
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt: Retry number starting at 1
+        error_type: Error category of the failed attempt
+        base_delay: Delay scale in seconds
+        max_delay: Upper bound for a single delay
+
+    Returns:
+        Seconds to sleep before the next attempt
+    """
+    # Rate limits need noticeably more room than blips
+    scale = base_delay * (4 if error_type == ERROR_RATE_LIMIT else 1)
+    ceiling = min(max_delay, scale * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Fail fast while a provider keeps failing"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = LLM_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = LLM_CIRCUIT_RESET_TIMEOUT
+    ):
+        """
+        Initialize circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds before a trial request is let through
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be attempted
+
+        Returns:
+            False while the circuit is open; in half-open state only one
+            trial request is allowed at a time
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def is_open(self) -> bool:
+        """True while calls are being rejected (reset timeout not yet elapsed)"""
+        with self._lock:
+            return (
+                self.state == self.OPEN
+                and time.monotonic() - self.opened_at < self.reset_timeout
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Release a half-open trial slot without counting success or failure"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """
+    Get the process-wide circuit breaker for a provider
+
+    Args:
+        provider: Provider name ("openai", "vertexai", "generativeai")
+
+    Returns:
+        Shared CircuitBreaker instance
+    """
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker()
+        return _breakers[provider]
+
+
+def make_result(
+    text: str = "",
+    error: Optional[str] = None,
+    error_type: Optional[str] = None,
+    attempts: int = 0,
+    cached: bool = False,
+    shared: bool = False
+) -> Dict:
+    """Build the structured result returned by LLMClient.generate_result"""
+    return {
+        "ok": error is None,
+        "text": text,
+        "error": error,
+        "error_type": error_type,
+        "attempts": attempts,
+        "cached": cached,
+        "shared": shared
+    }
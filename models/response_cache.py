@@ -0,0 +1,253 @@
+"""
+Response Cache - Two-tier (memory LRU + SQLite) cache for LLM responses
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from config import (
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MEMORY_ENTRIES,
+)
+from utils.lru_cache import LRUCache
+
+
+class ResponseCache:
+    """Cache LLM completions in memory and on disk"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = LLM_CACHE_PATH,
+        ttl: int = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES
+    ):
+        """
+        Initialize response cache
+
+        Args:
+            db_path: SQLite file path (None for memory-only cache)
+            ttl: Entry lifetime in seconds (0 or less disables expiry)
+            max_entries: Maximum number of entries kept on disk
+            memory_entries: Maximum number of entries kept in memory
+        """
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self._memory = LRUCache(memory_entries)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_count = 0
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.disk_evictions = 0
+
+        if db_path:
+            self._open_disk(db_path)
+
+    def _open_disk(self, db_path: str) -> None:
+        """Open (or create) the SQLite tier; fall back to memory-only on error"""
+        try:
+            path = Path(db_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)"
+            )
+            conn.commit()
+            self._disk_count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            self._conn = conn
+        except Exception as e:
+            print(f"Warning: LLM cache disk store unavailable, using memory only: {e}")
+            self._conn = None
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        system_message: Optional[str],
+        prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """
+        Build a stable cache key from the request parameters
+
+        Returns:
+            SHA-256 hex digest of the request
+        """
+        payload = json.dumps(
+            [provider, model, system_message or "", prompt, float(temperature), int(max_tokens)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Cached text or None on miss
+        """
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if not self._is_expired(created_at, now):
+                with self._lock:
+                    self.hits += 1
+                    self.memory_hits += 1
+                return value
+            self._memory.pop(key)
+            with self._lock:
+                self.expired += 1
+
+        if self._conn is not None:
+            with self._lock:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, created_at = row
+                        if not self._is_expired(created_at, now):
+                            self._conn.execute(
+                                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+                            )
+                            self._conn.commit()
+                            self.hits += 1
+                            self.disk_hits += 1
+                            self._memory.set(key, (value, created_at))
+                            return value
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._conn.commit()
+                        self._disk_count = max(0, self._disk_count - 1)
+                        self.expired += 1
+                except sqlite3.Error as e:
+                    print(f"Warning: LLM cache read failed: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response in both tiers
+
+        Args:
+            key: Key from make_key
+            value: Response text
+        """
+        now = time.time()
+        self._memory.set(key, (value, now))
+
+        if self._conn is None:
+            return
+        with self._lock:
+            try:
+                # Replacing an existing row does not change the row count
+                exists = self._conn.execute(
+                    "SELECT 1 FROM responses WHERE key = ?", (key,)
+                ).fetchone() is not None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._conn.commit()
+                if not exists:
+                    self._disk_count += 1
+                if self._disk_count > self.max_entries:
+                    self._evict_disk()
+            except sqlite3.Error as e:
+                print(f"Warning: LLM cache write failed: {e}")
+
+    def _evict_disk(self) -> None:
+        """Drop expired rows, then least recently used rows down to 90% capacity"""
+        if self.ttl > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        target = int(self.max_entries * 0.9)
+        if count > target:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)",
+                (count - target,)
+            )
+            self.disk_evictions += count - target
+            count = target
+        self._conn.commit()
+        self._disk_count = count
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        self._memory.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+                self._disk_count = 0
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics
+
+        Returns:
+            Dictionary with hit/miss counters and tier sizes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_size": len(self._memory),
+                "memory_evictions": self._memory.evictions,
+                "disk_size": self._disk_count if self._conn is not None else 0,
+                "disk_evictions": self.disk_evictions
+            }
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ResponseCache:
+    """
+    Get the process-wide response cache shared by all LLM clients
+
+    Returns:
+        Shared ResponseCache instance
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
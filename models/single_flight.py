@@ -0,0 +1,143 @@
+"""
+Single Flight - Coalesce identical in-flight calls so only one reaches the provider
+"""
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared future when its leading coroutine is cancelled, so waiters retry"""
+
+
+class _Call:
+    """State of one in-flight synchronous call"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share the result of a running call with concurrent callers using the same key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # asyncio futures belong to one event loop, so track them per loop
+        self._loop_calls: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn unless a call with the same key is already running
+
+        Args:
+            key: Request identity (e.g. response-cache key)
+            fn: Function performing the real call
+
+        Returns:
+            (result, shared) where shared is True if the result came from
+            another caller's in-flight call. An exception raised by the
+            leading call is re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key: Hashable, make_call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Async counterpart of do for coroutines on the running event loop
+
+        Args:
+            key: Request identity
+            make_call: Zero-argument function returning the awaitable to run
+
+        Returns:
+            (result, shared) as in do. If the leading coroutine is cancelled,
+            waiting callers are not: one of them starts the call again and
+            the others wait for it.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._loop_calls.setdefault(loop, {})
+            future = calls.get(key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                # Avoid "exception never retrieved" warnings when nobody waited
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                calls[key] = future
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                return await asyncio.shield(future), True
+            except _LeaderCancelled:
+                # Only the leader was cancelled; the key is free again
+                return await self.ado(key, make_call)
+
+        try:
+            result = await make_call()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                calls.pop(key, None)
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing statistics
+
+        Returns:
+            Number of leading calls, coalesced callers and calls in flight
+        """
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls)
+            }
+
+
+_default_single_flight = SingleFlight()
+
+
+def get_default_single_flight() -> SingleFlight:
+    """Get the process-wide SingleFlight shared by all LLM clients"""
+    return _default_single_flight
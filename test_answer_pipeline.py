@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+作答流程測試：先判分，只有需要時才進行錯誤分析
+"""
+import tempfile
+import threading
+
+from conftest import fake_app_factory
+
+ANALYSIS = '{"root_cause": "計算錯誤", "explanation": "2+2=4", "hints": ["再算一次"], "similar_problems": ["3+3=?"]}'
+
+
+def _analysis(prompt, system_message, max_tokens):
+    return ANALYSIS
+
+
+def _make_session() -> dict:
+    return {
+        "student_id": "pipeline_test",
+        "questions": [{
+            "id": 1,
+            "question": "2+2=?",
+            "options": {"A": "3", "B": "4"},
+            "standard_answer": "B",
+            "subject": "數學",
+            "topic": "加法",
+        }],
+        "responses": [],
+    }
+
+
+def test_correct_answer_skips_analysis(fake_app):
+    """答對時不呼叫 LLM"""
+    app = fake_app(_analysis)
+    response = app.process_answer(_make_session(), 0, "B")
+    assert response["is_correct"]
+    assert response["analysis"] is None
+    assert response["llm_calls"] == 0
+    assert response["feedback"].startswith("✅")
+
+
+def test_wrong_answer_and_explain_anyway(fake_app):
+    """答錯或要求解說時才進行分析"""
+    app = fake_app(_analysis)
+    wrong = app.process_answer(_make_session(), 0, "A")
+    assert not wrong["is_correct"]
+    assert wrong["analysis"]["explanation"] == "2+2=4"
+    assert wrong["llm_calls"] == 1
+
+    explained = app.process_answer(_make_session(), 0, "B", explain_anyway=True)
+    assert explained["is_correct"]
+    assert "2+2=4" in explained["feedback"]
+    assert explained["llm_calls"] == 1
+
+
+def test_streamed_feedback(fake_app):
+    """串流的回饋與完整回饋一致：答對時標題後有空行，串流為空時補送解說"""
+    app = fake_app(_analysis)
+    app.llm.generate_stream = lambda prompt, system_message=None: iter(["2+2", "=4"])
+    chunks = []
+    explained = app.process_answer(_make_session(), 0, "B", on_feedback_chunk=chunks.append, explain_anyway=True)
+    assert "".join(chunks).startswith("✅ 正確！很好地掌握了這個知識點。\n\n2+2=4")
+    assert explained["feedback"].startswith("".join(chunks[:3]))
+
+    app.llm.generate_stream = lambda prompt, system_message=None: iter(())
+    chunks = []
+    app.process_answer(_make_session(), 0, "A", on_feedback_chunk=chunks.append)
+    assert "".join(chunks).startswith("❌ 答案不正確。\n\n2+2=4")
+
+
+def test_background_calls_are_not_counted(fake_app):
+    """作答期間背景執行緒（例如題目池補充）的呼叫不計入本題"""
+    app = fake_app(_analysis)
+    answer_call = app.llm._call_provider
+
+    def call_with_refill(*args):
+        refill = threading.Thread(target=app.llm._count_provider_call)
+        refill.start()
+        refill.join()
+        return answer_call(*args)
+
+    app.llm._call_provider = call_with_refill
+    calls_before = app.llm.provider_calls
+    response = app.process_answer(_make_session(), 0, "A")
+    assert response["llm_calls"] == 1
+    assert app.llm.provider_calls - calls_before == 2
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_app = fake_app_factory(tmp)
+        test_correct_answer_skips_analysis(fake_app)
+        test_wrong_answer_and_explain_anyway(fake_app)
+        test_streamed_feedback(fake_app)
+        test_background_calls_are_not_counted(fake_app)
+    print("✅ 所有作答流程測試通過！")
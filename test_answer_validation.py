@@ -5,7 +5,7 @@
 用於測試修復後的答案比對邏輯
 """
 
-from main import KnowledgeFuelStation
+from conftest import isolated_app
 
 def test_answer_checking():
     """測試各種答案輸入情況"""
@@ -15,7 +15,7 @@ def test_answer_checking():
     print("=" * 60)
     
     # 創建系統實例
-    system = KnowledgeFuelStation()
+    system = isolated_app()
     
     # 測試用的題目
     test_question = {
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+題庫儲存與索引測試
+"""
+import os
+import random
+import shutil
+import tempfile
+from pathlib import Path
+
+from config import SUBJECT_BANK_FILES
+from utils.bank_store import INDEX_SUFFIX, MmapBankStore, QuestionBankRegistry
+from utils.data_processor import DataProcessor
+from utils.question_bank_parser import load_question_bank
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def _bank_specs(tmp):
+    """複製內建題庫到暫存目錄，回傳 (路徑, 科目) 列表"""
+    banks = []
+    for subject in ("數學", "英語", "自然", "社會", "語文"):
+        source = BASE_DIR / SUBJECT_BANK_FILES[subject]
+        target = Path(tmp) / source.name
+        shutil.copy(source, target)
+        banks.append((str(target), subject))
+    return banks
+
+
+def test_mmap_store_matches_parser():
+    """mmap 題庫建立的題目、計數與雜湊和直接解析（依題目 ID 去重）一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        banks = _bank_specs(tmp)
+        processor = DataProcessor(tmp, bank_storage="mmap")
+        counts = processor.load_question_bank_files(banks)
+
+        expected = {}
+        for path, subject in banks:
+            for question in load_question_bank(path, subject, use_cache=False):
+                expected.setdefault(processor._get_question_hash(question), question)
+        expected = list(expected.values())
+        assert counts == [processor.get_question_bank_count(subject) for _, subject in banks]
+        assert processor.question_bank == expected
+        assert [processor.bank_store.question_id(i) for i in range(len(expected))] == \
+            [processor._get_question_hash(q) for q in expected]
+        assert processor.has_question_bank("數學")
+        assert not processor.has_question_bank("體育")
+        processor.bank_store.close()
+
+
+def test_mmap_and_memory_pick_same_questions():
+    """相同亂數種子下兩種儲存方式選出相同題目，且略過已使用題目"""
+    with tempfile.TemporaryDirectory() as tmp:
+        banks = _bank_specs(tmp)
+        memory = DataProcessor(tmp, bank_storage="memory")
+        mapped = DataProcessor(tmp, bank_storage="mmap")
+        memory.load_question_bank_files(banks)
+        mapped.load_question_bank_files(banks)
+
+        scope = memory.question_bank[0]["scope"]
+        used = [memory._get_question_hash(memory.question_bank[0])]
+        for seed in range(5):
+            random.seed(seed)
+            expected = memory.get_question_from_bank("數學", used)
+            random.seed(seed)
+            assert mapped.get_question_from_bank("數學", used) == expected
+            assert memory._get_question_hash(expected) not in used
+
+            random.seed(seed)
+            expected = memory.get_questions_by_scope(scope, "數學", used, limit=3)
+            random.seed(seed)
+            assert mapped.get_questions_by_scope(scope, "數學", used, limit=3) == expected
+        mapped.bank_store.close()
+
+
+def test_indexes_match_linear_scan():
+    """索引計數與範圍選題和逐題掃描一致，用完範圍內題目後允許重複"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp, bank_storage="memory")
+        processor.load_question_bank_files(_bank_specs(tmp))
+        bank = processor.question_bank
+
+        for subject in ("數學", "英語", "自然", "社會", "語文", "體育"):
+            assert processor.get_question_bank_count(subject) == \
+                sum(1 for q in bank if q["subject"] == subject)
+        assert processor.get_question_bank_count() == len(bank)
+
+        scope = bank[0]["scope"]
+        in_scope = [q for q in bank if q["subject"] == "數學" and q["scope"] == scope]
+        picked = processor.get_questions_by_scope(scope, "數學", limit=len(in_scope) + 5)
+        assert sorted(q["question"] for q in picked) == sorted(q["question"] for q in in_scope)
+
+        used = [processor._get_question_hash(q) for q in in_scope]
+        again = processor.get_questions_by_scope(scope, "數學", used, limit=2)
+        assert len(again) == min(2, len(in_scope))
+
+        subject_used = [processor._get_question_hash(q) for q in bank if q["subject"] == "數學"]
+        assert processor.get_question_from_bank("數學", subject_used) is None
+
+
+def test_mmap_index_is_reused():
+    """偏移索引存成 <題庫>.index，題庫未變更時不再解析題目，變更後重建"""
+    with tempfile.TemporaryDirectory() as tmp:
+        banks = _bank_specs(tmp)
+        first = MmapBankStore(use_cache=True)
+        first.load_files(banks)
+        assert all(os.path.exists(path + INDEX_SUFFIX) for path, _ in banks)
+
+        def no_scan(file_index):
+            raise AssertionError("未變更的題庫不應重新解析")
+
+        second = MmapBankStore(use_cache=True)
+        second._scan_file = no_scan
+        second.load_files(banks)
+        assert [second.question_id(i) for i in range(len(second))] == \
+            [first.question_id(i) for i in range(len(first))]
+        assert second.get(0) == first.get(0)
+        second.close()
+
+        math_bank = banks[0][0]
+        with open(math_bank, "a", encoding="utf-8") as f:
+            f.write("\n========================================\n"
+                    "【範圍】新增\n【題目】\n（） 新增題目？\n(A) 1\n(B) 2\n(C) 3\n(D) 4\n"
+                    "【答案】\n（A） 解析\n")
+        third = MmapBankStore(use_cache=True)
+        third.load_files([(math_bank, "數學")])
+        assert len(third.select("數學", "新增")) == 1
+        first.close()
+        third.close()
+
+
+def test_unload_compacts_store():
+    """移除題庫後壓縮儲存，之後載入的題庫編號跟著前移"""
+    with tempfile.TemporaryDirectory() as tmp:
+        banks = _bank_specs(tmp)
+        for storage in ("memory", "mmap"):
+            registry = QuestionBankRegistry(storage)
+            registry.load(banks)
+            expected = QuestionBankRegistry(storage)
+            expected.load(banks[1:])
+
+            registry.unload_subject("數學")
+            store = registry.store
+            assert len(store) == len(expected.store)
+            assert store.all_questions() == expected.store.all_questions()
+            assert list(store.select("英語")) == list(expected.store.select("英語"))
+            if storage == "memory":
+                assert len(store.questions) == len(store)
+            else:
+                assert len(store._starts) == len(store)
+
+            # 前移後的範圍仍可正確移除
+            assert registry.unload_subject("英語") == len(expected.store.select("英語"))
+            assert not store.select("英語") and store.select("自然")
+            if storage == "mmap":
+                store.close()
+                expected.store.close()
+
+
+def test_registry_loads_each_bank_once():
+    """重複載入不會重複加入題目，題庫變更時取代舊版本，可依科目移除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        banks = _bank_specs(tmp)
+        registry = QuestionBankRegistry("memory")
+        first = DataProcessor(tmp, bank_registry=registry)
+        second = DataProcessor(tmp, bank_registry=registry)
+
+        counts = first.load_question_bank_files(banks)
+        total = first.get_question_bank_count()
+        assert second.load_question_bank_files(banks) == counts
+        assert second.load_question_bank_file(banks[0][0], "數學") == counts[0]
+        assert second.get_question_bank_count() == total
+
+        # 同一文件以另一個科目載入（語文／國文共用 chinese.txt）
+        chinese = banks[4][0]
+        assert first.load_question_bank_file(chinese, "國文") == counts[4]
+        assert first.get_question_bank_count("語文") == first.get_question_bank_count("國文")
+
+        # 題庫變更後重新載入會取代舊題目
+        math_bank = banks[0][0]
+        with open(math_bank, "a", encoding="utf-8") as f:
+            f.write("\n========================================\n"
+                    "【範圍】新增\n【題目】\n（） 新增題目？\n(A) 1\n(B) 2\n(C) 3\n(D) 4\n"
+                    "【答案】\n（A） 解析\n")
+        os.utime(math_bank, ns=(0, 0))
+        assert first.load_question_bank_files([(math_bank, "數學")]) == [counts[0] + 1]
+        assert second.get_question_bank_count("數學") == counts[0] + 1
+        added = second.get_questions_by_scope("新增", "數學")
+        assert len(added) == 1 and "新增題目" in added[0]["question"]
+
+        assert second.unload_question_bank("數學") == counts[0] + 1
+        assert not first.has_question_bank("數學")
+        assert first.get_question_from_bank("數學") is None
+        assert first.get_question_bank_count() == total + counts[4] - counts[0]
+        assert first.load_question_bank_files([(math_bank, "數學")]) == [counts[0] + 1]
+
+
+if __name__ == "__main__":
+    test_mmap_store_matches_parser()
+    test_mmap_and_memory_pick_same_questions()
+    test_indexes_match_linear_scan()
+    test_mmap_index_is_reused()
+    test_unload_compacts_store()
+    test_registry_loads_each_bank_once()
+    print("✅ mmap 題庫儲存測試通過")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+錯誤分析結構化單次呼叫測試
+"""
+import json
+
+from conftest import make_fake_llm
+from models.error_analyzer import ErrorAnalyzer
+
+
+def _make_analyzer(responder, single_call: bool = True) -> ErrorAnalyzer:
+    """建立使用假供應商的錯誤分析器（responder 只接收提示）"""
+    client = make_fake_llm(lambda prompt, system_message, max_tokens: responder(prompt))
+    return ErrorAnalyzer(client, single_call=single_call)
+
+
+def test_single_structured_call():
+    """完整 JSON 回應只需一次供應商呼叫"""
+    payload = {
+        "root_cause": "混淆了加法與乘法",
+        "explanation": "2×3 表示 3 個 2 相加，所以是 6。",
+        "hints": ["先讀懂運算符號", "想想乘法的意義", "用加法驗算"],
+        "similar_problems": ["3×4 = ?", "5×2 = ?"],
+    }
+    analyzer = _make_analyzer(lambda prompt: "```json\n" + json.dumps(payload, ensure_ascii=False) + "\n```")
+    analysis = analyzer.analyze_error("2×3 = ?", "5", "6", "數學")
+
+    assert analyzer.llm.provider_calls == 1
+    assert analysis["root_cause"] == payload["root_cause"]
+    assert analysis["hints"] == payload["hints"]
+    assert analysis["similar_problems"] == payload["similar_problems"]
+    assert "錯誤根源：混淆了加法與乘法" in analysis["analysis"]
+
+
+def test_missing_fields_fall_back():
+    """截斷的 JSON 只針對缺少的欄位補呼叫"""
+    def responder(prompt):
+        if "JSON" in prompt:
+            return '{"root_cause": "計算錯誤", "explanation": "正確答案是 6", "hints": ["先'
+        return "1. 補充提示\n2. 第二個\n3. 第三個"
+
+    analyzer = _make_analyzer(responder)
+    analysis = analyzer.analyze_error("2×3 = ?", "5", "6", "數學")
+
+    assert analysis["root_cause"] == "計算錯誤"
+    assert analysis["explanation"] == "正確答案是 6"
+    assert analysis["hints"] == ["1. 補充提示", "2. 第二個", "3. 第三個"]
+    assert analyzer.llm.provider_calls == 3  # 結構化 + 提示 + 相似題
+
+
+def test_empty_stream_sends_final_explanation():
+    """串流沒有產生內容時，後來補上的解說仍會送給回呼"""
+    analyzer = _make_analyzer(lambda prompt: '{"root_cause": "計算錯誤", "explanation": "正確答案是 6"}')
+    analyzer.llm.generate_stream = lambda prompt, system_message=None: iter(())
+    chunks = []
+    analysis = analyzer.analyze_error("2×3 = ?", "5", "6", "數學", on_explanation_chunk=chunks.append)
+
+    assert analysis["explanation"] == "正確答案是 6"
+    assert chunks == ["正確答案是 6"]
+
+
+def test_parse_analysis_json_normalizes_fields():
+    """字串與陣列欄位會被正規化"""
+    parsed = ErrorAnalyzer._parse_analysis_json(
+        '說明如下：{"root_cause": ["a", "b"], "hints": "一\\n二\\n三\\n四", "similar_problems": []}',
+        ["root_cause", "hints", "similar_problems"]
+    )
+    assert parsed == {"root_cause": "a\nb", "hints": ["一", "二", "三"]}
+    assert ErrorAnalyzer._parse_analysis_json("無法分析", ["root_cause"]) == {}
+
+
+if __name__ == "__main__":
+    test_single_structured_call()
+    test_missing_fields_fall_back()
+    test_empty_stream_sends_final_explanation()
+    test_parse_analysis_json_normalizes_fields()
+    print("✅ 所有錯誤分析測試通過！")
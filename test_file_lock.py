@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原子寫入與跨行程鎖定測試
+"""
+import hashlib
+import multiprocessing
+import tempfile
+from pathlib import Path
+
+from utils.file_lock import FileLock, atomic_write_json
+from utils.storage import JsonFileStorage
+from utils.used_questions import UsedQuestionSet
+
+
+def _worker(data_dir, worker):
+    storage = JsonFileStorage(data_dir)
+    for i in range(20):
+        storage.append_record("S1", {"worker": worker, "i": i, "note": "x" * 500})
+        question = hashlib.md5(f"{worker}:{i}".encode()).hexdigest()
+        storage.save_profile("S1", {
+            "student_id": "S1", "used_questions": UsedQuestionSet([question]).to_profile_value()
+        })
+
+
+def test_workers_share_directory():
+    """多個行程同時寫入同一位學生：紀錄與已使用題目都不遺失，檔案保持完整"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processes = [multiprocessing.Process(target=_worker, args=(tmp, w)) for w in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+
+        storage = JsonFileStorage(tmp)
+        records = storage.get_records("S1")
+        assert sorted((r["worker"], r["i"]) for r in records) == [(w, i) for w in range(4) for i in range(20)]
+        used = UsedQuestionSet.from_profile_value(storage.load_profile("S1")["used_questions"])
+        assert len(used) == 80
+        assert not list(Path(tmp).glob(".*.tmp"))
+
+
+def test_lock_timeout_and_atomic_write():
+    """鎖被占用時逾時；寫入失敗不會留下半個檔案"""
+    with tempfile.TemporaryDirectory() as tmp:
+        lock_path = Path(tmp) / "student_S1.lock"
+        with FileLock(lock_path):
+            try:
+                FileLock(lock_path, timeout=0.05).acquire()
+                assert False, "lock should be held"
+            except TimeoutError:
+                pass
+        with FileLock(lock_path, timeout=0.05):
+            pass
+
+        target = Path(tmp) / "profile.json"
+        atomic_write_json(target, {"a": 1})
+        try:
+            atomic_write_json(target, {"a": object()})
+        except TypeError:
+            pass
+        assert target.read_text(encoding="utf-8") == '{"a": 1}'
+        assert not list(Path(tmp).glob(".*.tmp"))
+
+
+if __name__ == "__main__":
+    test_workers_share_directory()
+    test_lock_timeout_and_atomic_write()
+    print("✅ 原子寫入與跨行程鎖定測試通過")
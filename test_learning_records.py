@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSONL 學習紀錄測試
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from utils.data_processor import DataProcessor
+from utils.record_log import LearningRecordLog, TAIL_BLOCK_SIZE, migrate_directory
+
+
+def _record(i):
+    return {"question_id": i, "subject": "數學", "correct": i % 3 != 0, "score": 100 if i % 3 else 0,
+            "concept_to_reinforce": "長說明" * (i % 50)}
+
+
+def test_append_and_tail_reads():
+    """附加紀錄後，從檔尾讀取的結果與完整讀取的最後幾筆相同"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp)
+        for i in range(500):
+            assert processor.save_learning_record("S1", _record(i))
+
+        path = Path(tmp) / "records_S1.jsonl"
+        assert path.stat().st_size > TAIL_BLOCK_SIZE * 3
+        everything = processor.get_learning_records("S1")
+        assert everything == [_record(i) for i in range(500)]
+        for limit in (1, 7, 120, 500, 900):
+            assert processor.get_learning_records("S1", limit=limit) == everything[-limit:]
+
+        # 寫入中斷的最後一行會被略過
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"question_id": 5')
+        assert processor.get_learning_records("S1", limit=2) == everything[-2:]
+        assert processor.get_learning_records("missing", limit=3) == []
+
+
+def test_legacy_json_is_migrated():
+    """舊版 JSON 陣列紀錄會被轉換成 JSONL，舊紀錄保留在新紀錄之前"""
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = [_record(i) for i in range(5)]
+        with open(Path(tmp) / "records_S2.json", "w", encoding="utf-8") as f:
+            json.dump(legacy, f, ensure_ascii=False, indent=2)
+        with open(Path(tmp) / "records_S3.json", "w", encoding="utf-8") as f:
+            json.dump(legacy, f, ensure_ascii=False, indent=2)
+
+        processor = DataProcessor(tmp)
+        processor.save_learning_record("S2", _record(5))
+        assert processor.get_learning_records("S2") == [_record(i) for i in range(6)]
+        assert not (Path(tmp) / "records_S2.json").exists()
+
+        assert migrate_directory(tmp) == {"records_S3.json": 5}
+        assert LearningRecordLog.read_all(Path(tmp) / "records_S3.jsonl") == legacy
+
+
+def test_fsync_interval_policy():
+    """interval 模式下同一檔案在間隔內只 fsync 一次"""
+    log = LearningRecordLog(fsync_policy="interval", fsync_interval=3600)
+    assert log._should_fsync("a") and not log._should_fsync("a")
+    assert log._should_fsync("b")
+    assert LearningRecordLog(fsync_policy="always")._should_fsync("a")
+    assert not LearningRecordLog(fsync_policy="never")._should_fsync("a")
+
+
+if __name__ == "__main__":
+    test_append_and_tail_reads()
+    test_legacy_json_is_migrated()
+    test_fsync_interval_policy()
+    print("✅ JSONL 學習紀錄測試通過")
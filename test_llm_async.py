@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+非同步與批次 LLM 介面測試
+"""
+import asyncio
+import random
+import threading
+import time
+
+from conftest import make_fake_llm
+from models.llm_client import LLMClient
+from models.error_analyzer import ErrorAnalyzer
+from models.response_cache import ResponseCache
+from models.single_flight import SingleFlight
+
+
+def _make_async_client(max_concurrency: int = 2) -> LLMClient:
+    """建立使用假非同步供應商的客戶端，並記錄同時進行的請求數"""
+    client = LLMClient(use_cache=False, max_concurrency=max_concurrency)
+    client.in_flight = 0
+    client.peak_in_flight = 0
+
+    async def fake_acall(prompt, system_message, temperature, max_tokens):
+        client.provider_calls += 1
+        client.in_flight += 1
+        client.peak_in_flight = max(client.peak_in_flight, client.in_flight)
+        await asyncio.sleep(0.01)
+        client.in_flight -= 1
+        return f"1. 回應 {prompt[:6]}"
+
+    client._acall_provider = fake_acall
+    return client
+
+
+def test_agenerate_text_respects_concurrency_limit():
+    """同時進行的請求不超過供應商上限"""
+    client = _make_async_client(max_concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*[client.agenerate_text(f"題目{i}") for i in range(6)])
+
+    results = asyncio.run(run())
+    assert len(results) == 6
+    assert client.provider_calls == 6
+    assert client.peak_in_flight == 2
+
+
+def test_aanalyze_error_fills_all_fields():
+    """非同步錯誤分析產生與同步版本相同的欄位"""
+    client = _make_async_client(max_concurrency=4)
+    analyzer = ErrorAnalyzer(client)
+
+    analysis = asyncio.run(analyzer.aanalyze_error("1+1=?", "A", "B", "數學"))
+
+    assert analysis["root_cause"]
+    assert analysis["explanation"]
+    assert "錯誤分析總結" in analysis["analysis"]
+    assert client.peak_in_flight > 1  # 多個欄位同時請求
+
+
+def test_generate_batch_preserves_order_and_errors(fake_llm):
+    """批次請求保持順序，單項錯誤不影響其他項目"""
+    def respond(prompt, system_message, max_tokens):
+        time.sleep(random.uniform(0, 0.01))
+        if prompt == "壞題目":
+            raise RuntimeError("供應商錯誤")
+        return f"{system_message or ''}:{prompt}:{max_tokens}"
+
+    client = fake_llm(respond)
+    requests = [
+        "題目0",
+        ("題目1", "系統"),
+        {"prompt": "題目2", "params": {"max_tokens": 10}},
+        "壞題目",
+    ]
+
+    results = client.generate_batch(requests, max_workers=4)
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["text"] == f":題目0:{client.max_tokens}"
+    assert results[1]["text"].startswith("系統:題目1")
+    assert results[2]["text"].endswith(":10")
+    assert results[3]["error"] == "供應商錯誤"
+
+    streamed = list(client.generate_batch(requests, as_completed_order=True))
+    assert sorted(r["index"] for r in streamed) == [0, 1, 2, 3]
+
+
+def test_identical_concurrent_requests_share_one_call(fake_llm):
+    """相同的並行請求只送出一次，所有呼叫者取得相同結果"""
+    release = threading.Event()
+
+    def respond(prompt, system_message, max_tokens):
+        release.wait(timeout=2)
+        return "共用結果"
+
+    client = fake_llm(respond, cache=ResponseCache(db_path=None), single_flight=SingleFlight())
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(client.generate_result("同一題")))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert client.provider_calls == 1
+    assert [r["text"] for r in results] == ["共用結果"] * 5
+    assert sum(1 for r in results if r["shared"]) == 4
+
+
+def test_identical_async_requests_share_one_call():
+    """事件迴圈中相同的請求同樣合併"""
+    client = _make_async_client(max_concurrency=8)
+    client.cache = ResponseCache(db_path=None)
+    client.single_flight = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(*[client.agenerate_text("同一題") for _ in range(4)])
+
+    results = asyncio.run(run())
+    assert len(set(results)) == 1
+    assert client.provider_calls == 1
+
+
+def test_cancelled_leader_hands_call_to_waiter():
+    """帶頭的請求被取消時，等待中的請求改由自己執行，不會一起被取消"""
+    flight = SingleFlight()
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return len(calls)
+
+    async def run():
+        leader = asyncio.ensure_future(flight.ado("同一題", make_call))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.ado("同一題", make_call)) for _ in range(3)]
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        try:
+            await leader
+            assert False, "leader should be cancelled"
+        except asyncio.CancelledError:
+            pass
+        return results
+
+    results = asyncio.run(run())
+    assert [result for result, _ in results] == [2, 2, 2]
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert flight.stats()["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    test_agenerate_text_respects_concurrency_limit()
+    test_aanalyze_error_fills_all_fields()
+    test_generate_batch_preserves_order_and_errors(make_fake_llm)
+    test_identical_concurrent_requests_share_one_call(make_fake_llm)
+    test_identical_async_requests_share_one_call()
+    test_cancelled_leader_hands_call_to_waiter()
+    print("✅ 所有非同步與批次測試通過！")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 回應快取測試
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from conftest import make_fake_llm
+from models.llm_client import LLMClient
+from models.response_cache import ResponseCache
+
+
+def _echo(prompt, system_message, max_tokens):
+    return f"回應：{prompt}"
+
+
+def test_repeated_prompt_hits_cache(fake_llm):
+    """相同請求只呼叫一次供應商"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(db_path=str(Path(tmp) / "cache.sqlite3"))
+        client = fake_llm(_echo, cache=cache)
+
+        first = client.generate_text("題目一", system_message="系統")
+        second = client.generate_text("題目一", system_message="系統")
+        other = client.generate_text("題目一", system_message="系統", max_tokens=50)
+
+        assert first == second == other == "回應：題目一"
+        assert len(client.prompts) == 2  # max_tokens 不同需重新呼叫
+        stats = client.cache_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["provider_calls"] == 2
+
+
+def test_disk_tier_survives_new_cache_instance(fake_llm):
+    """記憶體層清空後仍可由 SQLite 層命中"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "cache.sqlite3")
+        fake_llm(_echo, cache=ResponseCache(db_path=db_path)).generate_text("持久化")
+
+        client = fake_llm(_echo, cache=ResponseCache(db_path=db_path))
+        assert client.generate_text("持久化") == "回應：持久化"
+        assert client.prompts == []
+        assert client.cache.stats()["disk_hits"] == 1
+
+
+def test_ttl_and_eviction():
+    """過期項目與超出容量的項目會被移除"""
+    cache = ResponseCache(db_path=None, ttl=1, memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.set("c", "3")
+    assert cache.get("a") is None  # LRU 淘汰
+    assert cache.get("c") == "3"
+
+    cache.ttl = 0.01
+    time.sleep(0.02)
+    assert cache.get("c") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_disk_size_bound():
+    """磁碟層數量不超過上限"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(db_path=str(Path(tmp) / "cache.sqlite3"), max_entries=10)
+        for i in range(25):
+            cache.set(f"k{i}", str(i))
+        assert cache.stats()["disk_size"] <= 10
+        assert cache.get("k24") == "24"
+
+
+def test_overwrite_does_not_grow_disk_size():
+    """覆寫同一個鍵不增加磁碟層計數，也不觸發淘汰"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(db_path=str(Path(tmp) / "cache.sqlite3"), max_entries=10)
+        for i in range(5):
+            cache.set(f"k{i}", str(i))
+        for _ in range(20):
+            cache.set("k0", "new")
+        assert cache.stats()["disk_size"] == 5
+        assert cache.stats()["disk_evictions"] == 0
+        assert all(cache.get(f"k{i}") is not None for i in range(5))
+
+
+def test_stream_chunks_are_cached():
+    """串流輸出完成後寫入快取，再次請求直接回傳完整內容"""
+    cache = ResponseCache(db_path=None)
+    client = LLMClient(cache=cache)
+
+    def fake_stream(prompt, system_message, temperature, max_tokens):
+        client.provider_calls += 1
+        yield "  "
+        yield "第一段，"
+        yield "第二段 "
+
+    client._stream_provider = fake_stream
+
+    chunks = list(client.generate_stream("解釋"))
+    assert chunks == ["第一段，", "第二段 "]
+    assert list(client.generate_stream("解釋")) == ["第一段，第二段"]
+    assert client.generate_text("解釋") == "第一段，第二段"
+    assert client.provider_calls == 1
+
+
+if __name__ == "__main__":
+    test_repeated_prompt_hits_cache(make_fake_llm)
+    test_disk_tier_survives_new_cache_instance(make_fake_llm)
+    test_ttl_and_eviction()
+    test_disk_size_bound()
+    test_overwrite_does_not_grow_disk_size()
+    test_stream_chunks_are_cached()
+    print("✅ 所有快取測試通過！")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 重試、退避與斷路器測試
+"""
+import models.llm_client as llm_client_module
+from conftest import make_fake_llm
+from models.llm_client import LLMClient
+from models.resilience import (
+    CircuitBreaker,
+    ERROR_CIRCUIT_OPEN,
+    ERROR_FATAL,
+    ERROR_RATE_LIMIT,
+    ERROR_TRANSIENT,
+    classify_error,
+)
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def _make_client(responses, failure_threshold: int = 5) -> LLMClient:
+    """依序回傳 responses（例外則拋出）的假客戶端"""
+    client = make_fake_llm(list(responses))
+    client.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=60)
+    return client
+
+
+def _without_backoff(test):
+    """測試期間不等待退避時間"""
+    def wrapper():
+        original = llm_client_module.backoff_delay
+        llm_client_module.backoff_delay = lambda attempt, error_type: 0
+        try:
+            test()
+        finally:
+            llm_client_module.backoff_delay = original
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+def test_classify_error():
+    """依例外類型與訊息分類"""
+    assert classify_error(RateLimitError("slow down")) == ERROR_RATE_LIMIT
+    assert classify_error(Exception("429 Resource exhausted")) == ERROR_RATE_LIMIT
+    assert classify_error(TimeoutError()) == ERROR_TRANSIENT
+    assert classify_error(Exception("503 Service Unavailable")) == ERROR_TRANSIENT
+    assert classify_error(ValueError("invalid api key")) == ERROR_FATAL
+
+
+@_without_backoff
+def test_transient_errors_are_retried():
+    """暫時性錯誤會重試直到成功"""
+    client = _make_client([TimeoutError("timed out"), RateLimitError("429"), "成功"])
+    result = client.generate_result("題目")
+    assert result["ok"] and result["text"] == "成功"
+    assert result["attempts"] == 3
+
+
+@_without_backoff
+def test_fatal_errors_are_not_retried():
+    """致命錯誤立即回傳結構化錯誤"""
+    client = _make_client([ValueError("invalid api key"), "不應被呼叫"])
+    result = client.generate_result("題目")
+    assert not result["ok"]
+    assert result["error_type"] == ERROR_FATAL
+    assert client.provider_calls == 1
+    assert client.generate_text("題目") == "不應被呼叫"
+
+
+@_without_backoff
+def test_circuit_opens_and_fails_fast():
+    """連續失敗後斷路器開啟，之後的呼叫不再送出"""
+    client = _make_client([TimeoutError()] * 10, failure_threshold=2)
+    client.max_retries = 5
+
+    first = client.generate_result("題目")
+    assert first["error_type"] == ERROR_CIRCUIT_OPEN
+    assert client.provider_calls == 2
+
+    second = client.generate_result("題目")
+    assert second["error_type"] == ERROR_CIRCUIT_OPEN
+    assert second["attempts"] == 0
+    assert client.provider_calls == 2
+    assert not client.breaker.allow_request()
+
+
+if __name__ == "__main__":
+    test_classify_error()
+    test_transient_errors_are_retried()
+    test_fatal_errors_are_not_retried()
+    test_circuit_opens_and_fails_fast()
+    print("✅ 所有重試與斷路器測試通過！")
@@ -4,7 +4,7 @@
 測試新功能：科目糾正和觀念記錄
 """
 
-from main import KnowledgeFuelStation
+from conftest import isolated_app
 from config import SUBJECTS
 
 def test_subject_correction():
@@ -13,7 +13,7 @@ def test_subject_correction():
     print("測試科目名稱糾正功能")
     print("="*60)
     
-    app = KnowledgeFuelStation()
+    app = isolated_app()
     
     # 測試案例
     test_cases = [
@@ -51,7 +51,7 @@ def test_concept_extraction():
     print("\n\n測試觀念提取功能")
     print("="*60)
     
-    app = KnowledgeFuelStation()
+    app = isolated_app()
     
     # 模擬錯誤分析
     test_cases = [
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+學習進度累計統計測試
+"""
+import tempfile
+from pathlib import Path
+
+from utils.data_processor import DataProcessor
+from utils.progress_aggregates import ProgressAggregates
+from utils.lru_cache import LRUCache
+from utils.storage import SQLiteStorage
+
+SUBJECTS = ["數學", "英語", "自然", "社會"]
+SCOPES = ["一元一次方程式", "", "現在進行式", "酸與鹼", "負數與數線"]
+
+
+def _record(i):
+    record = {
+        "timestamp": f"2025-01-01T00:{i // 60:02d}:{i % 60:02d}",
+        "question_id": i,
+        "correct": i % 3 == 0 or i % 7 == 0,
+        "subject": SUBJECTS[i % 4],
+        "score": 100 if i % 3 == 0 else 0,
+        "concept_to_reinforce": f"概念{i % 6}",
+        "scope": SCOPES[i % 5],
+    }
+    if i % 11 == 0:
+        del record["correct"]
+    return record
+
+
+def test_aggregates_match_record_scan():
+    """累計統計得到的進度摘要、弱科與錯誤範圍和逐筆掃描紀錄相同"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp, buffer_records=False)
+        processor._aggregates.clear()
+        for i in range(130):
+            processor.save_learning_record("S1", _record(i))
+            if i in (0, 9, 49, 129):
+                for num_records in (1, 10, 20, 50, 200):
+                    assert processor._get_aggregates("S1").progress_stats(num_records) in (
+                        None, processor.storage.progress_stats("S1", num_records)
+                    )
+                    assert processor._progress_stats("S1", num_records) == \
+                        processor.storage.progress_stats("S1", num_records)
+                assert list(processor.get_error_scope_counts("S1").items()) == \
+                    list(processor.storage.error_scope_counts("S1").items())
+
+        # 視窗內的摘要不讀取學習紀錄
+        def no_scan(*args, **kwargs):
+            raise AssertionError("records were scanned")
+        expected = processor.get_progress_summary("S1", num_records=20)
+        processor.storage.get_records = no_scan
+        processor.storage.progress_stats = no_scan
+        processor.storage.error_scope_counts = no_scan
+        assert processor.get_progress_summary("S1", num_records=20) == expected
+        assert processor.calculate_weak_subjects("S1")
+        assert processor.get_error_scope_counts("S1")
+
+
+def test_aggregates_rebuilt_for_existing_records():
+    """沒有累計統計的舊學生會從紀錄重建一次，重新開啟後從儲存載入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp)
+        for i in range(30):
+            processor.storage.append_record("OLD", _record(i))
+        summary = processor.get_progress_summary("OLD", num_records=20)
+        assert summary["total_questions"] == 20
+        assert summary["weak_areas"] == processor.calculate_weak_subjects("OLD")
+
+        reopened = DataProcessor(tmp)
+        saved = ProgressAggregates.from_dict(reopened.storage.load_aggregates("OLD"))
+        assert saved is not None and saved.count == 30
+        assert reopened.get_progress_summary("OLD", num_records=20) == summary
+        assert ProgressAggregates.from_dict({"version": 0}) is None
+
+
+def test_workers_merge_aggregates():
+    """兩個行程（各自的 DataProcessor）寫同一位學生，儲存的累計統計包含兩邊的紀錄"""
+    for backend in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as tmp:
+            def open_processor(buffer_records):
+                storage = SQLiteStorage(str(Path(tmp) / "students.db")) if backend == "sqlite" else None
+                return DataProcessor(tmp, storage=storage, buffer_records=buffer_records)
+            first, second = open_processor(False), open_processor(True)
+            for i in range(40):
+                (first if i % 2 else second).save_learning_record("S1", _record(i))
+                if i == 20:
+                    first.get_progress_summary("S1")
+            assert second.flush_records()
+
+            saved = ProgressAggregates.from_dict(first.storage.load_aggregates("S1"))
+            expected = ProgressAggregates.from_records(first.storage.get_records("S1"))
+            assert saved.count == 40
+            assert saved.subjects == expected.subjects and saved.scopes == expected.scopes
+
+
+def test_aggregates_cache_is_bounded():
+    """記憶體中的累計統計有上限，被淘汰的學生重新載入時包含尚未寫入的紀錄"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp)
+        processor._aggregates = LRUCache(2)
+        for student_id in ("S1", "S2", "S3"):
+            for i in range(3):
+                processor.save_learning_record(student_id, _record(i))
+        assert len(processor._aggregates) == 2
+        assert processor.record_buffer.pending("S1") == 3
+        assert processor._get_aggregates("S1").count == 3
+        assert processor.flush_records()
+        assert processor._get_aggregates("S1").count == 3
+        assert ProgressAggregates.from_dict(processor.storage.load_aggregates("S1")).count == 3
+
+
+if __name__ == "__main__":
+    test_aggregates_match_record_scan()
+    test_aggregates_rebuilt_for_existing_records()
+    test_workers_merge_aggregates()
+    test_aggregates_cache_is_bounded()
+    print("✅ 學習進度累計統計測試通過")
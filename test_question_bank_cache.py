@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+題庫編譯快取測試
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import utils.question_bank_parser as parser_module
+from utils.question_bank_parser import load_question_bank
+
+BANK_FILE = Path(__file__).resolve().parent / "question_banks" / "math.txt"
+
+
+def _count_parses(test):
+    """記錄實際解析題庫的次數"""
+    def wrapper():
+        original = parser_module._parse_bank_chunk
+        calls = []
+
+        def counting_parse(task):
+            calls.append(task[0])
+            return original(task)
+
+        parser_module._parse_bank_chunk = counting_parse
+        try:
+            test(calls)
+        finally:
+            parser_module._parse_bank_chunk = original
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@_count_parses
+def test_cache_matches_parser_and_skips_reparse(calls):
+    """快取結果與直接解析相同，未變更的題庫不再解析"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = os.path.join(tmp, "math.txt")
+        shutil.copy(BANK_FILE, bank)
+
+        expected = load_question_bank(bank, "數學", use_cache=False)
+        first = load_question_bank(bank, "數學")
+        second = load_question_bank(bank, "數學")
+
+        assert os.path.exists(bank + parser_module.CACHE_SUFFIX)
+        assert first == second == expected
+        assert len(calls) == 1  # 只有建立快取時解析
+        assert {q["subject"] for q in load_question_bank(bank, "語文")} == {"語文"}
+        assert len(calls) == 1
+
+
+@_count_parses
+def test_cache_invalidation(calls):
+    """內容或解析器版本改變時重新解析；只更新時間則沿用快取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = os.path.join(tmp, "math.txt")
+        shutil.copy(BANK_FILE, bank)
+        load_question_bank(bank, "數學")
+        assert len(calls) == 1
+
+        os.utime(bank, ns=(0, 0))
+        load_question_bank(bank, "數學")
+        assert len(calls) == 1  # 雜湊相同
+
+        with open(bank, "a", encoding="utf-8") as f:
+            f.write("\n")
+        load_question_bank(bank, "數學")
+        assert len(calls) == 2
+
+        original_version = parser_module.PARSER_VERSION
+        parser_module.PARSER_VERSION = original_version + 1
+        try:
+            load_question_bank(bank, "數學")
+            assert len(calls) == 3
+        finally:
+            parser_module.PARSER_VERSION = original_version
+
+
+if __name__ == "__main__":
+    test_cache_matches_parser_and_skips_reparse()
+    test_cache_invalidation()
+    print("✅ 所有題庫快取測試通過！")
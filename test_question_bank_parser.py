@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+題庫解析器測試：串流解析與線性時間的內嵌選項拆分
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from utils.question_bank_parser import (
+    BLOCK_SEPARATOR,
+    QuestionBankParser,
+    iter_questions,
+    load_all_banks,
+    load_banks,
+    split_inline_options,
+)
+
+BANK_DIR = Path(__file__).resolve().parent / "question_banks"
+
+
+def test_split_inline_options():
+    """單行內嵌選項（含全形與小寫）"""
+    stem, options = split_inline_options("下列何者正確？ (A) 甲 （Ｂ）乙 (c)丙 (D) 丁")
+    assert stem == "下列何者正確？"
+    assert options == {"A": "甲", "B": "乙", "C": "丙", "D": "丁"}
+
+    # 選項文字中夾雜其他括號時，該選項不成立
+    stem, options = split_inline_options("題目 (A) 甲(注) (B) 乙")
+    assert options == {"B": "乙"}
+    assert stem == "題目"
+
+
+def test_inline_options_linear_time():
+    """長題幹不會造成回溯爆炸"""
+    text = "題 (A)" + " " * 200000 + "(注)"
+    start = time.perf_counter()
+    stem, options = split_inline_options(text)
+    assert time.perf_counter() - start < 0.5
+    assert options == {}
+
+
+def test_iter_questions_streams_lines():
+    """可直接從逐行文字串流解析，結果與整份內容解析相同"""
+    lines = ["【測試題庫】\n"]
+    for i, answer in enumerate("BD"):
+        lines += [
+            BLOCK_SEPARATOR + "\n",
+            "【範圍】單元一\n",
+            "【題目】\n",
+            f"（） {i + 1}、第{i + 1}題 (A) 一 (B) 二 (C) 三 (D) 四\n",
+            f"【答案】 （{answer}） 解析\n",
+        ]
+
+    questions = list(iter_questions(iter(lines), "數學"))
+    assert [q["correct_answer"] for q in questions] == ["B", "D"]
+    assert questions[0]["question"] == "（） 1、第1題"
+    assert questions[0]["scope"] == "單元一"
+    assert questions[0]["explanation"] == ""  # 只有答案標記的行不算解析
+    assert questions == QuestionBankParser()._parse_content("".join(lines), "數學")
+
+
+def test_parallel_load_matches_serial_parse():
+    """分段平行解析的結果與逐檔解析完全相同且順序固定（內容少時不啟動行程也相同）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in BANK_DIR.glob("*.txt"):
+            shutil.copy(path, tmp)
+        banks = [(str(path), path.stem) for path in sorted(Path(tmp).glob("*.txt"))]
+
+        expected = [QuestionBankParser().parse_file(path, subject) for path, subject in banks]
+        assert load_banks(banks, max_workers=2, use_cache=False, chunk_chars=5000, parallel_min_chars=0) == expected
+        assert load_banks(banks, max_workers=2, use_cache=False, chunk_chars=5000) == expected
+
+        merged = load_all_banks(tmp, max_workers=2, use_cache=False)
+        assert list(merged) == ["語文", "英語", "數學", "自然", "社會"]
+        assert sum(len(questions) for questions in merged.values()) == sum(len(q) for q in expected)
+
+
+if __name__ == "__main__":
+    test_split_inline_options()
+    test_inline_options_linear_time()
+    test_iter_questions_streams_lines()
+    test_parallel_load_matches_serial_parse()
+    print("✅ 所有題庫解析測試通過！")
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+題組批次生成測試：一次呼叫生成多題，只重新請求無效的題目
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from config import SUBJECT_TOPICS
+from conftest import make_fake_llm
+from models.question_generator import QuestionGenerator
+from models.question_pool import QuestionPool
+from models.response_cache import ResponseCache
+from utils.bank_store import question_hash
+from utils.used_questions import UsedQuestionSet
+
+
+def _item(question: str, answer: str = "B") -> dict:
+    return {
+        "topic": "代數",
+        "question": question,
+        "options": {"A": "1", "B": "2", "C": "3", "D": "4"},
+        "answer": answer,
+        "explanation": "說明",
+    }
+
+
+def _make_generator(responses, cache=None) -> QuestionGenerator:
+    """依序回傳 responses 的假供應商"""
+    return QuestionGenerator(make_fake_llm(list(responses), cache=cache), batch_mode=True)
+
+
+def test_question_set_in_one_call():
+    """三題只需一次供應商呼叫"""
+    payload = [_item("1+1=?"), _item("4÷2=?"), _item("5-3=?")]
+    generator = _make_generator(["```json\n" + json.dumps(payload, ensure_ascii=False) + "\n```"])
+    questions = generator.generate_questions({"grade": "國一"}, num_questions=3, subject="數學")
+
+    assert generator.llm.provider_calls == 1
+    assert [q["question"] for q in questions] == ["1+1=?", "4÷2=?", "5-3=?"]
+    assert [q["id"] for q in questions] == [1, 2, 3]
+    assert questions[0]["standard_answer"] == "B"
+
+
+def test_invalid_items_are_re_requested():
+    """無效或重複的題目會被剔除，只補請求缺少的數量"""
+    first = [_item("1+1=?"), _item("2+2=?", answer="E"), _item("1+1=?")]
+    second = [_item("3+3=?")]
+    generator = _make_generator([json.dumps(first), json.dumps(second)])
+    questions = generator.generate_questions({"grade": "國一"}, num_questions=3, subject="數學")
+
+    assert generator.llm.provider_calls == 2
+    assert "生成2個數學選擇題" in generator.llm.prompts[1]
+    assert "1+1=?" in generator.llm.prompts[1]  # 提醒避免重複
+    assert [q["question"] for q in questions] == ["1+1=?", "3+3=?"]
+
+
+def test_truncated_array_keeps_complete_items():
+    """被截斷的 JSON 陣列仍保留完整的題目"""
+    text = json.dumps([_item("1+1=?"), _item("2+2=?")], ensure_ascii=False)[:-40]
+    items = QuestionGenerator._parse_question_set(text)
+    valid = [QuestionGenerator._validate_question_item(item) for item in items]
+    assert [item["question"] for item in valid if item] == ["1+1=?"]
+
+
+def test_pool_serves_before_live_generation():
+    """題目池有題目時直接取用，取用後於背景補充"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "pool.sqlite3")
+        refills = []
+
+        def refill(subject, topic, difficulty, grade, count):
+            refills.append(topic)
+            return [_item(f"{topic} 補充題 {i}") for i in range(count)]
+
+        pool = QuestionPool(db_path=db_path, low_water=2, refill_size=2, refill=refill)
+        key = pool.make_key("數學", "代數", "medium", "國一")
+        pool.put(key, [_item("池中題一"), _item("池中題二")])
+
+        generator = _make_generator([])
+        generator.pool = pool
+        profile = {"grade": "國一", "recent_topics": ["代數"]}
+        questions = generator.generate_questions(profile, num_questions=2, subject="數學", difficulty="medium")
+
+        assert [q["question"] for q in questions] == ["池中題一", "池中題二"]
+        assert generator.llm.provider_calls == 0
+        assert pool.wait_idle(timeout=5)
+        assert "代數" in refills
+        assert pool.size(key) == 2
+
+        # 題目池持久化於 SQLite
+        reopened = QuestionPool(db_path=db_path)
+        assert reopened.size(key) == 2
+
+
+def test_pool_miss_falls_back_to_live():
+    """題目池不足時只即時生成缺少的數量"""
+    pool = QuestionPool(db_path=None, low_water=0)
+    pool.put(pool.make_key("數學", "代數", "medium", "國一"), [_item("池中題")])
+    generator = _make_generator([json.dumps([_item("即時題")], ensure_ascii=False)])
+    generator.pool = pool
+    questions = generator.generate_questions(
+        {"grade": "國一", "recent_topics": ["代數"]}, num_questions=2, subject="數學", difficulty="medium"
+    )
+
+    assert [q["question"] for q in questions] == ["池中題", "即時題"]
+    assert "生成1個數學選擇題" in generator.llm.prompts[0]
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+
+def test_pool_is_shared_through_sqlite():
+    """兩個行程共用同一個題目池檔案時，同一題只會被取用一次"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "pool.sqlite3")
+        first = QuestionPool(db_path=db_path, low_water=0)
+        second = QuestionPool(db_path=db_path, low_water=0)
+        key = first.make_key("數學", "代數", "medium", "國一")
+        first.put(key, [_item(f"池中題{i}") for i in range(3)])
+
+        taken = second.take("數學", ["代數"], "medium", "國一", 2)
+        taken += first.take("數學", ["代數"], "medium", "國一", 3)
+        assert sorted(q["question"] for q in taken) == ["池中題0", "池中題1", "池中題2"]
+        assert first.size(key) == second.size(key) == 0
+
+
+def test_pool_skips_questions_the_student_has_seen():
+    """學生做過的題目留在池中給其他學生"""
+    pool = QuestionPool(db_path=None, low_water=0)
+    key = pool.make_key("數學", "代數", "medium", "國一")
+    pool.put(key, [_item("做過的題"), _item("新題")])
+    generator = _make_generator([])
+    generator.pool = pool
+    profile = {
+        "grade": "國一", "recent_topics": ["代數"],
+        "used_questions": UsedQuestionSet([question_hash({"subject": "數學", "question": "做過的題"})])
+    }
+    questions = generator.generate_questions(profile, num_questions=1, subject="數學", difficulty="medium")
+
+    assert [q["question"] for q in questions] == ["新題"]
+    assert pool.take("數學", ["代數"], "medium", "國一", 1)[0]["question"] == "做過的題"
+
+
+def test_warm_pool_is_capped():
+    """登入時只補充最先會被抽到的幾個題目池，已足量或已排程的不重複補充"""
+    refills = []
+
+    def refill(subject, topic, difficulty, grade, count):
+        refills.append((subject, topic))
+        return [_item(f"{topic} 題 {i}") for i in range(count)]
+
+    pool = QuestionPool(db_path=None, low_water=1, refill_size=1, refill=refill)
+    generator = _make_generator([])
+    generator.pool = pool
+    profile = {"grade": "國一", "weak_subjects": ["數學", "英語"], "recent_topics": ["代數"]}
+
+    assert generator.warm_pool(profile, max_keys=3) == 3
+    assert pool.wait_idle(timeout=5)
+    assert refills == [("數學", "代數"), ("英語", "代數"), ("數學", SUBJECT_TOPICS["數學"][0])]
+
+    # 已補充的題目池不再排程，改補下一批
+    assert generator.warm_pool(profile, max_keys=1) == 1
+    assert pool.wait_idle(timeout=5)
+    assert refills[-1] == ("英語", SUBJECT_TOPICS["英語"][0])
+
+
+def test_live_generation_bypasses_response_cache():
+    """即時出題不使用回應快取，同一學生再次出題仍會呼叫供應商"""
+    payload = json.dumps([_item("1+1=?")], ensure_ascii=False)
+    generator = _make_generator([payload, payload], cache=ResponseCache(db_path=None))
+    for _ in range(2):
+        generator.generate_questions({"grade": "國一"}, num_questions=1, subject="數學")
+    assert generator.llm.provider_calls == 2
+    assert generator.llm.cache_stats()["hits"] == 0
+
+
+if __name__ == "__main__":
+    test_question_set_in_one_call()
+    test_invalid_items_are_re_requested()
+    test_truncated_array_keeps_complete_items()
+    test_pool_serves_before_live_generation()
+    test_pool_miss_falls_back_to_live()
+    test_pool_is_shared_through_sqlite()
+    test_pool_skips_questions_the_student_has_seen()
+    test_warm_pool_is_capped()
+    test_live_generation_bypasses_response_cache()
+    print("✅ 所有題組生成測試通過！")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+洗牌排列抽題器測試
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from utils.bank_store import MemoryBankStore
+from utils.data_processor import DataProcessor
+from utils.question_sampler import QuestionSampler
+from utils.used_questions import UsedQuestionSet
+
+
+def _store(count, subject="數學"):
+    store = MemoryBankStore()
+    store.add_questions([
+        {"subject": subject, "scope": f"單元{i % 3}", "question": f"題目{i}", "options": {}, "correct_answer": "A"}
+        for i in range(count)
+    ])
+    return store
+
+
+def test_draws_without_replacement_and_reshuffles():
+    """一輪內不重複抽出所有題目，抽完後重新洗牌"""
+    store = _store(20)
+    sampler = QuestionSampler(store, seed=7)
+    cursors = {}
+    first_round = [sampler.draw(cursors, "數學") for _ in range(20)]
+    assert sorted(first_round) == list(range(20))
+    assert first_round != list(range(20))
+
+    second_round = [sampler.draw(cursors, "數學") for _ in range(20)]
+    assert sorted(second_round) == list(range(20))
+    assert second_round != first_round
+    assert sampler.draw(cursors, "英語") is None
+
+
+def test_seeded_and_persisted_cursors_resume():
+    """相同種子得到相同順序；游標經 JSON 保存後可接續抽題"""
+    store = _store(30)
+    cursors = {}
+    sequence = [QuestionSampler(store, seed=1).draw(cursors, "數學", "單元1") for _ in range(10)]
+    assert all(store.get(i)["scope"] == "單元1" for i in sequence)
+
+    cursors = {}
+    sampler = QuestionSampler(store, seed=1)
+    head = [sampler.draw(cursors, "數學", "單元1") for _ in range(4)]
+    restored = json.loads(json.dumps(cursors))
+    tail = [QuestionSampler(store, seed=1).draw(restored, "數學", "單元1") for _ in range(6)]
+    assert head + tail == sequence
+
+
+def test_used_questions_are_skipped():
+    """已使用題目被略過，全部用過時回傳 None；題庫變更時重新開始"""
+    store = _store(10)
+    sampler = QuestionSampler(store, seed=3)
+    cursors = {}
+    used = UsedQuestionSet(store.question_id(i) for i in range(0, 10, 2))
+    drawn = sampler.draw_many(cursors, 10, "數學", used=used)
+    assert sorted(drawn) == [1, 3, 5, 7, 9]
+    used.update(store.question_id(i) for i in drawn)
+    assert sampler.draw(cursors, "數學", used=used) is None
+
+    store.add_questions([{"subject": "數學", "scope": "單元0", "question": "新題目"}])
+    assert sampler.draw(cursors, "數學", used=used) == 10
+    assert cursors["數學|*"]["size"] == 11
+
+
+def test_data_processor_uses_cursors():
+    """DataProcessor 提供游標時依排列抽題，範圍題目都用過時允許重複"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = Path(tmp) / "bank.txt"
+        blocks = [
+            f"【範圍】單元\n【題目】\n（） {i + 1}、題目{i}？\n(A) 1\n(B) 2\n(C) 3\n(D) 4\n\n【答案】\n（A） 解析\n"
+            for i in range(6)
+        ]
+        bank.write_text(("=" * 40 + "\n").join(blocks), encoding="utf-8")
+        processor = DataProcessor(tmp)
+        processor.load_question_bank_file(str(bank), "數學")
+
+        profile = {"question_cursors": {}}
+        used = UsedQuestionSet()
+        for _ in range(6):
+            question = processor.get_question_from_bank("數學", used, profile["question_cursors"])
+            used.add(processor._get_question_hash(question))
+        assert len(used) == 6
+        assert processor.get_question_from_bank("數學", used, profile["question_cursors"]) is None
+        repeats = processor.get_questions_by_scope("單元", "數學", used, limit=3, cursors=profile["question_cursors"])
+        assert len({q["question"] for q in repeats}) == 3
+
+
+if __name__ == "__main__":
+    test_draws_without_replacement_and_reshuffles()
+    test_seeded_and_persisted_cursors_resume()
+    test_used_questions_are_skipped()
+    test_data_processor_uses_cursors()
+    print("✅ 洗牌排列抽題器測試通過")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+學習紀錄寫入緩衝測試
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from utils import data_processor, record_log
+from utils.data_processor import DataProcessor
+from utils.progress_aggregates import ProgressAggregates
+from utils.record_buffer import RecordBuffer
+
+
+def _record(i):
+    return {
+        "timestamp": f"2025-01-01T00:00:{i:02d}", "question_id": i, "correct": i % 2 == 0,
+        "subject": "數學", "score": 100 if i % 2 == 0 else 0,
+        "concept_to_reinforce": "", "scope": f"單元{i % 3}"
+    }
+
+
+def test_records_are_batched():
+    """紀錄先寫入日誌，達到筆數門檻或讀取時才寫入儲存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp)
+        processor.record_buffer.max_records = 5
+        records_path = Path(tmp) / "records_S1.jsonl"
+        journal_path = processor.record_buffer.journal_path("S1")
+
+        for i in range(4):
+            assert processor.save_learning_record("S1", _record(i))
+        assert not records_path.exists() and journal_path.exists()
+        assert processor.get_progress_summary("S1", num_records=4)["total_questions"] == 4
+
+        assert processor.save_learning_record("S1", _record(4))
+        assert processor.record_buffer.pending() == 0 and not journal_path.exists()
+        assert processor.storage.get_records("S1") == [_record(i) for i in range(5)]
+
+        processor.save_learning_record("S1", _record(5))
+        assert processor.get_learning_records("S1", limit=2) == [_record(4), _record(5)]
+        assert processor.record_buffer.pending() == 0
+
+
+def test_journal_is_replayed_after_crash():
+    """未寫入儲存的日誌在下次啟動時補寫，並重建累計統計"""
+    with tempfile.TemporaryDirectory() as tmp:
+        crashed = DataProcessor(tmp)
+        crashed.record_buffer.max_records = 100
+        crashed.save_learning_record("S1", _record(0))
+        crashed.flush_records()
+        for i in range(1, 8):
+            crashed.save_learning_record("S1", _record(i))
+        # 執行中的行程鎖住自己的日誌，其他行程不會補寫
+        assert DataProcessor(tmp).storage.get_records("S1") == [_record(0)]
+
+        # 模擬當機：緩衝內容遺失、日誌的鎖被釋放
+        for journal in crashed.record_buffer._journals.values():
+            journal.close()
+        crashed.record_buffer._journals.clear()
+        crashed.record_buffer._pending.clear()
+        crashed.record_buffer._pending_count = 0
+
+        restarted = DataProcessor(tmp)
+        assert restarted.storage.get_records("S1") == [_record(i) for i in range(8)]
+        assert not list(Path(tmp).glob("pending_*.journal"))
+        saved = ProgressAggregates.from_dict(restarted.storage.load_aggregates("S1"))
+        assert saved.count == 8
+
+
+def test_replay_skips_records_already_stored():
+    """寫入儲存後、刪除日誌前中斷時，補寫不會重複"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp, buffer_records=False)
+        buffer = RecordBuffer(processor.storage, tmp)
+        for i in range(6):
+            buffer.add("S1", _record(i))
+        processor.storage.append_records("S1", [_record(i) for i in range(4)])
+        buffer._journals.pop("S1").close()
+
+        assert RecordBuffer(processor.storage, tmp).replay() == {"S1": 2}
+        assert processor.storage.get_records("S1") == [_record(i) for i in range(6)]
+
+
+def test_journal_kept_until_durable_write():
+    """寫入儲存時要求 fsync，儲存回報寫入完成前日誌仍在"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp)
+        buffer = processor.record_buffer
+        buffer.max_records = 100
+        processor.storage.record_log.fsync_policy = "never"
+        for i in range(3):
+            processor.save_learning_record("S1", _record(i))
+
+        calls = []
+        append_records = processor.storage.append_records
+        fsync = record_log.os.fsync
+
+        def spy_append(student_id, records, durable=False):
+            calls.append((durable, buffer.journal_path(student_id).exists()))
+            return append_records(student_id, records, durable=durable)
+
+        fsynced = []
+        processor.storage.append_records = spy_append
+        record_log.os.fsync = lambda fd: fsynced.append(fd) or fsync(fd)
+        try:
+            processor.flush_records()
+        finally:
+            record_log.os.fsync = fsync
+        assert calls == [(True, True)]
+        assert fsynced  # fsync_policy 為 never 也會 fsync
+        assert not buffer.journal_path("S1").exists()
+
+        # 寫入失敗時日誌保留
+        def failing_append(student_id, records, durable=False):
+            raise OSError("disk full")
+
+        processor.save_learning_record("S1", _record(3))
+        processor.storage.append_records = failing_append
+        try:
+            buffer.flush()
+        except OSError:
+            pass
+        assert buffer.journal_path("S1").exists() and buffer.pending("S1") == 1
+
+
+def test_idle_buffer_is_flushed_by_age():
+    """沒有新紀錄時，背景檢查也會把等待過久的紀錄寫入儲存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp)
+        processor.record_buffer.max_seconds = 0.05
+        assert data_processor._flush_thread.is_alive()
+
+        processor.save_learning_record("S1", _record(0))
+        assert not processor.flush_due_records()
+        assert processor.storage.get_records("S1") == []
+        time.sleep(0.06)
+        processor.flush_due_records()  # 背景執行緒也可能先寫入
+        assert processor.record_buffer.pending() == 0
+        assert processor.storage.get_records("S1") == [_record(0)]
+
+
+if __name__ == "__main__":
+    test_records_are_batched()
+    test_journal_is_replayed_after_crash()
+    test_replay_skips_records_already_stored()
+    test_journal_kept_until_durable_write()
+    test_idle_buffer_is_flushed_by_age()
+    print("✅ 學習紀錄寫入緩衝測試通過")
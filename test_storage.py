@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+學生資料儲存後端測試（JSON 檔案與 SQLite）
+"""
+import hashlib
+import tempfile
+from pathlib import Path
+
+from utils.data_processor import DataProcessor
+from utils.storage import JsonFileStorage, SQLiteStorage, StudentStorage, copy_storage
+from utils.used_questions import UsedQuestionSet
+
+SUBJECTS = ["數學", "英語", "自然"]
+SCOPES = ["一元一次方程式", "", "現在進行式", "酸與鹼"]
+HASHES = [hashlib.md5(text.encode()).hexdigest() for text in "abcd"]
+
+
+def _fill(processor, student_id):
+    processor.save_student_profile(student_id, {
+        "student_id": student_id, "name": "測試", "grade": "7", "used_questions": HASHES[:2]
+    })
+    for i in range(45):
+        processor.save_learning_record(student_id, {
+            "timestamp": f"2025-01-01T00:00:{i:02d}", "question_id": i, "correct": i % 3 == 0,
+            "subject": SUBJECTS[i % 3], "score": 100 if i % 3 == 0 else 0,
+            "concept_to_reinforce": f"概念{i % 4}", "scope": SCOPES[i % 4]
+        })
+    processor.save_learning_record(student_id, {"subject": "社會", "score": 50})
+
+
+def test_backends_agree():
+    """兩種後端的學習紀錄、進度統計與錯誤範圍統計一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        json_processor = DataProcessor(tmp, storage=JsonFileStorage(str(Path(tmp) / "json")))
+        sqlite_storage = SQLiteStorage(str(Path(tmp) / "students.sqlite3"))
+        sqlite_processor = DataProcessor(tmp, storage=sqlite_storage)
+        for processor in (json_processor, sqlite_processor):
+            _fill(processor, "S1")
+            _fill(processor, "S2")
+
+        for student_id in ("S1", "S2", "missing"):
+            for limit in (None, 1, 10, 100):
+                assert sqlite_processor.get_learning_records(student_id, limit) == \
+                    json_processor.get_learning_records(student_id, limit)
+            for num_records in (1, 5, 20, 100):
+                assert sqlite_processor.get_progress_summary(student_id, num_records) == \
+                    json_processor.get_progress_summary(student_id, num_records)
+            assert list(sqlite_processor.get_error_scope_counts(student_id).items()) == \
+                list(json_processor.get_error_scope_counts(student_id).items())
+            for num_records in (1, 5, 20, 100):
+                assert sqlite_storage.progress_stats(student_id, num_records) == \
+                    json_processor.storage.progress_stats(student_id, num_records)
+            assert list(sqlite_storage.error_scope_counts(student_id).items()) == \
+                list(json_processor.storage.error_scope_counts(student_id).items())
+
+        assert sqlite_processor.get_error_scope_counts("S1")["未分類"] > 0
+        assert sqlite_processor.load_student_profile("missing") is None
+        sqlite_storage.close()
+
+
+def test_sqlite_profile_and_copy():
+    """SQLite 保存個人資料與已使用題目，並可從 JSON 後端複製全部資料"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = DataProcessor(tmp)
+        _fill(source, "S1")
+        profile = source.load_student_profile("S1")
+        profile["used_questions"].add(HASHES[2])
+        source.save_student_profile("S1", profile)
+        assert source.flush_records()
+
+        target = SQLiteStorage(str(Path(tmp) / "students.sqlite3"))
+        target.append_record = None  # 紀錄應整批寫入
+        assert copy_storage(source.storage, target) == 1
+        assert target.load_profile("S1") == source.load_student_profile("S1")
+        assert target.get_records("S1") == source.get_learning_records("S1")
+        # 再執行一次不會重複複製
+        assert copy_storage(source.storage, target) == 0
+        assert target.get_records("S1") == source.get_learning_records("S1")
+
+        # 已使用題目只會新增，不會重複
+        target.save_profile("S1", {**profile, "used_questions": [HASHES[0], HASHES[3]]})
+        assert target.load_profile("S1")["used_questions"] == UsedQuestionSet(HASHES)
+        assert target._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        target.close()
+
+        try:
+            StudentStorage()
+            assert False, "StudentStorage is abstract"
+        except TypeError:
+            pass
+
+
+if __name__ == "__main__":
+    test_backends_agree()
+    test_sqlite_profile_and_copy()
+    print("✅ 學生資料儲存後端測試通過")
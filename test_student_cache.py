@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+學生資料快取測試
+"""
+import tempfile
+from pathlib import Path
+
+from utils.data_processor import DataProcessor
+from utils.storage import SQLiteStorage
+from utils.used_questions import UsedQuestionSet
+
+
+def _record(i):
+    return {"timestamp": f"2025-01-01T00:00:{i:02d}", "question_id": i, "correct": True,
+            "subject": "數學", "score": 100, "concept_to_reinforce": "", "scope": "單元"}
+
+
+def test_profile_cache_write_through():
+    """個人資料第二次讀取命中快取，修改回傳值不影響快取，儲存後讀到新內容"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp)
+        processor.save_student_profile("S1", {"student_id": "S1", "name": "甲", "used_questions": []})
+
+        load_profile = processor.storage.load_profile
+
+        def no_load(*args, **kwargs):
+            raise AssertionError("profile read from storage")
+        processor.storage.load_profile = no_load
+
+        profile = processor.load_student_profile("S1")
+        profile["name"] = "未儲存"
+        profile["used_questions"].add("0" * 32)
+        reloaded = processor.load_student_profile("S1")
+        assert reloaded["name"] == "甲" and len(reloaded["used_questions"]) == 0
+
+        reloaded["name"] = "乙"
+        assert processor.save_student_profile("S1", reloaded)
+        assert processor.load_student_profile("S1")["name"] == "乙"
+        assert processor.cache_stats()["profiles"]["hits"] == 3
+
+        processor.storage.load_profile = load_profile
+        processor.invalidate_student_cache("S1")
+        assert processor.load_student_profile("S1")["name"] == "乙"
+        assert processor.cache_stats()["profiles"]["misses"] == 1
+
+
+def test_record_tail_cache():
+    """最近紀錄由快取回傳並隨新紀錄更新；快取筆數不足時改讀儲存"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = DataProcessor(tmp, buffer_records=False)
+        for i in range(5):
+            processor.save_learning_record("S1", _record(i))
+        assert processor.get_learning_records("S1") == [_record(i) for i in range(5)]
+
+        get_records = processor.storage.get_records
+        calls = []
+        processor.storage.get_records = lambda *args: calls.append(args) or get_records(*args)
+
+        processor.save_learning_record("S1", _record(5))
+        assert processor.get_learning_records("S1", limit=3) == [_record(i) for i in range(3, 6)]
+        assert processor.get_learning_records("S1") == [_record(i) for i in range(6)]
+        assert not calls
+        assert processor.cache_stats()["records"]["hits"] == 2
+
+        records = processor.get_learning_records("S1", limit=2)
+        records[0]["score"] = 0
+        assert processor.get_learning_records("S1", limit=2)[0]["score"] == 100
+
+        processor.invalidate_student_cache()
+        assert processor.get_learning_records("S1", limit=2) == [_record(4), _record(5)]
+        assert processor.get_learning_records("S1", limit=10) == [_record(i) for i in range(6)]
+        assert len(calls) == 2
+
+
+def test_cache_sees_other_processes():
+    """另一個行程寫入同一位學生後，快取不再回傳舊資料；快取的是合併後的已使用題目"""
+    for backend in ("json", "sqlite"):
+        with tempfile.TemporaryDirectory() as tmp:
+            def open_processor():
+                storage = SQLiteStorage(str(Path(tmp) / "students.db")) if backend == "sqlite" else None
+                return DataProcessor(tmp, storage=storage, buffer_records=False)
+            first, second = open_processor(), open_processor()
+            first.save_student_profile("S1", {"student_id": "S1", "cursor": 1, "used_questions": ["a" * 32]})
+            assert first.load_student_profile("S1")["cursor"] == 1
+            assert first.get_learning_records("S1") == []
+
+            profile = second.load_student_profile("S1")
+            profile["cursor"] = 2
+            profile["used_questions"].add("b" * 32)
+            second.save_student_profile("S1", profile)
+            second.save_learning_record("S1", _record(0))
+
+            reloaded = first.load_student_profile("S1")
+            assert reloaded["cursor"] == 2 and len(reloaded["used_questions"]) == 2
+            assert first.get_learning_records("S1") == [_record(0)]
+
+            # 儲存舊的個人資料時，快取保存合併了另一行程題目的結果
+            stale = {"student_id": "S1", "cursor": 3, "used_questions": UsedQuestionSet(["c" * 32])}
+            assert first.save_student_profile("S1", stale)
+            assert len(first.load_student_profile("S1")["used_questions"]) == 3
+            first.storage.close()
+            second.storage.close()
+
+
+if __name__ == "__main__":
+    test_profile_cache_write_through()
+    test_record_tail_cache()
+    test_cache_sees_other_processes()
+    print("✅ 學生資料快取測試通過")
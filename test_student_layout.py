@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分層學生資料目錄測試
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from utils.data_processor import DataProcessor
+from utils.storage import JsonFileStorage
+from utils.student_layout import StudentLayout, migrate_to_sharded
+
+RECORD = {"timestamp": "2025-01-01T00:00:00", "question_id": 1, "correct": True,
+          "subject": "數學", "score": 100, "concept_to_reinforce": "", "scope": "單元"}
+
+
+def test_sharded_paths_and_non_ascii_ids():
+    """新學生寫入分層目錄，非 ASCII 與含斜線的 id 都能安全存取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = JsonFileStorage(tmp, layout="sharded")
+        processor = DataProcessor(tmp, storage=storage)
+        for student_id in ("丁國", "S001", "a/b"):
+            assert processor.save_student_profile(student_id, {"student_id": student_id, "name": student_id})
+            assert processor.save_learning_record(student_id, RECORD)
+        assert processor.record_buffer.journal_path("a/b").parent == Path(tmp)
+        assert processor.flush_records() and processor.record_buffer.pending() == 0
+
+        directory = storage.layout.shard_dir("丁國")
+        assert directory.relative_to(Path(tmp)).parts[2] == "%E4%B8%81%E5%9C%8B"
+        assert sorted(p.name for p in directory.iterdir()) == ["profile.json", "progress.json", "records.jsonl"]
+        assert storage.layout.shard_dir("a/b").parent.parent.parent == Path(tmp)
+        assert not list(Path(tmp).glob("student_*"))
+
+        assert processor.load_student_profile("丁國")["name"] == "丁國"
+        assert processor.get_learning_records("a/b") == [RECORD]
+        assert storage.student_ids() == sorted(["丁國", "S001", "a/b"])
+
+
+def test_flat_fallback_and_migration():
+    """平面目錄的舊學生在分層模式下仍可讀寫，搬移後內容不變"""
+    with tempfile.TemporaryDirectory() as tmp:
+        flat = JsonFileStorage(tmp, layout="flat")
+        flat.save_profile("丁國", {"student_id": "丁國", "name": "丁國"})
+        flat.append_record("丁國", RECORD)
+        with open(Path(tmp) / "records_S1.json", "w", encoding="utf-8") as f:
+            json.dump([RECORD], f)
+
+        sharded = JsonFileStorage(tmp, layout="sharded")
+        assert sharded.load_profile("丁國")["name"] == "丁國"
+        sharded.append_record("丁國", RECORD)
+        assert (Path(tmp) / "records_丁國.jsonl").exists()
+        assert sharded.student_ids() == ["S1", "丁國"]
+
+        assert migrate_to_sharded(tmp) == {"S1": 1, "丁國": 2}
+        assert not list(Path(tmp).glob("*_*.json*"))
+        reopened = JsonFileStorage(tmp, layout="sharded")
+        assert reopened.student_ids() == ["S1", "丁國"]
+        assert reopened.get_records("丁國") == [RECORD, RECORD]
+        assert reopened.get_records("S1") == [RECORD]
+        assert (StudentLayout(tmp, "sharded").shard_dir("S1") / "records.jsonl").exists()
+        assert migrate_to_sharded(tmp) == {}
+
+
+if __name__ == "__main__":
+    test_sharded_paths_and_non_ascii_ids()
+    test_flat_fallback_and_migration()
+    print("✅ 分層學生資料目錄測試通過")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已使用題目集合測試
+"""
+import hashlib
+import json
+import tempfile
+from pathlib import Path
+
+from utils.data_processor import DataProcessor
+from utils.used_questions import UsedQuestionSet
+
+HASHES = [hashlib.md5(f"數學:題目{i}".encode()).hexdigest() for i in range(1000)]
+
+
+def test_serialization_roundtrip():
+    """序列化後還原相同集合，且比雜湊值列表小"""
+    used = UsedQuestionSet(HASHES)
+    assert len(used) == 1000
+    assert HASHES[10] in used and hashlib.md5(b"other").hexdigest() not in used
+    assert "not-a-hash" not in used
+
+    value = used.to_profile_value()
+    assert UsedQuestionSet.from_profile_value(value) == used
+    assert UsedQuestionSet.from_profile_value(json.loads(json.dumps(value))) == used
+    assert len(json.dumps(value)) < len(json.dumps(HASHES)) / 2
+    assert UsedQuestionSet.from_profile_value(None) == UsedQuestionSet()
+
+
+def test_legacy_profile_is_migrated():
+    """舊版個人資料的雜湊值列表載入時轉換，儲存後改為精簡格式"""
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = {"student_id": "S1", "name": "測試", "used_questions": HASHES[:50]}
+        with open(Path(tmp) / "student_S1.json", "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False)
+
+        processor = DataProcessor(tmp)
+        loaded = processor.load_student_profile("S1")
+        assert isinstance(loaded["used_questions"], UsedQuestionSet)
+        assert all(h in loaded["used_questions"] for h in HASHES[:50])
+
+        UsedQuestionSet.from_profile(loaded).add(HASHES[50])
+        assert processor.save_student_profile("S1", loaded)
+        with open(Path(tmp) / "student_S1.json", encoding="utf-8") as f:
+            stored = json.load(f)["used_questions"]
+        assert stored["count"] == 51
+        assert processor.load_student_profile("S1")["used_questions"] == UsedQuestionSet(HASHES[:51])
+
+
+def test_bank_selection_skips_used_set():
+    """題庫選題接受 UsedQuestionSet，已出完時回傳 None"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bank = Path(tmp) / "bank.txt"
+        blocks = []
+        for i in range(5):
+            blocks.append(f"【範圍】單元\n【題目】\n（） {i + 1}、題目{i}？\n(A) 1\n(B) 2\n(C) 3\n(D) 4\n\n【答案】\n（A） 解析\n")
+        bank.write_text(("=" * 40 + "\n").join(blocks), encoding="utf-8")
+        processor = DataProcessor(tmp)
+        assert processor.load_question_bank_file(str(bank), "數學") == 5
+
+        used = UsedQuestionSet()
+        for _ in range(5):
+            question = processor.get_question_from_bank("數學", used)
+            assert question is not None
+            used.add(processor._get_question_hash(question))
+        assert processor.get_question_from_bank("數學", used) is None
+        assert len(processor.get_questions_by_scope("單元", "數學", used, limit=2)) == 2
+
+
+if __name__ == "__main__":
+    test_serialization_roundtrip()
+    test_legacy_profile_is_migrated()
+    test_bank_selection_skips_used_set()
+    print("✅ 已使用題目集合測試通過")
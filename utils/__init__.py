@@ -3,5 +3,7 @@ Initialize utils package
 """
 from .data_processor import DataProcessor
 from .report_generator import ReportGenerator
+from .bank_store import QuestionBankRegistry
+from .used_questions import UsedQuestionSet
 
-__all__ = ["DataProcessor", "ReportGenerator"]
+__all__ = ["DataProcessor", "ReportGenerator", "QuestionBankRegistry", "UsedQuestionSet"]
@@ -0,0 +1,497 @@
+"""
+題庫儲存 - 記憶體題庫、唯讀 mmap 題庫（偏移索引、按需建立題目）與題庫登記表
+"""
+import hashlib
+import mmap
+import os
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from config import QUESTION_BANK_CACHE_ENABLED, QUESTION_BANK_STORAGE
+from utils.question_bank_parser import (
+    ANSWER_MARKER,
+    BLOCK_SEPARATOR,
+    PARSER_VERSION,
+    QUESTION_MARKER,
+    QuestionBankParser,
+    _decode_bank,
+    _read_bank_cache,
+    _write_bank_cache,
+    load_banks,
+)
+
+# mmap 題庫的偏移索引快取（<題庫>.index），與編譯快取一樣依修改時間、大小與解析器版本判斷是否有效
+INDEX_SUFFIX = ".index"
+
+_SEPARATOR_BYTES = BLOCK_SEPARATOR.encode('utf-8')
+_QUESTION_MARKER_BYTES = QUESTION_MARKER.encode('utf-8')
+_ANSWER_MARKER_BYTES = ANSWER_MARKER.encode('utf-8')
+
+
+def question_hash(question: Dict) -> str:
+    """
+    計算題目的唯一雜湊值（科目 + 題目文字）
+
+    Args:
+        question: 題目字典
+
+    Returns:
+        MD5 十六進位字串
+    """
+    return question_digest(question).hex()
+
+
+def question_digest(question: Dict) -> bytes:
+    """題目 ID 的 16 位元組 MD5 原始值"""
+    combined = f"{question.get('subject', '')}:{question.get('question', '')}"
+    return hashlib.md5(combined.encode()).digest()
+
+
+class BankIndex(ABC):
+    """
+    題目編號索引：依科目、依（科目, 範圍）與依範圍分組
+
+    選題與計數只查索引，不再逐題掃描整個題庫。相同題目 ID 只索引一次。
+    """
+
+    def __init__(self):
+        self._all = array('I')
+        self._by_subject: Dict[str, array] = {}
+        self._by_subject_scope: Dict[Tuple[str, str], array] = {}
+        self._by_scope: Dict[str, array] = {}
+        self._seen: set = set()
+
+    def _index_question(self, index: int, subject: str, scope: str) -> None:
+        self._all.append(index)
+        self._by_subject.setdefault(subject, array('I')).append(index)
+        self._by_subject_scope.setdefault((subject, scope), array('I')).append(index)
+        self._by_scope.setdefault(scope, array('I')).append(index)
+
+    def _claim(self, key) -> bool:
+        """登記題目 ID，已存在時回傳 False"""
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def _reset_index(self) -> None:
+        BankIndex.__init__(self)
+
+    def remove(self, positions: range) -> None:
+        """
+        從索引移除一段題目編號並壓縮儲存
+
+        之後的題目編號往前移 len(positions)，呼叫端保存的其他範圍要跟著調整
+        （見 QuestionBankRegistry._unload_file）。
+
+        Args:
+            positions: load_files 回傳的題目編號範圍
+        """
+        if not positions:
+            return
+        for index in positions:
+            self._seen.discard(self._id_key(index))
+        start, stop = positions.start, positions.stop
+        removed = stop - start
+
+        def keep(indexes: array) -> array:
+            return array('I', (i if i < start else i - removed for i in indexes if not start <= i < stop))
+
+        # 先建立新陣列，壓縮儲存後再替換，讀取端不會看到修改到一半的索引
+        remaining = keep(self._all)
+        groups = [
+            {key: kept for key, kept in ((key, keep(indexes)) for key, indexes in group.items()) if kept}
+            for group in (self._by_subject, self._by_subject_scope, self._by_scope)
+        ]
+        self._release(positions)
+        self._all = remaining
+        self._by_subject, self._by_subject_scope, self._by_scope = groups
+
+    @abstractmethod
+    def _id_key(self, index: int):
+        """題目 ID 在 _seen 中的鍵"""
+
+    @abstractmethod
+    def question_id(self, index: int) -> str:
+        """題目 ID（十六進位 MD5）"""
+
+    @abstractmethod
+    def get(self, index: int) -> Dict:
+        """建立題目字典"""
+
+    @abstractmethod
+    def _release(self, positions: range) -> None:
+        """刪除一段題目的儲存（之後的題目往前移）並釋放其資源"""
+
+    def select(self, subject: Optional[str] = None, scope: Optional[str] = None) -> array:
+        """
+        符合科目與範圍的題目編號（依載入順序）
+
+        Returns:
+            題目編號陣列（索引本身，呼叫端不可修改）
+        """
+        if subject is None and scope is None:
+            return self._all
+        if scope is None:
+            return self._by_subject.get(subject, array('I'))
+        if subject is None:
+            return self._by_scope.get(scope, array('I'))
+        return self._by_subject_scope.get((subject, scope), array('I'))
+
+    def count(self, subject: Optional[str] = None) -> int:
+        return len(self.select(subject))
+
+    def all_questions(self) -> List[Dict]:
+        """建立所有題目（mmap 模式下會失去記憶體優勢，僅供相容舊介面）"""
+        return [self.get(i) for i in self._all]
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+
+class MemoryBankStore(BankIndex):
+    """所有題目以字典常駐記憶體"""
+
+    def __init__(self):
+        super().__init__()
+        self.questions: List[Dict] = []
+        self._ids: List[str] = []
+
+    def load_files(self, banks: List[Tuple[str, str]]) -> List[range]:
+        """
+        載入題庫文件
+
+        Args:
+            banks: (題庫文件路徑, 科目名稱) 列表
+
+        Returns:
+            每個題庫新增題目的編號範圍（重複題目不計）
+        """
+        return [self.add_questions(questions) for questions in load_banks(banks)]
+
+    def add_questions(self, questions: List[Dict]) -> range:
+        """加入已解析的題目並更新索引，回傳新增題目的編號範圍"""
+        start = len(self.questions)
+        for question in questions:
+            question_id = question_hash(question)
+            if not self._claim(question_id):
+                continue
+            index = len(self.questions)
+            self.questions.append(question)
+            self._ids.append(question_id)
+            self._index_question(index, question.get('subject', ''), question.get('scope', ''))
+        return range(start, len(self.questions))
+
+    def _id_key(self, index: int) -> str:
+        return self._ids[index]
+
+    def _release(self, positions: range) -> None:
+        del self.questions[positions.start:positions.stop]
+        del self._ids[positions.start:positions.stop]
+
+    def question_id(self, index: int) -> str:
+        return self._ids[index]
+
+    def get(self, index: int) -> Dict:
+        return self.questions[index]
+
+
+class MmapBankStore(BankIndex):
+    """
+    唯讀 mmap 題庫
+
+    第一次載入時掃描題庫建立精簡索引（檔案、位元組範圍、題目雜湊與分組索引），
+    並存成 <題庫>.index；題庫未變更時直接讀取，不必再解析每個題目。
+    題目字典只在被選中時才從對應的位元組範圍解析出來。
+    """
+
+    def __init__(self, use_cache: bool = QUESTION_BANK_CACHE_ENABLED):
+        """
+        Args:
+            use_cache: 是否讀寫偏移索引快取（<題庫>.index）
+        """
+        super().__init__()
+        self.use_cache = use_cache
+        self._files: List[Dict] = []  # {"path", "subject", "handle", "map", "multi"}
+        self._file_of = array('I')
+        self._starts = array('Q')
+        self._ends = array('Q')
+        self._digests = bytearray()  # 每題 16 位元組的 MD5
+        self._parser = QuestionBankParser()
+
+    def load_files(self, banks: List[Tuple[str, str]]) -> List[range]:
+        """
+        映射題庫文件並建立索引
+
+        Args:
+            banks: (題庫文件路徑, 科目名稱) 列表
+
+        Returns:
+            每個題庫新增題目的編號範圍（重複題目不計）
+        """
+        ranges = []
+        for file_path, subject in banks:
+            start = len(self._starts)
+            try:
+                self._index_file(file_path, subject)
+            except (OSError, ValueError) as e:
+                print(f"載入題庫失敗: {e}")
+            ranges.append(range(start, len(self._starts)))
+        return ranges
+
+    def _index_file(self, file_path: str, subject: str) -> None:
+        handle = open(file_path, 'rb')
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空檔案無法映射
+            handle.close()
+            return
+
+        stat = os.fstat(handle.fileno())
+        cached = self._read_index(file_path, subject, stat) if self.use_cache else None
+        if cached is not None:
+            multi = cached["multi"]
+        else:
+            multi = mapped.find(_QUESTION_MARKER_BYTES) != -1 and mapped.find(_ANSWER_MARKER_BYTES) != -1
+        file_index = len(self._files)
+        self._files.append({
+            "path": file_path,
+            "subject": subject,
+            "handle": handle,
+            "map": mapped,
+            "multi": multi
+        })
+
+        if cached is None:
+            cached = self._scan_file(file_index)
+            if self.use_cache:
+                _write_bank_cache(file_path + INDEX_SUFFIX, {
+                    **cached,
+                    "version": PARSER_VERSION,
+                    "subject": subject,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size
+                })
+
+        count = 0
+        digests = cached["digests"]
+        for position, (start, end, scope) in enumerate(zip(cached["starts"], cached["ends"], cached["scopes"])):
+            digest = digests[position * 16:(position + 1) * 16]
+            if not self._claim(digest):
+                continue
+            self._index_question(len(self._starts), subject, scope)
+            self._file_of.append(file_index)
+            self._starts.append(start)
+            self._ends.append(end)
+            self._digests += digest
+            count += 1
+        if count == 0:
+            self._close_file(file_index)
+
+    def _scan_file(self, file_index: int) -> Dict:
+        """解析每個區塊，回傳可解析題目的位元組範圍、範圍標籤與題目雜湊（未去重）"""
+        info = self._files[file_index]
+        starts, ends, scopes, digests = array('Q'), array('Q'), [], bytearray()
+        for start, end in self._block_ranges(info["map"], info["multi"]):
+            question = self._parse_range(file_index, start, end)
+            if question is None:
+                continue
+            starts.append(start)
+            ends.append(end)
+            scopes.append(question.get('scope', ''))
+            digests += question_digest(question)
+        return {"multi": info["multi"], "starts": starts, "ends": ends, "scopes": scopes, "digests": bytes(digests)}
+
+    @staticmethod
+    def _read_index(file_path: str, subject: str, stat: os.stat_result) -> Optional[Dict]:
+        """讀取仍然有效的偏移索引快取（題目雜湊含科目，科目不同時也需重建）"""
+        cached = _read_bank_cache(file_path + INDEX_SUFFIX)
+        if (
+            cached is None
+            or cached.get("subject") != subject
+            or cached.get("mtime_ns") != stat.st_mtime_ns
+            or cached.get("size") != stat.st_size
+        ):
+            return None
+        return cached
+
+    @staticmethod
+    def _block_ranges(mapped: mmap.mmap, multi: bool):
+        """多題目格式依分隔線切出區塊；單題格式為整個檔案"""
+        size = len(mapped)
+        if not multi:
+            yield 0, size
+            return
+        start = 0
+        while True:
+            separator = mapped.find(_SEPARATOR_BYTES, start)
+            if separator == -1:
+                yield start, size
+                return
+            yield start, separator
+            start = separator + len(_SEPARATOR_BYTES)
+
+    def _parse_range(self, file_index: int, start: int, end: int) -> Optional[Dict]:
+        info = self._files[file_index]
+        text = _decode_bank(info["map"][start:end])
+        if info["multi"]:
+            return self._parser._parse_block(text, info["subject"])
+        questions = self._parser._parse_content(text, info["subject"])
+        return questions[0] if questions else None
+
+    def _id_key(self, index: int) -> bytes:
+        return bytes(self._digests[index * 16:(index + 1) * 16])
+
+    def _release(self, positions: range) -> None:
+        start, stop = positions.start, positions.stop
+        touched = set(self._file_of[start:stop])
+        del self._file_of[start:stop]
+        del self._starts[start:stop]
+        del self._ends[start:stop]
+        del self._digests[start * 16:stop * 16]
+        # 題庫的題目都被移除後關閉映射
+        for file_index in touched - set(self._file_of):
+            self._close_file(file_index)
+
+    def _close_file(self, file_index: int) -> None:
+        info = self._files[file_index]
+        if info["map"] is not None:
+            info["map"].close()
+            info["handle"].close()
+            info["map"] = info["handle"] = None
+
+    def question_id(self, index: int) -> str:
+        return self._digests[index * 16:(index + 1) * 16].hex()
+
+    def get(self, index: int) -> Dict:
+        """從 mmap 解析出題目字典"""
+        return self._parse_range(self._file_of[index], self._starts[index], self._ends[index])
+
+    def close(self) -> None:
+        """關閉所有映射與檔案"""
+        for file_index in range(len(self._files)):
+            self._close_file(file_index)
+        self._files = []
+        self._file_of = array('I')
+        self._starts = array('Q')
+        self._ends = array('Q')
+        self._digests = bytearray()
+        self._reset_index()
+
+
+class QuestionBankRegistry:
+    """
+    題庫登記表：記錄已載入的題庫文件與版本
+
+    重複載入未變更的題庫不會重複加入題目；題庫內容變更時以新版本取代。
+    同一行程內的 KnowledgeFuelStation 透過 shared() 共用同一份題庫。
+    """
+
+    _shared: Dict[str, "QuestionBankRegistry"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, storage: str = QUESTION_BANK_STORAGE):
+        """
+        Args:
+            storage: 題庫儲存方式（"memory" 或 "mmap"）
+        """
+        self.storage = storage
+        self.store = MmapBankStore() if storage == "mmap" else MemoryBankStore()
+        # (題庫路徑, 科目) -> {"version": (mtime_ns, size), "positions": range}
+        self._files: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def shared(cls, storage: str = QUESTION_BANK_STORAGE) -> "QuestionBankRegistry":
+        """取得本行程共用的題庫登記表"""
+        with cls._shared_lock:
+            if storage not in cls._shared:
+                cls._shared[storage] = cls(storage)
+            return cls._shared[storage]
+
+    @staticmethod
+    def _file_key(file_path: str, subject: str) -> Tuple[str, str]:
+        return (str(Path(file_path).resolve()), subject)
+
+    @staticmethod
+    def _file_version(file_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self, banks: List[Tuple[str, str]]) -> List[int]:
+        """
+        載入題庫文件（已載入且未變更的題庫直接略過）
+
+        Args:
+            banks: (題庫文件路徑, 科目名稱) 列表
+
+        Returns:
+            每個題庫目前提供的題目數量（與 banks 順序相同）
+        """
+        with self._lock:
+            pending = []
+            for file_path, subject in dict.fromkeys(
+                self._file_key(path, subject) for path, subject in banks
+            ):
+                version = self._file_version(file_path)
+                loaded = self._files.get((file_path, subject))
+                if loaded is not None:
+                    if loaded["version"] == version:
+                        continue
+                    # 題庫已變更：移除舊版本後重新載入
+                    self._unload_file((file_path, subject))
+                pending.append((file_path, subject, version))
+
+            if pending:
+                ranges = self.store.load_files([(path, subject) for path, subject, _ in pending])
+                for (file_path, subject, version), positions in zip(pending, ranges):
+                    self._files[(file_path, subject)] = {"version": version, "positions": positions}
+
+            return [
+                len(self._files.get(self._file_key(path, subject), {}).get("positions", ()))
+                for path, subject in banks
+            ]
+
+    def _unload_file(self, key: Tuple[str, str]) -> int:
+        entry = self._files.pop(key)
+        removed = entry["positions"]
+        self.store.remove(removed)
+        # 儲存已壓縮：之後載入的題庫編號往前移
+        if removed:
+            for other in self._files.values():
+                positions = other["positions"]
+                if positions.start >= removed.stop:
+                    other["positions"] = range(positions.start - len(removed), positions.stop - len(removed))
+        return len(removed)
+
+    def unload_subject(self, subject: str) -> int:
+        """
+        移除某科目的所有題庫
+
+        Returns:
+            移除的題目數量
+        """
+        with self._lock:
+            return sum(self._unload_file(key) for key in list(self._files) if key[1] == subject)
+
+    def replace_subject(self, subject: str, file_path: str) -> int:
+        """
+        以另一個題庫文件取代某科目目前的題庫
+
+        Returns:
+            新題庫載入的題目數量
+        """
+        with self._lock:
+            self.unload_subject(subject)
+            return self.load([(file_path, subject)])[0]
+
+    def loaded_files(self) -> List[Tuple[str, str]]:
+        """已載入的 (題庫路徑, 科目) 列表"""
+        with self._lock:
+            return list(self._files)
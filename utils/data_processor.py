@@ -1,27 +1,91 @@
 """
 Data Processor - Handle student data and learning records
 """
-import json
-import hashlib
-from typing import Dict, List, Optional
+import atexit
+import copy
+import random
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple, Union
 from pathlib import Path
-from config import STUDENT_DATA_DIR
-from utils.question_bank_parser import load_question_bank
+from config import (
+    STUDENT_DATA_DIR,
+    QUESTION_BANK_STORAGE,
+    PROGRESS_AGGREGATES_CACHE_SIZE,
+    STORAGE_BACKEND,
+    RECORD_BUFFER_ENABLED,
+    RECORD_BUFFER_FLUSH_CHECK_SECONDS,
+    STUDENT_PROFILE_CACHE_SIZE,
+    STUDENT_RECORDS_CACHE_SIZE,
+    STUDENT_RECORDS_CACHE_TAIL,
+)
+from utils.bank_store import QuestionBankRegistry, question_hash
+from utils.storage import StudentStorage, create_storage
+from utils.lru_cache import LRUCache
+from utils.progress_aggregates import ProgressAggregates
+from utils.record_buffer import RecordBuffer
+from utils.used_questions import UsedQuestionSet
+from utils.question_sampler import QuestionSampler
+
+# 已使用題目：UsedQuestionSet 或題目雜湊值列表
+UsedQuestions = Union[UsedQuestionSet, List[str]]
+
+# 有緩衝學習紀錄的 DataProcessor，背景執行緒定期檢查、程式結束時寫入儲存
+_buffered_processors: "weakref.WeakSet[DataProcessor]" = weakref.WeakSet()
+_flush_thread: Optional[threading.Thread] = None
+_flush_thread_lock = threading.Lock()
+
+# 從題庫隨機抽題時，抽到已使用題目可重抽的次數（之後改為逐一過濾）
+RANDOM_PICK_ATTEMPTS = 8
 
 
 class DataProcessor:
     """Process and manage student learning data"""
 
-    def __init__(self, data_dir: str = STUDENT_DATA_DIR):
+    def __init__(
+        self,
+        data_dir: str = STUDENT_DATA_DIR,
+        bank_storage: str = QUESTION_BANK_STORAGE,
+        bank_registry: Optional[QuestionBankRegistry] = None,
+        storage: Optional[StudentStorage] = None,
+        buffer_records: bool = RECORD_BUFFER_ENABLED
+    ):
         """
         Initialize data processor
         
         Args:
             data_dir: Directory for storing student data
+            bank_storage: Question bank storage ("memory" or "mmap")
+            bank_registry: Question bank registry to use (None creates a private one)
+            storage: Student storage backend (None uses STORAGE_BACKEND in data_dir)
+            buffer_records: Batch learning records behind a write-ahead journal
         """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.question_bank = []  # 題庫
+        self.storage = storage or create_storage(STORAGE_BACKEND, str(self.data_dir))
+        self._aggregates = LRUCache(PROGRESS_AGGREGATES_CACHE_SIZE)  # running progress counters
+        # Loaded profiles and {"records": most recent records, "complete": whole history?}
+        self._profile_cache = LRUCache(STUDENT_PROFILE_CACHE_SIZE)
+        self._records_cache = LRUCache(STUDENT_RECORDS_CACHE_SIZE)
+        self.record_buffer: Optional[RecordBuffer] = None
+        # Buffered records and the cached counters/records built from them change together
+        self._buffer_lock = threading.RLock()
+        if buffer_records:
+            journal_dir = self.storage.journal_dir or self.data_dir
+            self.record_buffer = RecordBuffer(self.storage, str(journal_dir))
+            self._replay_record_journal()
+            _buffered_processors.add(self)
+            _start_flush_thread()
+        # 題庫
+        self.bank_registry = bank_registry or QuestionBankRegistry(bank_storage)
+        self.bank_store = self.bank_registry.store
+        self.sampler = QuestionSampler(self.bank_store)
+
+    @property
+    def question_bank(self) -> List[Dict]:
+        """所有題目（mmap 模式下會建立全部題目字典）"""
+        return self.bank_store.all_questions()
 
     def save_student_profile(
         self,
@@ -39,12 +103,22 @@ class DataProcessor:
             True if successful
         """
         try:
-            file_path = self.data_dir / f"student_{student_id}.json"
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(profile, f, ensure_ascii=False, indent=2)
+            stored = dict(profile)
+            if "used_questions" in profile:
+                used = profile["used_questions"]
+                if not isinstance(used, UsedQuestionSet):
+                    used = UsedQuestionSet.from_profile_value(used)
+                stored["used_questions"] = used.to_profile_value()
+            saved, version = self.storage.save_profile(student_id, stored)
+            # Cache what was stored: used_questions may include other writers' questions
+            cached = copy.deepcopy(saved)
+            if "used_questions" in cached:
+                UsedQuestionSet.from_profile(cached)
+            self._profile_cache.set(student_id, {"profile": cached, "version": version})
             return True
         except Exception as e:
             print(f"Error saving student profile: {e}")
+            self.invalidate_student_cache(student_id)
             return False
 
     def load_student_profile(self, student_id: str) -> Optional[Dict]:
@@ -57,11 +131,19 @@ class DataProcessor:
         Returns:
             Student profile dictionary or None
         """
+        cached = self._current_cache_entry(self._profile_cache, student_id, "profile")
+        if cached is not None:
+            # Callers edit the profile they get back; keep the cached one pristine
+            return copy.deepcopy(cached["profile"])
         try:
-            file_path = self.data_dir / f"student_{student_id}.json"
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            # Version first: a write landing during the read only makes the entry stale
+            version = self.storage.version(student_id, "profile")
+            profile = self.storage.load_profile(student_id)
+            if profile is not None:
+                # Legacy hash lists are converted here and saved compactly next time
+                UsedQuestionSet.from_profile(profile)
+                self._profile_cache.set(student_id, {"profile": copy.deepcopy(profile), "version": version})
+            return profile
         except Exception as e:
             print(f"Error loading student profile: {e}")
         return None
@@ -82,22 +164,73 @@ class DataProcessor:
             True if successful
         """
         try:
-            file_path = self.data_dir / f"records_{student_id}.json"
-            
-            records = []
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    records = json.load(f)
-            
-            records.append(record)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(records, f, ensure_ascii=False, indent=2)
+            if self.record_buffer is not None:
+                # Journaled now, written to storage with the next batch
+                with self._buffer_lock:
+                    aggregates = self._get_aggregates(student_id)
+                    should_flush = self.record_buffer.add(student_id, record)
+                    aggregates.add(record)
+                    self._cache_new_record(student_id, record)
+                if should_flush:
+                    self.flush_records()
+                return True
+            versions = self.storage.append_record(student_id, record)
+            self._cache_new_record(student_id, record, versions)
+            self._store_aggregates(student_id, [record])
             return True
         except Exception as e:
             print(f"Error saving learning record: {e}")
             return False
 
+    def flush_records(self, student_id: Optional[str] = None) -> bool:
+        """
+        Write buffered learning records (and progress counters) to storage
+        
+        Args:
+            student_id: Only flush this student (None flushes everyone)
+            
+        Returns:
+            True if nothing is left pending for the requested students
+        """
+        if self.record_buffer is None:
+            return True
+        try:
+            with self._buffer_lock:
+                for sid, (records, versions) in self.record_buffer.flush(student_id).items():
+                    self._advance_records_version(sid, versions)
+                    self._store_aggregates(sid, records)
+            return True
+        except Exception as e:
+            print(f"Error flushing learning records: {e}")
+            return False
+
+    def flush_due_records(self) -> bool:
+        """
+        Flush buffered records if the buffer reached its size or age limit
+        
+        Called periodically by the background flush thread, so records of a
+        student who stopped answering are not held until the session ends.
+        
+        Returns:
+            True if records were flushed
+        """
+        if self.record_buffer is None or not self.record_buffer.should_flush():
+            return False
+        return self.flush_records()
+
+    def _replay_record_journal(self) -> None:
+        """Write journaled records left behind by a crash, then rebuild their counters"""
+        try:
+            replayed = self.record_buffer.replay()
+        except Exception as e:
+            print(f"Error replaying learning record journal: {e}")
+            return
+        for student_id, count in replayed.items():
+            if not count:
+                continue
+            print(f"Recovered {count} unsaved learning record(s) for {student_id}")
+            self._store_aggregates(student_id, [], rebuild=True)
+
     def get_learning_records(
         self,
         student_id: str,
@@ -113,18 +246,119 @@ class DataProcessor:
         Returns:
             List of learning records
         """
+        cached = self._current_cache_entry(self._records_cache, student_id, "records")
+        if cached is not None and (cached["complete"] or (limit and limit <= len(cached["records"]))):
+            records = cached["records"][-limit:] if limit else cached["records"]
+            return [dict(record) for record in records]
         try:
-            file_path = self.data_dir / f"records_{student_id}.json"
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    records = json.load(f)
-                    if limit:
-                        return records[-limit:]
-                    return records
+            self.flush_records(student_id)
+            version = self.storage.version(student_id, "records")
+            records = self.storage.get_records(student_id, limit)
+            tail = STUDENT_RECORDS_CACHE_TAIL
+            self._records_cache.set(student_id, {
+                "records": [dict(record) for record in records[-tail:]],
+                # Fewer records than asked for: that is the whole history
+                "complete": (limit is None or len(records) < limit) and len(records) <= tail,
+                "version": version
+            })
+            return records
         except Exception as e:
             print(f"Error loading learning records: {e}")
         return []
 
+    def _current_cache_entry(self, cache: LRUCache, student_id: str, kind: str) -> Optional[Dict]:
+        """
+        A cached profile or records entry, if storage has not changed since it was cached
+        
+        Other processes sharing the data directory may write the same student,
+        so every entry is checked against the storage version (file mtime and
+        size, or the SQLite data version); stale entries are dropped.
+        
+        Args:
+            cache: self._profile_cache or self._records_cache
+            student_id: Student identifier
+            kind: "profile" or "records"
+            
+        Returns:
+            The cache entry, or None
+        """
+        cached = cache.get(student_id)
+        if cached is None:
+            return None
+        if cached["version"] is not None and cached["version"] == self.storage.version(student_id, kind):
+            return cached
+        self.invalidate_student_cache(student_id)
+        return None
+
+    def _advance_records_version(self, student_id: str, versions: Tuple) -> bool:
+        """
+        Move the cached records entry past our own append
+        
+        The entry stays valid only if storage was at the version it was cached
+        at right before the append (nobody else wrote in between).
+        
+        Args:
+            student_id: Student identifier
+            versions: (version before, version after) from storage.append_records
+            
+        Returns:
+            True if the entry was kept
+        """
+        before, after = versions
+        cached = self._records_cache.pop(student_id)
+        if cached is None or before is None or cached["version"] != before:
+            return False
+        cached["version"] = after
+        self._records_cache.set(student_id, cached)
+        return True
+
+    def _cache_new_record(self, student_id: str, record: Dict, versions: Optional[Tuple] = None) -> None:
+        """
+        Write-through: append a saved record to the cached tail
+        
+        Args:
+            student_id: Student identifier
+            record: The new record
+            versions: storage.append_record versions (None while the record is only buffered)
+        """
+        if versions is not None and not self._advance_records_version(student_id, versions):
+            return
+        cached = self._records_cache.pop(student_id)
+        if cached is None:
+            return
+        records = cached["records"]
+        records.append(dict(record))
+        if len(records) > STUDENT_RECORDS_CACHE_TAIL:
+            del records[0]
+            cached["complete"] = False
+        self._records_cache.set(student_id, cached)
+
+    def invalidate_student_cache(self, student_id: Optional[str] = None) -> None:
+        """
+        Drop cached profiles and records (stale entries are dropped automatically)
+        
+        Args:
+            student_id: Student to drop (None drops everyone)
+        """
+        if student_id is None:
+            self._profile_cache.clear()
+            self._records_cache.clear()
+        else:
+            self._profile_cache.pop(student_id)
+            self._records_cache.pop(student_id)
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """
+        Hit/miss statistics of the student data caches
+        
+        Returns:
+            {"profiles": LRUCache.stats(), "records": LRUCache.stats()}
+        """
+        return {
+            "profiles": self._profile_cache.stats(),
+            "records": self._records_cache.stats()
+        }
+
     def calculate_weak_subjects(
         self,
         student_id: str,
@@ -140,22 +374,13 @@ class DataProcessor:
         Returns:
             List of weak subjects sorted by weakness
         """
-        records = self.get_learning_records(student_id, limit=num_records)
-        
-        subject_scores = {}
-        
-        for record in records:
-            subject = record.get("subject", "Unknown")
-            score = record.get("score", 0)
-            
-            if subject not in subject_scores:
-                subject_scores[subject] = []
-            subject_scores[subject].append(score)
+        stats = self._progress_stats(student_id, num_records)
         
-        # Calculate average score per subject
-        subject_averages = {}
-        for subject, scores in subject_scores.items():
-            subject_averages[subject] = sum(scores) / len(scores)
+        # Average score per subject
+        subject_averages = {
+            subject: entry["score_sum"] / entry["total"]
+            for subject, entry in stats["subjects"].items()
+        }
         
         # Sort by average score (ascending)
         weak_subjects = sorted(
@@ -219,9 +444,9 @@ class DataProcessor:
         Returns:
             Progress summary dictionary
         """
-        records = self.get_learning_records(student_id, limit=num_records)
+        stats = self._progress_stats(student_id, num_records)
         
-        if not records:
+        if not stats["total"]:
             return {
                 "total_questions": 0,
                 "correct_answers": 0,
@@ -231,30 +456,20 @@ class DataProcessor:
                 "concepts_to_reinforce": []
             }
         
-        total_questions = len(records)
-        correct_answers = sum(1 for r in records if r.get("correct", False))
+        total_questions = stats["total"]
+        correct_answers = stats["correct"]
         accuracy = (correct_answers / total_questions * 100) if total_questions > 0 else 0
         
-        # Subject-wise analysis and concepts to reinforce
+        # Subject-wise accuracies
         subjects = {}
-        concepts_to_reinforce = []
-        for record in records:
-            subject = record.get("subject", "Unknown")
-            concept = record.get("scope") or record.get("concept_to_reinforce", "")
-            # Collect concepts (or scopes) from incorrect answers
-            if concept and not record.get("correct", False):
-                concepts_to_reinforce.append(concept)
-            if subject not in subjects:
-                subjects[subject] = {"total": 0, "correct": 0}
-            subjects[subject]["total"] += 1
-            if record.get("correct", False):
-                subjects[subject]["correct"] += 1
-        
-        # Calculate subject accuracies
-        for subject in subjects:
-            total = subjects[subject]["total"]
-            correct = subjects[subject]["correct"]
-            subjects[subject]["accuracy"] = (correct / total * 100) if total > 0 else 0
+        for subject, entry in stats["subjects"].items():
+            total = entry["total"]
+            correct = entry["correct"]
+            subjects[subject] = {
+                "total": total,
+                "correct": correct,
+                "accuracy": (correct / total * 100) if total > 0 else 0
+            }
         
         return {
             "total_questions": total_questions,
@@ -262,9 +477,89 @@ class DataProcessor:
             "accuracy": round(accuracy, 2),
             "subjects": subjects,
             "weak_areas": self.calculate_weak_subjects(student_id),
-            "concepts_to_reinforce": concepts_to_reinforce
+            "concepts_to_reinforce": stats["concepts"]
         }
 
+    def _get_aggregates(self, student_id: str) -> ProgressAggregates:
+        """
+        Running progress counters of a student
+        
+        Counters saved by an older version (or never saved) are rebuilt once
+        from the learning records. Records still in the write-behind buffer
+        are counted on top of the stored counters.
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            ProgressAggregates kept in memory for this student
+        """
+        aggregates = self._aggregates.get(student_id)
+        if aggregates is None:
+            aggregates = ProgressAggregates.from_dict(self.storage.load_aggregates(student_id))
+            if aggregates is None:
+                aggregates = ProgressAggregates.from_records(self.storage.get_records(student_id))
+                if aggregates.count:
+                    aggregates = self._stored_aggregates(self.storage.update_aggregates(student_id, []))
+            self._aggregates.set(student_id, self._with_pending(student_id, aggregates))
+        return aggregates
+
+    def _store_aggregates(self, student_id: str, records: List[Dict], rebuild: bool = False) -> None:
+        """
+        Merge records just written to storage into the stored counters
+        
+        The stored counters are reloaded and merged under the storage's lock,
+        so counts saved by other processes are kept; the in-memory copy is
+        replaced by the merged result.
+        
+        Args:
+            student_id: Student identifier
+            records: Records written since the counters were last stored
+            rebuild: Recount the stored counters from all records
+        """
+        aggregates = self._stored_aggregates(self.storage.update_aggregates(student_id, records, rebuild))
+        self._aggregates.set(student_id, self._with_pending(student_id, aggregates))
+
+    @staticmethod
+    def _stored_aggregates(data: Dict) -> ProgressAggregates:
+        return ProgressAggregates.from_dict(data) or ProgressAggregates()
+
+    def _with_pending(self, student_id: str, aggregates: ProgressAggregates) -> ProgressAggregates:
+        """Add the student's records still waiting in the write-behind buffer"""
+        if self.record_buffer is not None:
+            for record in self.record_buffer.pending_records(student_id):
+                aggregates.add(record)
+        return aggregates
+
+    def _progress_stats(self, student_id: str, num_records: int) -> Dict:
+        """Aggregates over the most recent records (empty if they cannot be read)"""
+        try:
+            stats = self._get_aggregates(student_id).progress_stats(num_records)
+            if stats is not None:
+                return stats
+            # Window shorter than requested: aggregate the records themselves
+            self.flush_records(student_id)
+            return self.storage.progress_stats(student_id, num_records)
+        except Exception as e:
+            print(f"Error loading learning records: {e}")
+            return {"total": 0, "correct": 0, "subjects": {}, "concepts": []}
+
+    def get_error_scope_counts(self, student_id: str) -> Dict[str, int]:
+        """
+        Count incorrect answers per scope over the student's whole history
+        
+        Args:
+            student_id: Student identifier
+            
+        Returns:
+            {scope: error count}, most errors first
+        """
+        try:
+            return self._get_aggregates(student_id).error_scope_counts()
+        except Exception as e:
+            print(f"Error loading learning records: {e}")
+            return {}
+
     def load_question_bank_file(self, file_path: str, subject: str) -> int:
         """
         載入題庫文件
@@ -277,14 +572,37 @@ class DataProcessor:
             成功載入的題目數量
         """
         try:
-            questions = load_question_bank(file_path, subject)
-            self.question_bank.extend(questions)
-            print(f"成功載入 {len(questions)} 題題庫")
-            return len(questions)
+            count = self.bank_registry.load([(file_path, subject)])[0]
+            print(f"成功載入 {count} 題題庫")
+            return count
         except Exception as e:
             print(f"載入題庫失敗: {e}")
             return 0
 
+    def load_question_bank_files(self, banks: List[Tuple[str, str]]) -> List[int]:
+        """
+        平行載入多個題庫文件
+        
+        Args:
+            banks: (題庫文件路徑, 科目名稱) 列表
+            
+        Returns:
+            每個題庫提供的題目數量（與 banks 順序相同；已載入的題庫不會重複加入）
+        """
+        return self.bank_registry.load(banks)
+
+    def unload_question_bank(self, subject: str) -> int:
+        """
+        移除某科目的題庫
+        
+        Args:
+            subject: 科目名稱
+            
+        Returns:
+            移除的題目數量
+        """
+        return self.bank_registry.unload_subject(subject)
+
     def _get_question_hash(self, question: Dict) -> str:
         """
         計算題目的唯一雜湊值
@@ -295,56 +613,66 @@ class DataProcessor:
         Returns:
             雜湊值
         """
-        q_text = question.get('question', '')
-        q_subject = question.get('subject', '')
-        combined = f"{q_subject}:{q_text}"
-        return hashlib.md5(combined.encode()).hexdigest()
+        return question_hash(question)
     
-    def get_question_from_bank(self, subject: Optional[str] = None, used_questions: Optional[List[str]] = None) -> Optional[Dict]:
+    @staticmethod
+    def _used_set(used_questions: Optional[UsedQuestions]) -> UsedQuestionSet:
+        """Used-question hashes as a UsedQuestionSet (lists are converted)"""
+        if isinstance(used_questions, UsedQuestionSet):
+            return used_questions
+        return UsedQuestionSet(used_questions or [])
+
+    def get_question_from_bank(
+        self,
+        subject: Optional[str] = None,
+        used_questions: Optional[UsedQuestions] = None,
+        cursors: Optional[Dict] = None
+    ) -> Optional[Dict]:
         """
         從題庫中取得題目（避免重複）
         
         Args:
             subject: 指定科目（可選）
-            used_questions: 已使用題目的雜湊值列表
+            used_questions: 已使用題目（UsedQuestionSet 或雜湊值列表）
+            cursors: 學生的抽題游標（profile["question_cursors"]）；提供時依洗牌排列依序抽題
             
         Returns:
             題目字典或None
         """
-        if not self.question_bank:
+        # 科目索引直接取得候選題目編號
+        candidates = self.bank_store.select(subject or None)
+        if not candidates:
             return None
         
-        used_questions = used_questions or []
+        used = self._used_set(used_questions)
         
-        # 如果指定科目，篩選該科目的題目
-        if subject:
-            subject_questions = [q for q in self.question_bank if q.get('subject') == subject]
-        else:
-            subject_questions = self.question_bank
+        if cursors is not None:
+            index = self.sampler.draw(cursors, subject or None, None, used)
+            return self.bank_store.get(index) if index is not None else None
         
-        if not subject_questions:
-            return None
+        # 先直接隨機抽取，抽到已使用的題目就重抽（結果仍是未使用題目中的均勻分布）
+        for _ in range(RANDOM_PICK_ATTEMPTS):
+            index = random.choice(candidates)
+            if self.bank_store.question_id(index) not in used:
+                return self.bank_store.get(index)
         
-        # 過濾掉已使用的題目
-        available_questions = [
-            q for q in subject_questions 
-            if self._get_question_hash(q) not in used_questions
-        ]
+        # 已使用的題目太多時才逐一過濾
+        available = [i for i in candidates if self.bank_store.question_id(i) not in used]
         
         # 如果沒有未使用的題目，返回None（表示已出完）
-        if not available_questions:
+        if not available:
             return None
         
         # 隨機選擇一個未使用的題目
-        import random
-        return random.choice(available_questions)
+        return self.bank_store.get(random.choice(available))
 
     def get_questions_by_scope(
         self,
         scope: str,
         subject: Optional[str] = None,
-        used_questions: Optional[List[str]] = None,
-        limit: int = 1
+        used_questions: Optional[UsedQuestions] = None,
+        limit: int = 1,
+        cursors: Optional[Dict] = None
     ) -> List[Dict]:
         """
         根據範圍（可選科目）從題庫取得題目
@@ -352,37 +680,45 @@ class DataProcessor:
         Args:
             scope: 題目範圍（與題庫中的 scope 欄位匹配）
             subject: 限定科目（可選）
-            used_questions: 已使用題目的雜湊值列表（避免重複）
+            used_questions: 已使用題目（UsedQuestionSet 或雜湊值列表，避免重複）
             limit: 需要取得的題目數量
+            cursors: 學生的抽題游標（profile["question_cursors"]）；提供時依洗牌排列依序抽題
         
         Returns:
             題目列表（長度不超過 limit）
         """
-        results: List[Dict] = []
-        if not self.question_bank or not scope:
-            return results
-        used_questions = used_questions or []
+        if not scope:
+            return []
+        used = self._used_set(used_questions)
         
-        # 篩選範圍與科目
-        candidates = [
-            q for q in self.question_bank
-            if (q.get('scope') == scope) and (subject is None or q.get('subject') == subject)
-        ]
+        # 範圍與科目索引
+        candidates = self.bank_store.select(subject, scope)
         if not candidates:
-            return results
-        
-        # 過濾掉已使用的
-        available = [q for q in candidates if self._get_question_hash(q) not in used_questions]
-        if not available:
-            available = candidates  # 若都用過，允許重複
-        
-        import random
-        random.shuffle(available)
-        for q in available:
-            results.append(q)
-            if len(results) >= limit:
+            return []
+        
+        if cursors is not None:
+            picked = self.sampler.draw_many(cursors, limit, subject, scope, used)
+            if not picked:
+                picked = self.sampler.draw_many(cursors, limit, subject, scope)  # 若都用過，允許重複
+            return [self.bank_store.get(i) for i in picked]
+        
+        # 先隨機抽取未使用且不重複的題目，抽不滿時才逐一過濾
+        picked: List[int] = []
+        for _ in range(limit * RANDOM_PICK_ATTEMPTS):
+            if len(picked) >= limit:
                 break
-        return results
+            index = random.choice(candidates)
+            if index not in picked and self.bank_store.question_id(index) not in used:
+                picked.append(index)
+        if len(picked) < limit:
+            # 過濾掉已使用的
+            available = [i for i in candidates if self.bank_store.question_id(i) not in used]
+            if not available:
+                available = list(candidates)  # 若都用過，允許重複
+            random.shuffle(available)
+            picked = available[:limit]
+        
+        return [self.bank_store.get(i) for i in picked]
 
     def has_question_bank(self, subject: Optional[str] = None) -> bool:
         """
@@ -394,13 +730,7 @@ class DataProcessor:
         Returns:
             是否有題庫
         """
-        if not self.question_bank:
-            return False
-        
-        if subject:
-            return any(q.get('subject') == subject for q in self.question_bank)
-        
-        return True
+        return self.bank_store.count(subject or None) > 0
 
     def get_question_bank_count(self, subject: Optional[str] = None) -> int:
         """
@@ -412,10 +742,31 @@ class DataProcessor:
         Returns:
             題目數量
         """
-        if not self.question_bank:
-            return 0
-        
-        if subject:
-            return sum(1 for q in self.question_bank if q.get('subject') == subject)
-        
-        return len(self.question_bank)
+        return self.bank_store.count(subject or None)
+
+
+def _start_flush_thread() -> None:
+    """Start the background thread that flushes buffers past their age limit (once per process)"""
+    global _flush_thread
+    if RECORD_BUFFER_FLUSH_CHECK_SECONDS <= 0:
+        return
+    with _flush_thread_lock:
+        if _flush_thread is None or not _flush_thread.is_alive():
+            _flush_thread = threading.Thread(
+                target=_run_flush_thread, name="record-buffer-flush", daemon=True
+            )
+            _flush_thread.start()
+
+
+def _run_flush_thread() -> None:
+    """Background loop flushing buffers whose oldest record has waited long enough"""
+    while True:
+        time.sleep(RECORD_BUFFER_FLUSH_CHECK_SECONDS)
+        for processor in list(_buffered_processors):
+            processor.flush_due_records()
+
+
+@atexit.register
+def _flush_buffered_processors() -> None:
+    for processor in list(_buffered_processors):
+        processor.flush_records()
@@ -0,0 +1,128 @@
+"""
+學生資料檔案的原子寫入與跨行程鎖定
+
+寫入先寫到同目錄的暫存檔、fsync 後以 os.replace 取代原檔，讀取端永遠看到
+完整的舊檔或新檔，因此讀取不需要加鎖。會修改資料的操作以建議式檔案鎖
+（POSIX 用 fcntl.flock，Windows 用 msvcrt.locking）互斥，多個工作行程可
+共用同一個 students/ 目錄。
+"""
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import IO, Optional
+from config import STUDENT_LOCK_TIMEOUT
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_POLL_INTERVAL = 0.01  # seconds
+
+
+def try_lock(f: IO) -> bool:
+    """以非阻塞方式取得檔案的獨占鎖，已被其他檔案代號鎖住時回傳 False"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def unlock(f: IO) -> None:
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """
+    以鎖定檔實作的跨行程互斥（with 區塊）
+
+    鎖定檔本身不會被取代或刪除，因此可以保護會被 os.replace 換掉的資料檔。
+    """
+
+    def __init__(self, path: Path, timeout: Optional[float] = STUDENT_LOCK_TIMEOUT):
+        """
+        Args:
+            path: 鎖定檔路徑（不存在時建立）
+            timeout: 最多等待秒數（None 表示一直等待）
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self._file: Optional[IO] = None
+
+    def acquire(self) -> None:
+        f = open(self.path, 'a+b')
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not try_lock(f):
+            if deadline is not None and time.monotonic() >= deadline:
+                f.close()
+                raise TimeoutError(f"無法在 {self.timeout} 秒內鎖定 {self.path}")
+            time.sleep(LOCK_POLL_INTERVAL)
+        self._file = f
+
+    def release(self) -> None:
+        if self._file is not None:
+            try:
+                unlock(self._file)
+            finally:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    以暫存檔加 os.replace 原子地寫入文字檔
+
+    Args:
+        path: 目標檔案
+        text: 檔案內容
+    """
+    path = Path(path)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    fsync_directory(path.parent)
+
+
+def atomic_write_json(path: Path, data, **dump_kwargs) -> None:
+    """以 json.dumps 序列化後原子寫入（參數同 json.dumps）"""
+    atomic_write_text(path, json.dumps(data, **dump_kwargs))
+
+
+def fsync_directory(directory: Path) -> None:
+    """讓改名本身也寫入磁碟（Windows 不支援開啟目錄，略過）"""
+    if fcntl is None:
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
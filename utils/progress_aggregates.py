@@ -0,0 +1,142 @@
+"""
+Progress Aggregates - Running per-student counters maintained as records are saved
+
+Lifetime counters per subject and per scope answer historical queries, and a
+bounded window of the most recent answers answers "last N records" summaries,
+so neither needs to scan the learning records.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+from config import PROGRESS_RECENT_WINDOW
+
+AGGREGATES_VERSION = 1
+UNCATEGORIZED_SCOPE = "未分類"
+
+
+class ProgressAggregates:
+    """Counters for one student"""
+
+    def __init__(self, window: int = PROGRESS_RECENT_WINDOW):
+        """
+        Args:
+            window: Number of recent answers kept for windowed summaries
+        """
+        self.window = max(1, window)
+        self.count = 0
+        self.subjects: Dict[str, Dict] = {}
+        self.scopes: Dict[str, Dict] = {}
+        # (subject, correct, score, concept) of the most recent answers, oldest first
+        self.recent: deque = deque(maxlen=self.window)
+
+    def add(self, record: Dict) -> None:
+        """
+        Fold one learning record into the counters
+
+        Args:
+            record: Learning record dictionary
+        """
+        self.count += 1
+        subject = record.get("subject", "Unknown")
+        correct = bool(record.get("correct", False))
+        score = record.get("score", 0)
+        timestamp = record.get("timestamp", "")
+
+        entry = self.subjects.setdefault(
+            subject, {"total": 0, "correct": 0, "score_sum": 0, "last_seen": ""}
+        )
+        entry["total"] += 1
+        entry["correct"] += int(correct)
+        entry["score_sum"] += score
+        entry["last_seen"] = timestamp
+
+        scope = record.get("scope") or UNCATEGORIZED_SCOPE
+        entry = self.scopes.setdefault(
+            scope, {"total": 0, "correct": 0, "errors": 0, "first_error": None, "last_seen": ""}
+        )
+        entry["total"] += 1
+        entry["correct"] += int(correct)
+        entry["last_seen"] = timestamp
+        # Only an explicit False counts as a historical error
+        if record.get("correct") is False:
+            entry["errors"] += 1
+            if entry["first_error"] is None:
+                entry["first_error"] = self.count
+
+        concept = record.get("scope") or record.get("concept_to_reinforce", "")
+        self.recent.append((subject, correct, score, concept))
+
+    def progress_stats(self, num_records: int) -> Optional[Dict]:
+        """
+        Aggregate the most recent records from the window
+
+        Args:
+            num_records: Number of recent records
+
+        Returns:
+            Same shape as StudentStorage.progress_stats, or None when the
+            window does not reach back far enough
+        """
+        if num_records > len(self.recent) and self.count > len(self.recent):
+            return None
+        entries = list(self.recent)[-num_records:] if num_records > 0 else []
+        stats = {"total": 0, "correct": 0, "subjects": {}, "concepts": []}
+        for subject, correct, score, concept in entries:
+            if concept and not correct:
+                stats["concepts"].append(concept)
+            entry = stats["subjects"].setdefault(subject, {"total": 0, "correct": 0, "score_sum": 0})
+            entry["total"] += 1
+            entry["score_sum"] += score
+            stats["total"] += 1
+            if correct:
+                entry["correct"] += 1
+                stats["correct"] += 1
+        return stats
+
+    def error_scope_counts(self) -> Dict[str, int]:
+        """
+        Incorrect answers per scope over the whole history
+
+        Returns:
+            {scope: errors}, most errors first (ties in order of first error)
+        """
+        erred = [(scope, entry) for scope, entry in self.scopes.items() if entry["errors"]]
+        erred.sort(key=lambda item: (-item[1]["errors"], item[1]["first_error"]))
+        return {scope: entry["errors"] for scope, entry in erred}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict], window: int = PROGRESS_RECENT_WINDOW) -> "ProgressAggregates":
+        """Build counters from existing records (one-time scan for older students)"""
+        aggregates = cls(window)
+        for record in records:
+            aggregates.add(record)
+        return aggregates
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": AGGREGATES_VERSION,
+            "count": self.count,
+            "subjects": self.subjects,
+            "scopes": self.scopes,
+            "recent": [list(entry) for entry in self.recent]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, window: int = PROGRESS_RECENT_WINDOW) -> Optional["ProgressAggregates"]:
+        """
+        Restore counters saved with to_dict
+
+        Returns:
+            ProgressAggregates, or None if the data is from another version
+            or kept a smaller window than requested (rebuild from records)
+        """
+        if not data or data.get("version") != AGGREGATES_VERSION:
+            return None
+        recent: List = data.get("recent", [])
+        if len(recent) < min(window, data.get("count", 0)):
+            return None
+        aggregates = cls(window)
+        aggregates.count = data.get("count", 0)
+        aggregates.subjects = data.get("subjects", {})
+        aggregates.scopes = data.get("scopes", {})
+        aggregates.recent.extend(tuple(entry) for entry in recent)
+        return aggregates
@@ -1,8 +1,118 @@
 """
 題庫解析器 - 解析文本格式的題目和解答
 """
+import hashlib
+import io
+import os
+import pickle
 import re
-from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from config import (
+    QUESTION_BANK_CACHE_ENABLED,
+    QUESTION_BANK_CHUNK_CHARS,
+    QUESTION_BANK_DIR,
+    QUESTION_BANK_LOAD_WORKERS,
+    QUESTION_BANK_PARALLEL_MIN_CHARS,
+    SUBJECT_BANK_FILES,
+    SUBJECTS,
+)
+
+# 解析結果格式或規則變更時遞增，使舊的編譯快取失效
+PARSER_VERSION = 2
+CACHE_SUFFIX = ".cache"
+
+BLOCK_SEPARATOR = '=' * 40
+QUESTION_MARKER = '【題目】'
+ANSWER_MARKER = '【答案】'
+SCOPE_MARKER = '【範圍】'
+
+# 預先編譯的樣式（皆為線性時間，無巢狀量詞）
+_SCOPE_LINE = re.compile(r'【範圍】(.+)')
+_OPTION_LINE = re.compile(r'[（(]?\s*([A-DＡＢＣＤ])[）)]?\s*(.+)')
+_NUMBER_PREFIX = re.compile(r'^\s*[（(][）)]?\d+、')
+_ANSWER_MARK = re.compile(r'[（(]\s*([A-DＡＢＣＤa-d])\s*[）)]')
+_INLINE_MARKER = _ANSWER_MARK  # 單行內嵌選項使用相同的標記樣式
+_TIGHT_MARKER = re.compile(r'[（(][A-DＡＢＣＤa-d][）)]')
+_OPEN_PAREN = re.compile(r'[（(]')
+_BANK_HEADER = re.compile(r'【(.+?)題庫】')
+
+_OPEN_PARENS = '（('
+_CLOSE_PARENS = '）)'
+_OPTION_LINE_STARTS = '（(ABCDＡＢＣＤ'
+_FULLWIDTH_MAP = {'Ａ': 'A', 'Ｂ': 'B', 'Ｃ': 'C', 'Ｄ': 'D',
+                  'ａ': 'A', 'ｂ': 'B', 'ｃ': 'C', 'ｄ': 'D'}
+
+
+def _normalize_letter(letter: str) -> str:
+    return _FULLWIDTH_MAP.get(letter, letter).upper()
+
+
+def split_inline_options(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    拆分單行內的選項，例如「題幹 (A) 甲 (B) 乙（C）丙 (D) 丁」
+    
+    線性時間：每個選項標記只比對一次，選項文字直接延伸到下一個左括號，
+    不做回溯。該括號必須是緊密的選項標記（如 (B)）或選項位於行尾，
+    否則此標記不算選項（與原本的正規表示式結果相同）。
+    
+    Args:
+        text: 合併後的題目文字
+        
+    Returns:
+        (題幹, 選項字典)；沒有選項時題幹為整段文字
+    """
+    options = {}
+    length = len(text)
+    marker = _INLINE_MARKER.search(text)
+    while marker:
+        next_paren = _OPEN_PAREN.search(text, marker.end())
+        end = next_paren.start() if next_paren else length
+        if marker.end() < end and (end == length or _TIGHT_MARKER.match(text, end)):
+            options[_normalize_letter(marker.group(1))] = text[marker.end():end].strip()
+            marker = _INLINE_MARKER.search(text, end)
+        else:
+            marker = _INLINE_MARKER.search(text, marker.start() + 1)
+    
+    if not options:
+        return text, options
+    
+    # 把題幹切到第一個緊密選項標記之前
+    first = _TIGHT_MARKER.search(text)
+    stem = text[:first.start()] if first else text
+    return stem.strip(), options
+
+
+def _iter_lines(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    """逐行讀取題庫（路徑或可迭代的文字行）"""
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as f:
+            yield from f
+    else:
+        yield from source
+
+
+def _iter_blocks(lines: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """
+    單次掃描，以分隔線切出題目區塊
+    
+    Yields:
+        (區塊文字, 是否為檔案結尾的最後一個區塊)
+    """
+    current = []
+    for line in lines:
+        if BLOCK_SEPARATOR in line:
+            parts = line.split(BLOCK_SEPARATOR)
+            current.append(parts[0])
+            yield ''.join(current), False
+            for part in parts[1:-1]:
+                yield part, False
+            current = [parts[-1]]
+        else:
+            current.append(line)
+    yield ''.join(current), True
+
 
 class QuestionBankParser:
     """解析題庫文本文件"""
@@ -22,14 +132,45 @@ class QuestionBankParser:
             解析後的題目列表
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            return self._parse_content(content, subject)
+            return list(self.iter_questions(file_path, subject))
         except Exception as e:
             print(f"解析題庫文件時發生錯誤: {e}")
             return []
     
+    def iter_questions(self, source: Union[str, Iterable[str]], subject: str) -> Iterator[Dict]:
+        """
+        串流解析題庫，每解析完一題即產出
+        
+        多題目格式只需保留目前區塊；若整份檔案都沒有【題目】與【答案】
+        標記，才退回單題格式（需要完整內容）。
+        
+        Args:
+            source: 題庫文件路徑，或逐行文字（如已開啟的檔案）
+            subject: 科目名稱
+            
+        Yields:
+            題目字典
+        """
+        has_question_marker = False
+        has_answer_marker = False
+        # 尚未確定為多題目格式前保留原文，以便退回單題格式
+        pending = []
+        
+        for block, is_last in _iter_blocks(_iter_lines(source)):
+            if pending is not None:
+                pending.append(block)
+            has_question_marker = has_question_marker or QUESTION_MARKER in block
+            has_answer_marker = has_answer_marker or ANSWER_MARKER in block
+            if has_question_marker and has_answer_marker:
+                pending = None
+            
+            question = self._parse_block(block, subject)
+            if question:
+                yield question
+        
+        if pending is not None:
+            yield from self._parse_single_question(BLOCK_SEPARATOR.join(pending), subject)
+    
     def _parse_content(self, content: str, subject: str) -> List[Dict]:
         """
         解析題庫內容（支持多題目）
@@ -46,13 +187,12 @@ class QuestionBankParser:
         
         多題目用【題目】【答案】分隔
         """
+        return list(self.iter_questions(io.StringIO(content), subject))
+    
+    def _parse_single_question(self, content: str, subject: str) -> List[Dict]:
+        """解析單題格式（問題與解答以「解答」分隔）"""
         questions = []
         
-        # 檢查是否是多題目格式（用【題目】和【答案】分隔）
-        if '【題目】' in content and '【答案】' in content:
-            return self._parse_multi_questions_format(content, subject)
-        
-        # 原有格式：單一問題和解答的分割
         parts = content.split('解答')
         if len(parts) != 2:
             print("警告: 題庫格式不正確，應該包含「解答」分隔符")
@@ -84,57 +224,100 @@ class QuestionBankParser:
         questions.append(question)
         return questions
     
+    def _parse_block(self, block: str, subject: str) -> Optional[Dict]:
+        """
+        解析一個多題目格式的區塊
+        
+        格式:
+        【範圍】章節
+        【題目】
+        （）1、問題文本...
+        (A) 選項A
+        ...
+        
+        【答案】
+        （A）1、解析文本...
+        """
+        if QUESTION_MARKER not in block or ANSWER_MARKER not in block:
+            return None
+        
+        scope_text = ""
+        scope_match = _SCOPE_LINE.search(block)
+        if scope_match:
+            scope_text = scope_match.group(1).strip()
+        
+        # 拆分題目與答案
+        q_part, a_part = block.split(ANSWER_MARKER, 1)
+        if QUESTION_MARKER not in q_part:
+            return None
+        question_text = q_part.split(QUESTION_MARKER, 1)[1].strip()
+        answer_text = a_part.strip()
+        
+        if not question_text or not answer_text:
+            return None
+        
+        # 解析題目部分
+        q_parsed = self._parse_question_section(question_text)
+        if not q_parsed or not q_parsed.get('options'):
+            return None
+        
+        # 解析答案部分
+        a_parsed = self._parse_answer_section(answer_text)
+        if not a_parsed:
+            return None
+        
+        # 合併成完整題目
+        return {
+            'subject': subject,
+            'question': q_parsed['question'],
+            'options': q_parsed['options'],
+            'correct_answer': a_parsed['correct_answer'],
+            'explanation': a_parsed['explanation'],
+            'scope': q_parsed.get('scope') or scope_text,
+            'source': 'question_bank'
+        }
+    
     def _parse_question_section(self, section: str) -> Optional[Dict]:
         """解析問題段落，支援【範圍】標記"""
-        lines = section.strip().split('\n')
         scope = ""
         question_lines = []
         options = {}
-        fullwidth_map = {'Ａ': 'A', 'Ｂ': 'B', 'Ｃ': 'C', 'Ｄ': 'D'}
-
-        for line in lines:
+        
+        for line in section.split('\n'):
             line = line.strip()
             if not line:
                 continue
-
+            first = line[0]
+            
             # 範圍標記
-            scope_match = re.match(r'【範圍】(.+)', line)
-            if scope_match:
-                scope = scope_match.group(1).strip()
+            if first == '【' and line.startswith(SCOPE_MARKER) and len(line) > len(SCOPE_MARKER):
+                scope = line[len(SCOPE_MARKER):].strip()
                 continue
-
+            
             # 選項行
-            opt_match = re.match(r'[（(]?\s*([A-DＡＢＣＤ])[）)]?\s*(.+)', line)
-            if opt_match:
-                letter = opt_match.group(1)
-                letter = fullwidth_map.get(letter, letter)
-                options[letter] = opt_match.group(2).strip()
-                continue
-
+            if first in _OPTION_LINE_STARTS:
+                opt_match = _OPTION_LINE.match(line)
+                if opt_match:
+                    options[_normalize_letter(opt_match.group(1))] = opt_match.group(2).strip()
+                    continue
+            
             # 問題文本
-            clean_line = re.sub(r'^\s*[（(][）)]?\d+、', '', line)
-            if clean_line:
-                question_lines.append(clean_line)
-
+            if first in _OPEN_PARENS:
+                line = _NUMBER_PREFIX.sub('', line, count=1)
+            if line:
+                question_lines.append(line)
+        
         # 若尚未解析到選項，嘗試從單行內的 (A)(B)... 形式抽取（含全形）
-        if not options:
-            combined = ' '.join(question_lines)
-            inline_pattern = r'[（(]\s*([A-DＡＢＣＤa-d])\s*[）)]\s*([^（(]+?)(?=(?:[（(][A-DＡＢＣＤa-d][）)])|$)'
-            fullwidth_map = {'Ａ': 'A', 'Ｂ': 'B', 'Ｃ': 'C', 'Ｄ': 'D',
-                             'ａ': 'A', 'ｂ': 'B', 'ｃ': 'C', 'ｄ': 'D'}
-            inline_options = {}
-            for m in re.finditer(inline_pattern, combined):
-                letter = m.group(1)
-                letter = fullwidth_map.get(letter, letter).upper()
-                inline_options[letter] = m.group(2).strip()
+        if not options and question_lines:
+            stem, inline_options = split_inline_options(' '.join(question_lines))
             if inline_options:
                 options = inline_options
                 # 把題幹切到第一個選項之前
-                question_lines = [re.split(r'[（(][A-DＡＢＣＤa-d][）)]', combined, 1)[0].strip()]
-
+                question_lines = [stem]
+        
         if not question_lines or len(options) < 1:
             return None
-
+        
         return {
             'question': '\n'.join(question_lines),
             'options': options,
@@ -144,26 +327,21 @@ class QuestionBankParser:
     def _parse_answer_section(self, section: str) -> Optional[Dict]:
         """解析解答段落（解釋可選）"""
         # 找出答案選項（A/B/C/D，含全形、大小寫）
-        answer_match = re.search(r'[（(]\s*([A-DＡＢＣＤa-d])\s*[）)]', section)
+        answer_match = _ANSWER_MARK.search(section)
         if not answer_match:
             print("警告: 無法找到正確答案")
             return None
         
-        letter = answer_match.group(1)
-        fullwidth_map = {'Ａ': 'A', 'Ｂ': 'B', 'Ｃ': 'C', 'Ｄ': 'D',
-                         'ａ': 'A', 'ｂ': 'B', 'ｃ': 'C', 'ｄ': 'D'}
-        correct_answer = fullwidth_map.get(letter, letter).upper()
+        correct_answer = _normalize_letter(answer_match.group(1))
         
         # 移除答案部分後的剩餘內容作為解釋（可為空）
-        lines = section.strip().split('\n')
         explanation_lines = []
-        
-        for i, line in enumerate(lines):
+        for line in section.strip().split('\n'):
             line = line.strip()
             if not line:
                 continue
-            # 跳過包含正確答案標記的行
-            if re.match(r'[（(][A-D][）)]\d*、?', line):
+            # 跳過以正確答案標記開頭的行，如「（A）1、」
+            if len(line) >= 3 and line[0] in _OPEN_PARENS and line[1] in 'ABCD' and line[2] in _CLOSE_PARENS:
                 continue
             # 其他行作為解釋
             explanation_lines.append(line)
@@ -175,85 +353,268 @@ class QuestionBankParser:
             'correct_answer': correct_answer,
             'explanation': explanation
         }
+
+
+def iter_questions(source: Union[str, Iterable[str]], subject: str) -> Iterator[Dict]:
+    """
+    串流解析題庫文件
     
-    def _parse_multi_questions_format(self, content: str, subject: str) -> List[Dict]:
-        """
-        解析多題目格式（用【題目】和【答案】分隔）
-        
-        格式:
-        【題目】
-        （）1、問題文本...
-        (A) 選項A
-        ...
-        
-        【答案】
-        （A）1、解析文本...
+    Args:
+        source: 題庫文件路徑，或逐行文字（如已開啟的檔案）
+        subject: 科目名稱
         
-        【題目】
-        ...（下一題）
-        """
-        questions = []
+    Yields:
+        題目字典
+    """
+    return QuestionBankParser().iter_questions(source, subject)
+
+def load_question_bank(
+    file_path: str,
+    subject: str,
+    use_cache: bool = QUESTION_BANK_CACHE_ENABLED
+) -> List[Dict]:
+    """
+    載入題庫文件
+    
+    使用編譯快取時，檔案大小與修改時間未變即直接讀取快取；
+    否則比對內容雜湊，只有內容或解析器版本改變才重新解析。
+    
+    Args:
+        file_path: 題庫文件路徑
+        subject: 科目名稱
+        use_cache: 是否使用編譯快取（<題庫>.cache）
         
-        # 以分隔線區分題目區塊，支援【範圍】
-        blocks = [b.strip() for b in content.split('========================================') if '【題目】' in b and '【答案】' in b]
+    Returns:
+        題目列表
+    """
+    if not use_cache:
+        return QuestionBankParser().parse_file(file_path, subject)
+    return load_banks([(file_path, subject)], max_workers=1)[0]
 
-        for block in blocks:
-            scope_text = ""
-            scope_match = re.search(r'【範圍】(.+)', block)
-            if scope_match:
-                scope_text = scope_match.group(1).strip()
 
-            # 拆分題目與答案
-            try:
-                q_part, a_part = block.split('【答案】', 1)
-            except ValueError:
-                continue
-            if '【題目】' not in q_part:
+def load_banks(
+    banks: List[Tuple[str, str]],
+    max_workers: Optional[int] = None,
+    use_cache: bool = QUESTION_BANK_CACHE_ENABLED,
+    chunk_chars: int = QUESTION_BANK_CHUNK_CHARS,
+    parallel_min_chars: int = QUESTION_BANK_PARALLEL_MIN_CHARS
+) -> List[List[Dict]]:
+    """
+    同時載入多個題庫
+    
+    快取有效的題庫直接讀取；其餘題庫在區塊分隔線處切成多段，
+    總字元數達 parallel_min_chars 時交給多個行程平行解析（較小時
+    啟動行程的成本高於解析本身，直接在本行程解析），
+    再依原本的檔案與區塊順序合併。
+    
+    Args:
+        banks: (題庫文件路徑, 科目名稱) 列表
+        max_workers: 解析行程數（預設 QUESTION_BANK_LOAD_WORKERS，0 為 CPU 數）
+        use_cache: 是否使用編譯快取
+        chunk_chars: 每段的大約字元數
+        parallel_min_chars: 使用多個行程的最小待解析字元數
+        
+    Returns:
+        與 banks 順序相同的題目列表
+    """
+    results = [[] for _ in banks]
+    pending = []
+    for index, (file_path, subject) in enumerate(banks):
+        try:
+            stat = os.stat(file_path)
+            cached = _read_bank_cache(file_path + CACHE_SUFFIX) if use_cache else None
+            # 快速路徑：大小與修改時間相同，不需讀取題庫內容
+            if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                results[index] = _with_subject(cached["questions"], subject)
                 continue
-            question_text = q_part.split('【題目】', 1)[1].strip()
-            answer_text = a_part.strip()
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            content = _decode_bank(raw)
+        except Exception as e:
+            print(f"解析題庫文件時發生錯誤: {e}")
+            continue
+        
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached and cached["sha256"] == digest:
+            # 只有修改時間改變：沿用快取並更新檔案資訊
+            _store_bank_cache(file_path, stat, digest, cached["questions"])
+            results[index] = _with_subject(cached["questions"], subject)
+            continue
+        pending.append((index, file_path, subject, content, stat, digest))
+    
+    tasks = []
+    owners = []
+    for position, (_, _, subject, content, _, _) in enumerate(pending):
+        for multi_format, chunk in _split_bank_chunks(content, chunk_chars):
+            tasks.append((subject, multi_format, chunk))
+            owners.append(position)
+    
+    parsed = [[] for _ in pending]
+    for position, questions in zip(owners, _run_parse_tasks(tasks, max_workers, parallel_min_chars)):
+        parsed[position].extend(questions)
+    
+    for (index, file_path, subject, _, stat, digest), questions in zip(pending, parsed):
+        if use_cache:
+            _store_bank_cache(file_path, stat, digest, questions)
+        results[index] = _with_subject(questions, subject)
+    return results
 
-            if not question_text or not answer_text:
-                continue
 
-            # 解析題目部分
-            q_parsed = self._parse_question_section(question_text)
-            if not q_parsed or not q_parsed.get('options'):
-                continue
+def load_all_banks(
+    directory: str = QUESTION_BANK_DIR,
+    max_workers: Optional[int] = None,
+    use_cache: bool = QUESTION_BANK_CACHE_ENABLED
+) -> Dict[str, List[Dict]]:
+    """
+    載入目錄下所有題庫（*.txt）
+    
+    Args:
+        directory: 題庫目錄
+        max_workers: 解析行程數
+        use_cache: 是否使用編譯快取
+        
+    Returns:
+        科目名稱 -> 題目列表（依檔名排序，同科目多個檔案依序合併）
+    """
+    paths = sorted(Path(directory).glob('*.txt'))
+    banks = [(str(path), bank_subject(path)) for path in paths]
+    merged: Dict[str, List[Dict]] = {}
+    for (_, subject), questions in zip(banks, load_banks(banks, max_workers, use_cache)):
+        merged.setdefault(subject, []).extend(questions)
+    return merged
 
-            # 解析答案部分
-            a_parsed = self._parse_answer_section(answer_text)
-            if not a_parsed:
-                continue
 
-            # 合併成完整題目
-            question = {
-                'subject': subject,
-                'question': q_parsed['question'],
-                'options': q_parsed['options'],
-                'correct_answer': a_parsed['correct_answer'],
-                'explanation': a_parsed['explanation'],
-                'scope': q_parsed.get('scope') or scope_text,
-                'source': 'question_bank'
-            }
+def bank_subject(path: Union[str, Path]) -> str:
+    """
+    推斷題庫檔案的科目
+    
+    優先使用 SUBJECT_BANK_FILES 的對應（SUBJECTS 中的名稱優先），
+    其次為首行的【X題庫】標題，最後為檔名。
+    """
+    path = Path(path)
+    mapped = [subject for subject, bank_file in SUBJECT_BANK_FILES.items() if Path(bank_file).name == path.name]
+    if mapped:
+        preferred = [subject for subject in mapped if subject in SUBJECTS]
+        return (preferred or mapped)[0]
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = f.readline().strip()
+        header_match = _BANK_HEADER.match(header)
+        if header_match:
+            return header_match.group(1)
+    except (OSError, UnicodeDecodeError):
+        pass
+    return path.stem
 
-            questions.append(question)
-        
-        return questions
 
-def load_question_bank(file_path: str, subject: str) -> List[Dict]:
+def _split_bank_chunks(content: str, chunk_chars: int) -> List[Tuple[bool, str]]:
     """
-    載入題庫文件
+    在區塊分隔線處切段
     
-    Args:
-        file_path: 題庫文件路徑
-        subject: 科目名稱
-        
     Returns:
-        題目列表
+        (是否為多題目格式, 段落文字) 列表；單題格式不切段
     """
+    if QUESTION_MARKER not in content or ANSWER_MARKER not in content:
+        return [(False, content)]
+    
+    chunks = []
+    current = []
+    size = 0
+    for block in content.split(BLOCK_SEPARATOR):
+        current.append(block)
+        size += len(block)
+        if size >= chunk_chars:
+            chunks.append((True, BLOCK_SEPARATOR.join(current)))
+            current = []
+            size = 0
+    if current:
+        chunks.append((True, BLOCK_SEPARATOR.join(current)))
+    return chunks
+
+
+def _parse_bank_chunk(task: Tuple[str, bool, str]) -> List[Dict]:
+    """解析一段題庫（在子行程中執行）"""
+    subject, multi_format, text = task
     parser = QuestionBankParser()
-    return parser.parse_file(file_path, subject)
+    if not multi_format:
+        return parser._parse_content(text, subject)
+    questions = []
+    for block in text.split(BLOCK_SEPARATOR):
+        question = parser._parse_block(block, subject)
+        if question:
+            questions.append(question)
+    return questions
+
+
+def _run_parse_tasks(
+    tasks: List[Tuple[str, bool, str]],
+    max_workers: Optional[int],
+    parallel_min_chars: int = QUESTION_BANK_PARALLEL_MIN_CHARS
+) -> List[List[Dict]]:
+    """依序回傳每段的解析結果；只有一段、單一行程或內容太少時直接在本行程解析"""
+    workers = max_workers or QUESTION_BANK_LOAD_WORKERS or os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1 or sum(len(text) for _, _, text in tasks) < parallel_min_chars:
+        return [_parse_bank_chunk(task) for task in tasks]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_parse_bank_chunk, tasks))
+    except Exception as e:
+        print(f"警告: 無法平行解析題庫，改為依序解析 ({e})")
+        return [_parse_bank_chunk(task) for task in tasks]
+
+
+def _decode_bank(raw: bytes) -> str:
+    """解碼題庫內容，換行處理與文字模式讀檔相同"""
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _store_bank_cache(file_path: str, stat: os.stat_result, digest: str, questions: List[Dict]) -> None:
+    _write_bank_cache(file_path + CACHE_SUFFIX, {
+        "version": PARSER_VERSION,
+        "sha256": digest,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "questions": questions
+    })
+
+
+def _read_bank_cache(cache_path: str) -> Optional[Dict]:
+    """讀取編譯快取；不存在、損毀或版本不符時回傳 None"""
+    try:
+        with open(cache_path, 'rb') as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"警告: 題庫快取無法讀取，將重新解析 ({e})")
+        return None
+    if not isinstance(data, dict) or data.get("version") != PARSER_VERSION:
+        return None
+    return data
+
+
+def _write_bank_cache(cache_path: str, data: Dict) -> None:
+    """原子寫入編譯快取（失敗時僅提示，不影響載入）"""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"警告: 題庫快取寫入失敗: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _with_subject(questions: List[Dict], subject: str) -> List[Dict]:
+    """同一題庫可對應多個科目名稱（如國文／語文），載入時套用呼叫者的科目"""
+    for question in questions:
+        question['subject'] = subject
+    return questions
+
     # --- 新增執行區塊 ---
 if __name__ == '__main__':
     import os
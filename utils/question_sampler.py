@@ -0,0 +1,123 @@
+"""
+題庫抽題器 - 每位學生、每個科目／範圍一個洗牌排列與游標，逐一抽出不重複題目
+
+排列由種子決定，個人資料只保存種子與游標（profile["question_cursors"]），
+重新啟動後可還原相同排列；一輪抽完會以新種子重新洗牌。
+"""
+import random
+from array import array
+from typing import Dict, List, Optional
+from config import QUESTION_SAMPLER_SEED, QUESTION_SAMPLER_CACHE_SIZE
+from utils.lru_cache import LRUCache
+
+
+class QuestionSampler:
+    """以洗牌排列加游標抽題，每次抽題攤銷 O(1)"""
+
+    def __init__(
+        self,
+        bank_store,
+        seed: Optional[int] = QUESTION_SAMPLER_SEED,
+        cache_size: int = QUESTION_SAMPLER_CACHE_SIZE
+    ):
+        """
+        Args:
+            bank_store: 題庫儲存（MemoryBankStore 或 MmapBankStore）
+            seed: 固定種子（None 表示每個新排列隨機產生種子；測試時可指定）
+            cache_size: 記憶體中保留的排列數量
+        """
+        self.bank_store = bank_store
+        self.seed = seed
+        self._permutations = LRUCache(cache_size)
+
+    @staticmethod
+    def pool_key(subject: Optional[str] = None, scope: Optional[str] = None) -> str:
+        return f"{subject or '*'}|{scope or '*'}"
+
+    def _new_seed(self, key: str) -> int:
+        if self.seed is None:
+            return random.getrandbits(32)
+        return random.Random(f"{self.seed}:{key}").getrandbits(32)
+
+    def _state(self, cursors: Dict, key: str, pool) -> Dict:
+        """取得題目範圍的游標狀態；題庫內容變更時重新開始"""
+        first = self.bank_store.question_id(pool[0])
+        state = cursors.get(key)
+        if not state or state.get("size") != len(pool) or state.get("first") != first:
+            state = {"seed": self._new_seed(key), "cursor": 0, "size": len(pool), "first": first}
+            cursors[key] = state
+        return state
+
+    def _permutation(self, key: str, size: int, seed: int) -> array:
+        cache_key = (key, size, seed)
+        permutation = self._permutations.get(cache_key)
+        if permutation is None:
+            permutation = array('I', range(size))
+            random.Random(seed).shuffle(permutation)
+            self._permutations.set(cache_key, permutation)
+        return permutation
+
+    def draw(
+        self,
+        cursors: Dict,
+        subject: Optional[str] = None,
+        scope: Optional[str] = None,
+        used=None,
+        exclude=()
+    ) -> Optional[int]:
+        """
+        抽出下一題
+
+        Args:
+            cursors: 學生的游標狀態（profile["question_cursors"]，會就地更新）
+            subject: 科目（None 表示不限）
+            scope: 範圍（None 表示不限）
+            used: 已使用題目（UsedQuestionSet；這些題目會被略過）
+            exclude: 本次已抽出的題目編號
+
+        Returns:
+            題目編號，或 None（範圍內沒有可用題目）
+        """
+        pool = self.bank_store.select(subject, scope)
+        if not pool:
+            return None
+        key = self.pool_key(subject, scope)
+        state = self._state(cursors, key, pool)
+        permutation = self._permutation(key, len(pool), state["seed"])
+
+        # 最多檢查一輪；都不可用時回傳 None
+        for _ in range(len(pool)):
+            if state["cursor"] >= len(pool):
+                # 一輪抽完：換新種子重新洗牌
+                state["seed"] = random.Random(state["seed"]).getrandbits(32)
+                state["cursor"] = 0
+                permutation = self._permutation(key, len(pool), state["seed"])
+            index = pool[permutation[state["cursor"]]]
+            state["cursor"] += 1
+            if index in exclude:
+                continue
+            if used is None or self.bank_store.question_id(index) not in used:
+                return index
+        return None
+
+    def draw_many(
+        self,
+        cursors: Dict,
+        count: int,
+        subject: Optional[str] = None,
+        scope: Optional[str] = None,
+        used=None
+    ) -> List[int]:
+        """
+        抽出多題不重複的題目
+
+        Returns:
+            題目編號列表（長度不超過 count）
+        """
+        picked: List[int] = []
+        while len(picked) < count:
+            index = self.draw(cursors, subject, scope, used, exclude=picked)
+            if index is None:
+                break
+            picked.append(index)
+        return picked
@@ -0,0 +1,190 @@
+"""
+學習紀錄寫入緩衝 - 作答紀錄先寫入小型預寫日誌（pending_<id>.<token>.journal），
+累積到一定筆數或時間後再批次寫入學生儲存
+
+預寫日誌只附加一行並 fsync，當機或斷電後重新啟動時由 replay 補寫進儲存，
+已寫入儲存的紀錄會依檔尾比對略過，不會重複。每個緩衝有自己的日誌並在
+存在期間鎖住它，其他工作行程的 replay 只會處理沒有擁有者的日誌。
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+from config import (
+    RECORD_BUFFER_MAX_RECORDS,
+    RECORD_BUFFER_MAX_SECONDS,
+    RECORD_BUFFER_JOURNAL_FSYNC,
+)
+from utils.file_lock import try_lock, unlock
+from utils.record_log import LearningRecordLog
+
+
+class RecordBuffer:
+    """以預寫日誌保護的學習紀錄批次寫入"""
+
+    def __init__(
+        self,
+        storage,
+        journal_dir: str,
+        max_records: int = RECORD_BUFFER_MAX_RECORDS,
+        max_seconds: float = RECORD_BUFFER_MAX_SECONDS,
+        journal_fsync: bool = RECORD_BUFFER_JOURNAL_FSYNC
+    ):
+        """
+        Args:
+            storage: 學生儲存（StudentStorage）
+            journal_dir: 預寫日誌目錄
+            max_records: 累積多少筆就該寫入
+            max_seconds: 最舊的待寫紀錄最多等待幾秒
+            journal_fsync: 每筆日誌是否 fsync（關閉後斷電可能遺失最後幾筆）
+        """
+        self.storage = storage
+        self.journal_dir = Path(journal_dir)
+        self.max_records = max_records
+        self.max_seconds = max_seconds
+        self.journal_fsync = journal_fsync
+        self._token = uuid.uuid4().hex[:12]
+        self._journals: Dict[str, IO] = {}  # 開啟並鎖住的預寫日誌
+        self._pending: Dict[str, List[Dict]] = {}
+        self._pending_count = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.RLock()
+
+    def journal_path(self, student_id: str) -> Path:
+        # 與分層目錄相同的編碼：含路徑分隔字元或非 ASCII 的 id 也是單一檔名
+        return self.journal_dir / f"pending_{quote(student_id, safe='')}.{self._token}.journal"
+
+    def _journal(self, student_id: str) -> IO:
+        journal = self._journals.get(student_id)
+        if journal is None:
+            journal = open(self.journal_path(student_id), 'a', encoding='utf-8')
+            if not try_lock(journal):
+                journal.close()
+                raise OSError(f"無法鎖定 {self.journal_path(student_id)}")
+            self._journals[student_id] = journal
+        return journal
+
+    def add(self, student_id: str, record: Dict) -> bool:
+        """
+        寫入預寫日誌並放入緩衝
+
+        Args:
+            student_id: 學生 ID
+            record: 紀錄字典
+
+        Returns:
+            是否已達寫入門檻（呼叫端應執行 flush）
+        """
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            journal = self._journal(student_id)
+            journal.write(line)
+            journal.flush()
+            if self.journal_fsync:
+                os.fsync(journal.fileno())
+            self._pending.setdefault(student_id, []).append(record)
+            self._pending_count += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            return self.should_flush()
+
+    def should_flush(self) -> bool:
+        if not self._pending_count:
+            return False
+        return (
+            self._pending_count >= self.max_records
+            or time.monotonic() - self._oldest >= self.max_seconds
+        )
+
+    def pending(self, student_id: Optional[str] = None) -> int:
+        """待寫入的紀錄數量"""
+        with self._lock:
+            if student_id is None:
+                return self._pending_count
+            return len(self._pending.get(student_id, []))
+
+    def pending_records(self, student_id: str) -> List[Dict]:
+        """這位學生待寫入的紀錄（依加入順序）"""
+        with self._lock:
+            return list(self._pending.get(student_id, []))
+
+    def flush(self, student_id: Optional[str] = None) -> Dict[str, Tuple[List[Dict], Tuple]]:
+        """
+        把待寫紀錄批次寫入儲存，確定寫入磁碟後才刪除預寫日誌
+
+        儲存平時不一定 fsync（LEARNING_RECORD_FSYNC、SQLite synchronous=NORMAL），
+        因此以 durable=True 寫入。寫入失敗的學生紀錄留在緩衝與日誌中，下次再寫。
+
+        Args:
+            student_id: 只寫入這位學生（None 表示全部）
+
+        Returns:
+            {已寫入的學生 ID: (寫入的紀錄, storage.append_records 回傳的寫入前後版本)}
+        """
+        flushed = {}
+        with self._lock:
+            students = [student_id] if student_id is not None else list(self._pending)
+            for sid in students:
+                records = self._pending.get(sid)
+                if not records:
+                    continue
+                versions = self.storage.append_records(sid, records, durable=True)
+                self._discard_journal(sid)
+                del self._pending[sid]
+                self._pending_count -= len(records)
+                flushed[sid] = (records, versions)
+            if not self._pending_count:
+                self._oldest = None
+        return flushed
+
+    def _discard_journal(self, student_id: str) -> None:
+        """清空並刪除日誌（先清空，已開啟此檔等待鎖的 replay 不會重複補寫）"""
+        journal = self._journals.pop(student_id, None)
+        if journal is None:
+            return
+        try:
+            journal.truncate(0)
+            unlock(journal)
+        finally:
+            journal.close()
+        self.journal_path(student_id).unlink(missing_ok=True)
+
+    def replay(self) -> Dict[str, int]:
+        """
+        補寫沒有擁有者的預寫日誌（當機留下的；啟動時呼叫）
+
+        Returns:
+            {學生 ID: 補寫筆數}
+        """
+        replayed: Dict[str, int] = {}
+        with self._lock:
+            for path in sorted(self.journal_dir.glob("pending_*.journal")):
+                student_id = unquote(path.name[len("pending_"):].rsplit(".", 2)[0])
+                try:
+                    journal = open(path, 'r+', encoding='utf-8')
+                except FileNotFoundError:
+                    continue
+                try:
+                    if not try_lock(journal):
+                        continue  # 仍有行程在使用
+                    records = LearningRecordLog.read_all(path)
+                    missing = records[_overlap(self.storage.get_records(student_id, len(records)), records):]
+                    if missing:
+                        self.storage.append_records(student_id, missing, durable=True)
+                    path.unlink(missing_ok=True)
+                    replayed[student_id] = replayed.get(student_id, 0) + len(missing)
+                finally:
+                    journal.close()
+        return replayed
+
+
+def _overlap(stored: List[Dict], journal: List[Dict]) -> int:
+    """儲存檔尾已包含的日誌開頭筆數（寫入儲存後、刪除日誌前中斷的情況）"""
+    for size in range(min(len(stored), len(journal)), 0, -1):
+        if stored[-size:] == journal[:size]:
+            return size
+    return 0
@@ -0,0 +1,202 @@
+"""
+學習紀錄日誌 - 每行一筆 JSON 的附加式紀錄檔（records_<id>.jsonl）
+
+新增紀錄只附加一行，讀取最近 N 筆時從檔尾往回讀，不必載入整個檔案。
+舊版 records_<id>.json（整個 JSON 陣列）可用 migrate_json_records 一次轉換：
+    python -m utils.record_log [學生資料目錄]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from config import (
+    STUDENT_DATA_DIR,
+    LEARNING_RECORD_FSYNC,
+    LEARNING_RECORD_FSYNC_INTERVAL,
+)
+from utils.file_lock import fsync_directory
+
+FSYNC_POLICIES = ("always", "interval", "never")
+TAIL_BLOCK_SIZE = 8192
+
+
+class LearningRecordLog:
+    """附加式 JSONL 學習紀錄"""
+
+    def __init__(
+        self,
+        fsync_policy: str = LEARNING_RECORD_FSYNC,
+        fsync_interval: float = LEARNING_RECORD_FSYNC_INTERVAL
+    ):
+        """
+        Args:
+            fsync_policy: "always"、"interval" 或 "never"
+            fsync_interval: interval 模式下同一檔案兩次 fsync 的最短間隔（秒）
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            print(f"Warning: unknown fsync policy {fsync_policy!r}, using 'never'")
+            fsync_policy = "never"
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self._last_fsync: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def append(self, path: Path, record: Dict) -> None:
+        """
+        附加一筆紀錄
+
+        Args:
+            path: JSONL 紀錄檔路徑
+            record: 紀錄字典
+        """
+        self.append_many(path, [record])
+
+    def append_many(self, path: Path, records: List[Dict], durable: bool = False) -> None:
+        """
+        一次附加多筆紀錄（單次寫入）
+
+        Args:
+            path: JSONL 紀錄檔路徑
+            records: 紀錄字典列表
+            durable: 不論 fsync_policy 都 fsync（新建的檔案連同目錄）
+        """
+        if not records:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock:
+            created = durable and not os.path.exists(path)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                if durable or self._should_fsync(str(path)):
+                    os.fsync(f.fileno())
+            if created:
+                fsync_directory(Path(path).parent)
+
+    def _should_fsync(self, key: str) -> bool:
+        if self.fsync_policy == "always":
+            return True
+        if self.fsync_policy == "never":
+            return False
+        now = time.monotonic()
+        if now - self._last_fsync.get(key, float("-inf")) >= self.fsync_interval:
+            self._last_fsync[key] = now
+            return True
+        return False
+
+    @staticmethod
+    def read_all(path: Path) -> List[Dict]:
+        """讀取所有紀錄（略過無法解析的行，例如寫入中斷的最後一行）"""
+        if not path.exists():
+            return []
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                record = _parse_line(line)
+                if record is not None:
+                    records.append(record)
+        return records
+
+    @staticmethod
+    def tail(path: Path, limit: int) -> List[Dict]:
+        """
+        從檔尾往回讀取最後 limit 筆紀錄
+
+        Args:
+            path: JSONL 紀錄檔路徑
+            limit: 紀錄數量
+
+        Returns:
+            紀錄列表（依時間由舊到新）
+        """
+        if limit <= 0 or not path.exists():
+            return []
+        records: List[Dict] = []
+        with open(path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0 and len(records) < limit:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                lines = (f.read(step) + remainder).split(b"\n")
+                # 第一段可能是被區塊切斷的行，留到下一輪
+                remainder = lines.pop(0) if position > 0 else b""
+                for line in reversed(lines):
+                    record = _parse_line(line)
+                    if record is not None:
+                        records.append(record)
+                        if len(records) >= limit:
+                            break
+        records.reverse()
+        return records
+
+
+def _parse_line(line) -> Optional[Dict]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def migrate_json_records(json_path: Path, jsonl_path: Path) -> int:
+    """
+    把舊版 JSON 陣列紀錄檔轉成 JSONL，成功後刪除舊檔
+
+    已存在的 JSONL 紀錄會接在轉換出的舊紀錄之後。
+
+    Args:
+        json_path: 舊版 records_<id>.json
+        jsonl_path: 新的 records_<id>.jsonl
+
+    Returns:
+        轉換的紀錄數量
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    if not isinstance(records, list):
+        raise ValueError(f"{json_path} 不是紀錄陣列")
+
+    tmp_path = jsonl_path.with_name(jsonl_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if jsonl_path.exists():
+            with open(jsonl_path, 'r', encoding='utf-8') as existing:
+                f.writelines(existing)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, jsonl_path)
+    json_path.unlink()
+    return len(records)
+
+
+def migrate_directory(data_dir: str = STUDENT_DATA_DIR) -> Dict[str, int]:
+    """
+    轉換目錄下所有舊版紀錄檔
+
+    Returns:
+        {學生紀錄檔名: 轉換筆數}
+    """
+    migrated = {}
+    for json_path in sorted(Path(data_dir).glob("records_*.json")):
+        try:
+            migrated[json_path.name] = migrate_json_records(json_path, json_path.with_suffix(".jsonl"))
+        except Exception as e:
+            print(f"轉換 {json_path.name} 失敗: {e}")
+    return migrated
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else STUDENT_DATA_DIR
+    results = migrate_directory(directory)
+    for name, count in results.items():
+        print(f"  ✓ {name}: {count} 筆")
+    print(f"共轉換 {len(results)} 個紀錄檔")
@@ -0,0 +1,609 @@
+"""
+Student Storage - Pluggable persistence for profiles, learning records and used-question sets
+
+Backends:
+    JsonFileStorage  one profile JSON and one JSONL record log per student (default);
+                     flat or hash-sharded directories, atomic replace-on-write,
+                     per-student advisory locks for writers
+    SQLiteStorage    a single SQLite database in WAL mode, aggregated with SQL
+
+Copy existing JSON data into SQLite with:
+    python -m utils.storage [data_dir]
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from config import STUDENT_DATA_DIR, STORAGE_BACKEND, STUDENT_DB_FILE, STUDENT_DATA_LAYOUT
+from utils.file_lock import FileLock, atomic_write_json
+from utils.progress_aggregates import ProgressAggregates
+from utils.record_log import LearningRecordLog, migrate_json_records
+from utils.student_layout import StudentLayout
+from utils.used_questions import UsedQuestionSet
+
+UNCATEGORIZED_SCOPE = "未分類"
+
+# Token that changes whenever a student's stored data changes; None if the backend cannot tell
+Version = Optional[Tuple]
+
+
+class StudentStorage(ABC):
+    """
+    Storage interface used by DataProcessor
+
+    Aggregate queries have generic implementations built on get_records;
+    backends that can aggregate natively override them.
+    """
+
+    # Directory for files kept next to the data (e.g. the record write-ahead journal)
+    journal_dir: Optional[Path] = None
+
+    @abstractmethod
+    def save_profile(self, student_id: str, profile: Dict) -> Tuple[Dict, Version]:
+        """
+        Save a profile (used_questions is merged with what other writers stored)
+
+        Returns:
+            (the profile as stored, its version right after the write)
+        """
+
+    @abstractmethod
+    def load_profile(self, student_id: str) -> Optional[Dict]:
+        """Stored profile, or None"""
+
+    def append_record(self, student_id: str, record: Dict) -> Tuple[Version, Version]:
+        return self.append_records(student_id, [record])
+
+    @abstractmethod
+    def append_records(
+        self, student_id: str, records: List[Dict], durable: bool = False
+    ) -> Tuple[Version, Version]:
+        """
+        Append several records in order, in one write
+
+        Args:
+            durable: Reach stable storage before returning, whatever the
+                configured fsync/synchronous setting (callers about to drop
+                their own copy, such as the record write-ahead journal)
+
+        Returns:
+            (records version just before the append, version just after it)
+        """
+
+    def version(self, student_id: str, kind: str) -> Version:
+        """
+        Current version of a student's "profile" or "records"
+
+        Cached copies are valid while the version is unchanged; it also changes
+        when another process writes. None means the backend cannot tell, and
+        callers must not keep cached copies.
+        """
+        return None
+
+    @abstractmethod
+    def get_records(self, student_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """A student's records, oldest first (only the last limit if given)"""
+
+    @abstractmethod
+    def student_ids(self) -> List[str]:
+        """Every student with a profile or records, sorted"""
+
+    @abstractmethod
+    def load_aggregates(self, student_id: str) -> Optional[Dict]:
+        """Saved ProgressAggregates.to_dict() data, or None"""
+
+    @abstractmethod
+    def save_aggregates(self, student_id: str, data: Dict) -> None:
+        """Replace the saved progress counters"""
+
+    def update_aggregates(self, student_id: str, records: List[Dict], rebuild: bool = False) -> Dict:
+        """
+        Fold records that were just appended into the stored progress counters
+
+        Counters are merged with what is stored, not overwritten, so several
+        processes writing one student all keep their counts. Backends that
+        share data between processes override this to do it under their lock.
+
+        Args:
+            student_id: Student identifier
+            records: Records appended since the counters were last updated
+            rebuild: Recount from all records instead (e.g. after replaying a journal)
+
+        Returns:
+            The stored ProgressAggregates.to_dict() data
+        """
+        data = _merge_aggregates(
+            None if rebuild else self.load_aggregates(student_id), records,
+            lambda: self.get_records(student_id)
+        )
+        self.save_aggregates(student_id, data)
+        return data
+
+    def close(self) -> None:
+        """Release backend resources"""
+
+    def progress_stats(self, student_id: str, num_records: int) -> Dict:
+        """
+        Aggregate the most recent records
+
+        Args:
+            student_id: Student identifier
+            num_records: Number of recent records to aggregate
+
+        Returns:
+            {"total", "correct", "subjects": {subject: {"total", "correct", "score_sum"}},
+             "concepts": [scope or concept of each incorrect answer, oldest first]}
+        """
+        stats = {"total": 0, "correct": 0, "subjects": {}, "concepts": []}
+        for record in self.get_records(student_id, limit=num_records):
+            subject = record.get("subject", "Unknown")
+            correct = bool(record.get("correct", False))
+            concept = record.get("scope") or record.get("concept_to_reinforce", "")
+            if concept and not correct:
+                stats["concepts"].append(concept)
+            entry = stats["subjects"].setdefault(subject, {"total": 0, "correct": 0, "score_sum": 0})
+            entry["total"] += 1
+            entry["score_sum"] += record.get("score", 0)
+            stats["total"] += 1
+            if correct:
+                entry["correct"] += 1
+                stats["correct"] += 1
+        return stats
+
+    def error_scope_counts(self, student_id: str) -> Dict[str, int]:
+        """
+        Count incorrect answers per scope over the whole history
+
+        Returns:
+            {scope: errors}, most errors first (ties in order of first error)
+        """
+        counts: Dict[str, int] = {}
+        for record in self.get_records(student_id):
+            if record.get("correct") is False:
+                scope = record.get("scope") or UNCATEGORIZED_SCOPE
+                counts[scope] = counts.get(scope, 0) + 1
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+
+class JsonFileStorage(StudentStorage):
+    """
+    Per-student profile JSON, JSONL record log and progress counters
+
+    Files sit flat in the data directory or in hash-sharded per-student
+    directories (see utils.student_layout). Writers of a student hold its
+    lock file; files that are rewritten are replaced atomically, so readers
+    never need the lock.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = STUDENT_DATA_DIR,
+        record_log: Optional[LearningRecordLog] = None,
+        layout: str = STUDENT_DATA_LAYOUT
+    ):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.journal_dir = self.data_dir
+        self.record_log = record_log or LearningRecordLog()
+        self.layout = StudentLayout(str(self.data_dir), layout)
+
+    def lock(self, student_id: str) -> FileLock:
+        """Inter-process write lock of one student's files"""
+        return FileLock(self.layout.lock_path(student_id))
+
+    def save_profile(self, student_id: str, profile: Dict) -> Tuple[Dict, Version]:
+        with self.lock(student_id):
+            file_path = self.layout.path(student_id, "profile", create=True)
+            if "used_questions" in profile:
+                # Another process may have marked questions used since we loaded
+                stored = _read_json(file_path)
+                if stored and stored.get("used_questions"):
+                    used = UsedQuestionSet.from_profile_value(stored["used_questions"])
+                    used.update(UsedQuestionSet.from_profile_value(profile["used_questions"]))
+                    profile = {**profile, "used_questions": used.to_profile_value()}
+            atomic_write_json(file_path, profile, ensure_ascii=False, indent=2)
+            return profile, _file_version(file_path)
+
+    def load_profile(self, student_id: str) -> Optional[Dict]:
+        return _read_json(self.layout.path(student_id, "profile"))
+
+    def append_records(
+        self, student_id: str, records: List[Dict], durable: bool = False
+    ) -> Tuple[Version, Version]:
+        with self.lock(student_id):
+            file_path = self._migrate_legacy_records(student_id, create=True)
+            before = _file_version(file_path)
+            self.record_log.append_many(file_path, records, durable=durable)
+            return before, _file_version(file_path)
+
+    def version(self, student_id: str, kind: str) -> Version:
+        if kind == "records":
+            return _file_version(self.records_path(student_id))
+        return _file_version(self.layout.path(student_id, kind))
+
+    def get_records(self, student_id: str, limit: Optional[int] = None) -> List[Dict]:
+        file_path = self.records_path(student_id)
+        if limit:
+            return self.record_log.tail(file_path, limit)
+        return self.record_log.read_all(file_path)
+
+    def records_path(self, student_id: str) -> Path:
+        """
+        Path of a student's JSONL record log, migrating a legacy JSON array file first
+
+        Args:
+            student_id: Student identifier
+
+        Returns:
+            Path to the student's records JSONL file
+        """
+        if self.layout.path(student_id, "legacy_records").exists():
+            with self.lock(student_id):
+                return self._migrate_legacy_records(student_id)
+        return self.layout.path(student_id, "records")
+
+    def _migrate_legacy_records(self, student_id: str, create: bool = False) -> Path:
+        """Convert a legacy JSON array record file if present (caller holds the lock)"""
+        file_path = self.layout.path(student_id, "records", create)
+        legacy_path = self.layout.path(student_id, "legacy_records")
+        if legacy_path.exists():
+            migrate_json_records(legacy_path, file_path)
+        return file_path
+
+    def load_aggregates(self, student_id: str) -> Optional[Dict]:
+        return _read_json(self.layout.path(student_id, "progress"))
+
+    def save_aggregates(self, student_id: str, data: Dict) -> None:
+        with self.lock(student_id):
+            file_path = self.layout.path(student_id, "progress", create=True)
+            atomic_write_json(file_path, data, ensure_ascii=False)
+
+    def update_aggregates(self, student_id: str, records: List[Dict], rebuild: bool = False) -> Dict:
+        with self.lock(student_id):
+            file_path = self.layout.path(student_id, "progress", create=True)
+            records_path = self._migrate_legacy_records(student_id)
+            data = _merge_aggregates(
+                None if rebuild else _read_json(file_path), records,
+                lambda: self.record_log.read_all(records_path)
+            )
+            atomic_write_json(file_path, data, ensure_ascii=False)
+        return data
+
+    def student_ids(self) -> List[str]:
+        return self.layout.student_ids()
+
+
+class SQLiteStorage(StudentStorage):
+    """All students in one SQLite database (WAL mode), indexed by student, subject, scope and time"""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the database
+
+        Args:
+            db_path: SQLite file path
+        """
+        path = Path(db_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(path)
+        self.journal_dir = path.parent
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS profiles (
+                student_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id TEXT NOT NULL,
+                timestamp TEXT,
+                subject TEXT,
+                scope TEXT,
+                concept TEXT,
+                correct INTEGER,
+                score REAL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_records_student ON records (student_id, id);
+            CREATE INDEX IF NOT EXISTS idx_records_subject ON records (student_id, subject);
+            CREATE INDEX IF NOT EXISTS idx_records_scope ON records (student_id, scope);
+            CREATE INDEX IF NOT EXISTS idx_records_time ON records (student_id, timestamp);
+            CREATE TABLE IF NOT EXISTS aggregates (
+                student_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS used_question_keys (
+                student_id TEXT NOT NULL,
+                question_key INTEGER NOT NULL,
+                PRIMARY KEY (student_id, question_key)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._migrate_used_questions()
+        self._conn.commit()
+
+    def _migrate_used_questions(self) -> None:
+        """Move hex hashes from the old used_questions table into used_question_keys"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'used_questions'"
+        ).fetchone()
+        if not exists:
+            return
+        rows = self._conn.execute("SELECT student_id, question_id FROM used_questions").fetchall()
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO used_question_keys (student_id, question_key) VALUES (?, ?)",
+            [(student_id, _signed(UsedQuestionSet.key(question_id))) for student_id, question_id in rows]
+        )
+        self._conn.execute("DROP TABLE used_questions")
+
+    def save_profile(self, student_id: str, profile: Dict) -> Tuple[Dict, Version]:
+        # used_questions lives in its own table so it is appended to, not rewritten
+        payload = {key: value for key, value in profile.items() if key != "used_questions"}
+        used = UsedQuestionSet.from_profile_value(profile.get("used_questions"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (student_id, payload) VALUES (?, ?)",
+                (student_id, json.dumps(payload, ensure_ascii=False))
+            )
+            if "used_questions" in profile:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO used_question_keys (student_id, question_key) VALUES (?, ?)",
+                    [(student_id, _signed(key)) for key in used]
+                )
+                payload["used_questions"] = self._used_questions(student_id)
+            # Read inside the write transaction: no other commit can slip in before it
+            version = self._data_version()
+        return payload, version
+
+    def load_profile(self, student_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM profiles WHERE student_id = ?", (student_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            used = self._used_questions(student_id)
+        profile = json.loads(row[0])
+        profile["used_questions"] = used
+        return profile
+
+    def _used_questions(self, student_id: str) -> UsedQuestionSet:
+        """Stored used-question keys (caller holds self._lock)"""
+        keys = self._conn.execute(
+            "SELECT question_key FROM used_question_keys WHERE student_id = ?", (student_id,)
+        ).fetchall()
+        return UsedQuestionSet(key % (1 << 64) for (key,) in keys)
+
+    def _data_version(self) -> Version:
+        """Changes whenever another connection commits (caller holds self._lock)"""
+        return ("sqlite", self._conn.execute("PRAGMA data_version").fetchone()[0])
+
+    def version(self, student_id: str, kind: str) -> Version:
+        with self._lock:
+            return self._data_version()
+
+    def append_records(
+        self, student_id: str, records: List[Dict], durable: bool = False
+    ) -> Tuple[Version, Version]:
+        rows = []
+        for record in records:
+            correct = record.get("correct")
+            rows.append((
+                student_id,
+                record.get("timestamp"),
+                record.get("subject", "Unknown"),
+                record.get("scope") or "",
+                record.get("concept_to_reinforce") or "",
+                None if correct is None else int(bool(correct)),
+                record.get("score", 0),
+                json.dumps(record, ensure_ascii=False)
+            ))
+        with self._lock:
+            if durable:
+                # NORMAL may lose the last WAL commits on power failure; FULL syncs the WAL on commit
+                self._conn.execute("PRAGMA synchronous=FULL")
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO records (student_id, timestamp, subject, scope, concept, correct, score, payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+                    # Our own commits leave data_version unchanged
+                    version = self._data_version()
+            finally:
+                if durable:
+                    self._conn.execute("PRAGMA synchronous=NORMAL")
+        return version, version
+
+    def get_records(self, student_id: str, limit: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            if limit:
+                rows = self._conn.execute(
+                    "SELECT payload FROM (SELECT id, payload FROM records WHERE student_id = ? "
+                    "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                    (student_id, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT payload FROM records WHERE student_id = ? ORDER BY id", (student_id,)
+                ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def progress_stats(self, student_id: str, num_records: int) -> Dict:
+        recent = (
+            "WITH recent AS (SELECT * FROM records WHERE student_id = ? ORDER BY id DESC LIMIT ?) "
+        )
+        with self._lock:
+            subject_rows = self._conn.execute(
+                recent
+                + "SELECT subject, COUNT(*), SUM(COALESCE(correct, 0)), SUM(score) "
+                "FROM recent GROUP BY subject ORDER BY MIN(id)",
+                (student_id, num_records)
+            ).fetchall()
+            concept_rows = self._conn.execute(
+                recent
+                + "SELECT CASE WHEN scope != '' THEN scope ELSE concept END FROM recent "
+                "WHERE COALESCE(correct, 0) = 0 AND (scope != '' OR concept != '') ORDER BY id",
+                (student_id, num_records)
+            ).fetchall()
+        subjects = {
+            subject: {"total": total, "correct": correct, "score_sum": score_sum or 0}
+            for subject, total, correct, score_sum in subject_rows
+        }
+        return {
+            "total": sum(entry["total"] for entry in subjects.values()),
+            "correct": sum(entry["correct"] for entry in subjects.values()),
+            "subjects": subjects,
+            "concepts": [concept for (concept,) in concept_rows]
+        }
+
+    def error_scope_counts(self, student_id: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT CASE WHEN scope != '' THEN scope ELSE ? END AS error_scope, COUNT(*) "
+                "FROM records WHERE student_id = ? AND correct = 0 "
+                "GROUP BY error_scope ORDER BY COUNT(*) DESC, MIN(id)",
+                (UNCATEGORIZED_SCOPE, student_id)
+            ).fetchall()
+        return dict(rows)
+
+    def load_aggregates(self, student_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM aggregates WHERE student_id = ?", (student_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_aggregates(self, student_id: str, data: Dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aggregates (student_id, payload) VALUES (?, ?)",
+                (student_id, json.dumps(data, ensure_ascii=False))
+            )
+
+    def update_aggregates(self, student_id: str, records: List[Dict], rebuild: bool = False) -> Dict:
+        def all_records() -> List[Dict]:
+            rows = self._conn.execute(
+                "SELECT payload FROM records WHERE student_id = ? ORDER BY id", (student_id,)
+            ).fetchall()
+            return [json.loads(payload) for (payload,) in rows]
+
+        with self._lock, self._conn:
+            # Take the write lock before reading so other processes cannot interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = None if rebuild else self._conn.execute(
+                "SELECT payload FROM aggregates WHERE student_id = ?", (student_id,)
+            ).fetchone()
+            data = _merge_aggregates(json.loads(row[0]) if row else None, records, all_records)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aggregates (student_id, payload) VALUES (?, ?)",
+                (student_id, json.dumps(data, ensure_ascii=False))
+            )
+        return data
+
+    def student_ids(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT student_id FROM profiles UNION SELECT student_id FROM records ORDER BY 1"
+            ).fetchall()
+        return [student_id for (student_id,) in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _read_json(file_path: Path) -> Optional[Dict]:
+    """Load a JSON file without locking (writers replace it atomically); None if missing"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _file_version(file_path: Path) -> Version:
+    """(inode, mtime, size) of a file; atomic replaces and appends both change it"""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return ("missing",)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _merge_aggregates(
+    stored: Optional[Dict], records: List[Dict], all_records: Callable[[], List[Dict]]
+) -> Dict:
+    """Stored counters plus new records; counters that are missing or outdated are recounted from all_records()"""
+    aggregates = ProgressAggregates.from_dict(stored)
+    if aggregates is None:
+        # The new records are already in storage, so the recount includes them
+        return ProgressAggregates.from_records(all_records()).to_dict()
+    for record in records:
+        aggregates.add(record)
+    return aggregates.to_dict()
+
+
+def _signed(key: int) -> int:
+    """Unsigned 64-bit question key as the signed value SQLite INTEGER can hold"""
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def create_storage(backend: str = STORAGE_BACKEND, data_dir: str = STUDENT_DATA_DIR) -> StudentStorage:
+    """
+    Create the storage backend selected in config
+
+    Args:
+        backend: "json" or "sqlite"
+        data_dir: Student data directory
+
+    Returns:
+        Storage instance
+    """
+    if backend == "sqlite":
+        return SQLiteStorage(str(Path(data_dir) / STUDENT_DB_FILE))
+    if backend != "json":
+        print(f"Warning: unknown storage backend {backend!r}, using json")
+    return JsonFileStorage(data_dir)
+
+
+def copy_storage(source: StudentStorage, target: StudentStorage) -> int:
+    """
+    Copy every student's profile and records from one backend to another
+
+    Students the target already has are skipped, so running the copy again
+    (e.g. after an interruption) does not duplicate their records.
+
+    Returns:
+        Number of students copied
+    """
+    existing = set(target.student_ids())
+    copied = 0
+    for student_id in source.student_ids():
+        if student_id in existing:
+            continue
+        profile = source.load_profile(student_id)
+        if profile is not None:
+            target.save_profile(student_id, profile)
+        records = source.get_records(student_id)
+        if records:
+            target.append_records(student_id, records)
+        copied += 1
+    return copied
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else STUDENT_DATA_DIR
+    database = SQLiteStorage(str(Path(directory) / STUDENT_DB_FILE))
+    copied = copy_storage(JsonFileStorage(directory), database)
+    database.close()
+    print(f"Copied {copied} students into {Path(directory) / STUDENT_DB_FILE} (students already there were skipped)")
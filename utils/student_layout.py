@@ -0,0 +1,166 @@
+"""
+學生資料目錄配置 - 決定每位學生的檔案放在哪裡
+
+flat:     students/student_<id>.json、records_<id>.jsonl ...（所有學生在同一層）
+sharded:  students/ab/cd/<編碼後 id>/profile.json、records.jsonl ...
+          （鎖定檔是旁邊的 students/ab/cd/<編碼後 id>.lock）
+          ab/cd 取自 id（UTF-8）的 MD5 前四碼，每層最多 256 個子目錄；
+          目錄名稱以 URL 編碼（例如 丁國 → %E4%B8%81%E5%9C%8B），
+          非 ASCII 或含特殊字元的 id 也能安全使用。
+
+sharded 模式下尚未搬移的學生仍從平面檔案讀寫，可用以下指令一次搬移：
+    python -m utils.student_layout [學生資料目錄]
+"""
+import hashlib
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import quote, unquote
+from config import STUDENT_DATA_DIR, STUDENT_DATA_LAYOUT
+from utils.file_lock import FileLock
+
+LAYOUTS = ("flat", "sharded")
+
+# 各種檔案在兩種配置下的名稱
+FLAT_NAMES = {
+    "profile": "student_{id}.json",
+    "records": "records_{id}.jsonl",
+    "legacy_records": "records_{id}.json",
+    "progress": "progress_{id}.json",
+    "lock": "student_{id}.lock",
+}
+SHARDED_NAMES = {
+    "profile": "profile.json",
+    "records": "records.jsonl",
+    "legacy_records": "records.json",
+    "progress": "progress.json",
+}
+MIGRATING_SUFFIX = ".migrating"
+
+
+class StudentLayout:
+    """學生檔案路徑解析（sharded 模式下找不到分層目錄時沿用平面檔案）"""
+
+    def __init__(self, data_dir: str = STUDENT_DATA_DIR, layout: str = STUDENT_DATA_LAYOUT):
+        """
+        Args:
+            data_dir: 學生資料目錄
+            layout: "flat" 或 "sharded"
+        """
+        if layout not in LAYOUTS:
+            print(f"Warning: unknown student data layout {layout!r}, using 'flat'")
+            layout = "flat"
+        self.data_dir = Path(data_dir)
+        self.layout = layout
+        self._sharded_ids = set()  # 已確認使用分層目錄的學生
+
+    def shard_dir(self, student_id: str) -> Path:
+        digest = hashlib.md5(student_id.encode("utf-8")).hexdigest()
+        return self.data_dir / digest[:2] / digest[2:4] / quote(student_id, safe="")
+
+    def lock_path(self, student_id: str) -> Path:
+        """寫入鎖定檔；sharded 模式下放在學生目錄旁，搬移前後都是同一個檔案"""
+        if self.layout == "flat":
+            return self.flat_path(student_id, "lock")
+        directory = self.shard_dir(student_id)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        return directory.with_name(directory.name + ".lock")
+
+    def flat_path(self, student_id: str, kind: str) -> Path:
+        return self.data_dir / FLAT_NAMES[kind].format(id=student_id)
+
+    def has_flat_files(self, student_id: str) -> bool:
+        return any(
+            self.flat_path(student_id, kind).exists()
+            for kind in ("profile", "records", "legacy_records")
+        )
+
+    def path(self, student_id: str, kind: str, create: bool = False) -> Path:
+        """
+        學生某種檔案的路徑
+
+        Args:
+            student_id: 學生 ID
+            kind: "profile"、"records"、"legacy_records" 或 "progress"
+            create: 需要寫入時為 True（建立分層目錄；應在持有 lock_path 的鎖時呼叫）
+
+        Returns:
+            檔案路徑
+        """
+        if self.layout == "flat":
+            return self.flat_path(student_id, kind)
+        if student_id not in self._sharded_ids:
+            directory = self.shard_dir(student_id)
+            if not directory.is_dir():
+                if self.has_flat_files(student_id):
+                    return self.flat_path(student_id, kind)
+                if not create:
+                    return directory / SHARDED_NAMES[kind]
+                directory.mkdir(parents=True, exist_ok=True)
+            self._sharded_ids.add(student_id)
+        return self.shard_dir(student_id) / SHARDED_NAMES[kind]
+
+    def flat_ids(self) -> List[str]:
+        ids = set()
+        for pattern, prefix in (("student_*.json", "student_"), ("records_*.json*", "records_")):
+            for path in self.data_dir.glob(pattern):
+                if path.suffix in (".json", ".jsonl"):
+                    ids.add(path.stem[len(prefix):])
+        return sorted(ids)
+
+    def sharded_ids(self) -> List[str]:
+        ids = []
+        for directory in self.data_dir.glob("[0-9a-f][0-9a-f]/[0-9a-f][0-9a-f]/*"):
+            if directory.is_dir() and not directory.name.endswith(MIGRATING_SUFFIX):
+                ids.append(unquote(directory.name))
+        return sorted(ids)
+
+    def student_ids(self) -> List[str]:
+        if self.layout == "flat":
+            return self.flat_ids()
+        return sorted(set(self.flat_ids()) | set(self.sharded_ids()))
+
+
+def migrate_to_sharded(data_dir: str = STUDENT_DATA_DIR) -> Dict[str, int]:
+    """
+    把平面目錄的學生檔案搬到分層目錄（已搬移的學生略過）
+
+    每位學生在 sharded 模式的鎖定檔保護下搬移；以 sharded 模式執行中的
+    其他行程寫入時會等待，搬移完成後改寫分層目錄。
+
+    Returns:
+        {學生 ID: 搬移的檔案數}
+    """
+    layout = StudentLayout(data_dir, "sharded")
+    moved = {}
+    for student_id in layout.flat_ids():
+        target_dir = layout.shard_dir(student_id)
+        try:
+            with FileLock(layout.lock_path(student_id)):
+                if target_dir.is_dir():
+                    print(f"略過 {student_id}：分層目錄已存在")
+                    continue
+                staging = target_dir.with_name(target_dir.name + MIGRATING_SUFFIX)
+                staging.mkdir(parents=True, exist_ok=True)
+                count = 0
+                for kind in ("profile", "records", "legacy_records", "progress"):
+                    source = layout.flat_path(student_id, kind)
+                    if source.exists():
+                        os.replace(source, staging / SHARDED_NAMES[kind])
+                        count += 1
+                # 分層目錄整個改名到位，不會出現只有部分檔案的學生目錄
+                os.replace(staging, target_dir)
+            layout.flat_path(student_id, "lock").unlink(missing_ok=True)
+            moved[student_id] = count
+        except Exception as e:
+            print(f"搬移 {student_id} 失敗: {e}")
+    return moved
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else STUDENT_DATA_DIR
+    results = migrate_to_sharded(directory)
+    for student_id, count in results.items():
+        print(f"  ✓ {student_id}: {count} 個檔案")
+    print(f"共搬移 {len(results)} 位學生；請將 STUDENT_DATA_LAYOUT 設為 sharded")
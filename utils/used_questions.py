@@ -0,0 +1,105 @@
+"""
+Used Question Set - Compact record of the bank questions a student has already seen
+
+Question IDs are the 32-character MD5 hex strings from DataProcessor._get_question_hash.
+Only their first 8 bytes are kept, as ints in a set, and the profile stores them
+packed and base64-encoded instead of as a list of hex strings.
+"""
+import base64
+import struct
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+USED_QUESTIONS_FORMAT = "md5-64"
+
+QuestionKey = Union[str, bytes, int]
+
+
+class UsedQuestionSet:
+    """Set of 64-bit question keys with O(1) membership"""
+
+    def __init__(self, question_ids: Optional[Iterable[QuestionKey]] = None):
+        """
+        Args:
+            question_ids: Question hashes (hex strings), digests or keys to start with
+        """
+        self._keys = set()
+        if question_ids:
+            self.update(question_ids)
+
+    @staticmethod
+    def key(question_id: QuestionKey) -> int:
+        """64-bit key of a question hash (hex string), MD5 digest or key"""
+        if isinstance(question_id, int):
+            return question_id
+        if isinstance(question_id, (bytes, bytearray)):
+            return int.from_bytes(question_id[:8], "big")
+        return int(question_id[:16], 16)
+
+    def add(self, question_id: QuestionKey) -> None:
+        self._keys.add(self.key(question_id))
+
+    def update(self, question_ids: Iterable[QuestionKey]) -> None:
+        self._keys.update(self.key(question_id) for question_id in question_ids)
+
+    def copy(self) -> "UsedQuestionSet":
+        used = UsedQuestionSet()
+        used._keys = set(self._keys)
+        return used
+
+    def __contains__(self, question_id) -> bool:
+        try:
+            return self.key(question_id) in self._keys
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._keys)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, UsedQuestionSet) and self._keys == other._keys
+
+    def to_profile_value(self) -> Dict:
+        """Serialized form stored in the profile (sorted keys, packed big-endian, base64)"""
+        keys = sorted(self._keys)
+        return {
+            "format": USED_QUESTIONS_FORMAT,
+            "count": len(keys),
+            "data": base64.b64encode(struct.pack(f">{len(keys)}Q", *keys)).decode("ascii")
+        }
+
+    @classmethod
+    def from_profile_value(cls, value) -> "UsedQuestionSet":
+        """
+        Restore a used-question set from a profile value
+
+        Accepts the packed form, the legacy list of hex hashes (migrated on
+        the fly), an existing UsedQuestionSet (copied) or None.
+        """
+        if isinstance(value, UsedQuestionSet):
+            return value.copy()
+        if isinstance(value, dict):
+            if value.get("format") != USED_QUESTIONS_FORMAT:
+                print(f"Warning: unknown used_questions format {value.get('format')!r}, starting empty")
+                return cls()
+            raw = base64.b64decode(value.get("data", ""))
+            used = cls()
+            used._keys = set(struct.unpack(f">{len(raw) // 8}Q", raw[:len(raw) // 8 * 8]))
+            return used
+        return cls(value or [])
+
+    @classmethod
+    def from_profile(cls, profile: Dict) -> "UsedQuestionSet":
+        """
+        The profile's used-question set, converting the stored value in place
+
+        Returns:
+            The UsedQuestionSet held in profile["used_questions"]
+        """
+        used = profile.get("used_questions")
+        if not isinstance(used, UsedQuestionSet):
+            used = cls.from_profile_value(used)
+            profile["used_questions"] = used
+        return used